@@ -17,6 +17,8 @@ import time
 from google.oauth2.service_account import Credentials
 from GoogleNews import GoogleNews 
 
+import trade_params
+
 warnings.filterwarnings('ignore')
 
 SPREADSHEET_ID = "1I_SJ3InMZPiSS1XibF-w000lwjc1PIsRaJ_kXzQ3LxE"
@@ -180,6 +182,7 @@ def analyze_sector(sector_name, ticker_list):
     waktu_update = datetime.now(tz_jkt).strftime("%Y-%m-%d %H:%M:%S")
     
     results = []
+    candidates = []
     print(f"\n🚀 Scan {sector_name} | Total: {len(ticker_list)} saham")
 
     for ticker in ticker_list:
@@ -235,45 +238,6 @@ def analyze_sector(sector_name, ticker_list):
             is_vol_spike = vol_now > (vol_ma50 * 1.5)
             rsi = ta.momentum.RSIIndicator(df["Close"]).rsi().iloc[-1]
 
-            # ==============================
-            # 4. TARGET & RISK (FIBO LADDER)
-            # ==============================
-            if price > (low_60 + range_span * 0.5): 
-                stop_loss = ma_50 
-            else:
-                stop_loss = low_60 - atr_now 
-
-            fib_levels = [0.236, 0.382, 0.5, 0.618, 0.786, 1.0, 1.272, 1.618]
-            target_aman = 0; target_moon = 0; fib_note = ""
-            found_target = False
-            
-            for level in fib_levels:
-                calc_price = low_60 + (range_span * level)
-                if calc_price > price * 1.02: 
-                    target_aman = calc_price
-                    fib_note = f"Fib {level}"
-                    try:
-                        next_idx = fib_levels.index(level) + 1
-                        if next_idx < len(fib_levels):
-                             target_moon = low_60 + (range_span * fib_levels[next_idx])
-                        else:
-                             target_moon = low_60 + (range_span * 2.0)
-                    except:
-                        target_moon = target_aman * 1.1
-                    found_target = True
-                    break
-            
-            if not found_target:
-                target_aman = price * 1.05; target_moon = price * 1.15; fib_note = "Blue Sky"
-
-            risk = price - stop_loss
-            reward = target_aman - price
-            if risk <= 0: risk = 0.1
-            rr = reward / risk
-
-            potensi_aman = ((target_aman - price) / price) * 100
-            potensi_moon = ((target_moon - price) / price) * 100
-
             # ==============================
             # SCORING AWAL (TEKNIKAL SAJA)
             # ==============================
@@ -307,41 +271,84 @@ def analyze_sector(sector_name, ticker_list):
             # ==============================
             trend_desc = "🚀 SUPER UPTREND" if is_super_uptrend else ("📈 Uptrend" if is_moderate_uptrend else "⚠️ Sideways/Down")
 
-            action = "⚪ WATCHLIST"
-            if score >= 85 and rr >= 2: action = "💎 STRONG BUY"
-            elif score >= 70 and rr >= 1.5: action = "🟢 BUY"
-
             reasons = []
             if is_super_uptrend: reasons.append("Strong Trend")
             if is_vcp: reasons.append("VCP")
             if is_spring_ma50: reasons.append("Pantul MA50")
             if is_vol_spike: reasons.append("Vol Spike")
-            if "Breakout" in fib_note: reasons.append("Breakout")
             if news_score > 0: reasons.append("Positive News")
             
             alasan_text = ", ".join(reasons) if reasons else "-"
 
-            results.append({
-                "Ticker": ticker,
-                "Harga Skrg": int(price),
-                "Trend Status": trend_desc,
-                "Action": action,
-                "Score": score,
-                "Narasi Berita": news_info,
-                "Risk/Reward": round(rr, 2),
-                "Target Aman": int(target_aman),
-                "Level Target": fib_note,
-                "Target Moon": int(target_moon),
-                "Potensi Aman (%)": round(potensi_aman, 2),
-                "Potensi Moon (%)": round(potensi_moon, 2),
-                "Stop Loss": int(stop_loss),
-                "Alasan": alasan_text,
-                "Last Update": waktu_update
+            candidates.append({
+                "price": price, "ma_50": ma_50, "low_60": low_60, "range_span": range_span,
+                "atr_now": atr_now, "score": score,
+                "row": {
+                    "Ticker": ticker,
+                    "Harga Skrg": int(price),
+                    "Trend Status": trend_desc,
+                    "Score": score,
+                    "Narasi Berita": news_info,
+                    "Alasan": alasan_text,
+                    "Last Update": waktu_update
+                },
             })
 
         except Exception as e:
             pass
 
+    # ==============================
+    # 4. TARGET & RISK (FIBO LADDER) — semua kandidat, satu panggilan
+    # ==============================
+    if candidates:
+        c = pd.DataFrame(candidates)
+        price, low_60, range_span = (c[k].to_numpy(dtype=float) for k in ("price", "low_60", "range_span"))
+
+        stop_loss = np.where(price > low_60 + range_span * 0.5,
+                             c["ma_50"].to_numpy(dtype=float), low_60 - c["atr_now"].to_numpy(dtype=float))
+
+        fib_levels = np.array([0.236, 0.382, 0.5, 0.618, 0.786, 1.0, 1.272, 1.618])
+        idx, target_aman, target_moon = trade_params.fib_ladder(low_60, range_span, fib_levels, above=price * 1.02)
+        found_target = idx >= 0
+        # Level terakhir -> extension 2.0; tidak ada level di atas harga -> "Blue Sky"
+        target_moon = np.where(found_target & np.isnan(target_moon), low_60 + range_span * 2.0, target_moon)
+        target_aman = np.where(found_target, target_aman, price * 1.05)
+        target_moon = np.where(found_target, target_moon, price * 1.15)
+        fib_note = np.where(found_target, [f"Fib {fib_levels[k]}" for k in np.maximum(idx, 0)], "Blue Sky")
+
+        target_aman = trade_params.round_tick(target_aman, -1)
+        target_moon = trade_params.round_tick(target_moon, -1)
+        stop_loss = trade_params.round_tick(stop_loss, -1)
+
+        risk = price - stop_loss
+        risk = np.where(risk <= 0, 0.1, risk)
+        rr = (target_aman - price) / risk
+
+        potensi_aman = ((target_aman - price) / price) * 100
+        potensi_moon = ((target_moon - price) / price) * 100
+
+        score = c["score"].to_numpy()
+        action = np.select([(score >= 85) & (rr >= 2), (score >= 70) & (rr >= 1.5)],
+                           ["💎 STRONG BUY", "🟢 BUY"], "⚪ WATCHLIST")
+
+        # SL / target NaN (data tidak lengkap) -> ticker dilewati, sama seperti error int() per ticker
+        finite = np.isfinite(stop_loss) & np.isfinite(target_aman) & np.isfinite(target_moon)
+
+        for k, row in enumerate(c["row"]):
+            if not finite[k]:
+                continue
+            results.append({
+                **row,
+                "Action": action[k],
+                "Risk/Reward": round(rr[k], 2),
+                "Target Aman": int(target_aman[k]),
+                "Level Target": fib_note[k],
+                "Target Moon": int(target_moon[k]),
+                "Potensi Aman (%)": round(potensi_aman[k], 2),
+                "Potensi Moon (%)": round(potensi_moon[k], 2),
+                "Stop Loss": int(stop_loss[k]),
+            })
+
     df_result = pd.DataFrame(results)
 
     desired_order = [
@@ -8,7 +8,6 @@
 # ==========================================
 
 import numpy as np
-import yfinance as yf
 import pandas as pd
 import gspread
 from gspread_dataframe import set_with_dataframe
@@ -20,6 +19,10 @@ import os
 import time
 from google.oauth2.service_account import Credentials
 
+import data_cache
+import shared_mem
+import analog_search
+
 warnings.filterwarnings('ignore')
 
 SPREADSHEET_ID = "1QbdNwITMBF0MZXh3ousJ8WwHFYIaAxNxzNPwHOtSXlo"
@@ -32,6 +35,26 @@ SWING_LENGTH          = 50   # Swing Structure (sama dengan LuxAlgo default swin
 OB_FILTER_ATR_PERIOD  = 200  # ATR period untuk filter OB volatilitas tinggi (LuxAlgo pakai 200)
 MAX_OB_LOOKBACK       = 50   # Maksimal candle lookback saat cari OB setelah BOS
 
+# Skala struktur yang dihitung dalam satu pass (label -> panjang swing)
+# Tambah level baru cukup di sini, mis. "Intermediate": 20
+STRUCTURE_LENGTHS = {
+    "Internal": INTERNAL_SWING_LENGTH,
+    "Swing"   : SWING_LENGTH,
+}
+
+# Event log SMC historis (parquet), ditulis setiap run
+SMC_EVENT_LOG_PATH = os.path.join(data_cache.CACHE_DIR, "smc_events.parquet")
+
+# Sheet analog historis untuk emiten dengan aksi BUY / sentuh Bullish OB (analog_search)
+ANALOG_SHEET = "ANALOG_KCOB"
+
+# ==========================================
+# PARAMETER VWAP
+# ==========================================
+VWAP_MODES         = ("W", "M", "ANCHOR")  # W=mingguan, M=bulanan, Q=kuartalan, ANCHOR=dari pivot swing
+VWAP_BAND_MULT     = 2.0
+VWAP_ANCHOR_LENGTH = SWING_LENGTH          # Panjang swing untuk anchor VWAP
+
 
 # ==========================================
 # GOOGLE SHEET CONNECTION
@@ -106,133 +129,244 @@ def get_swing_points(df, length):
 # ==========================================
 # SMC STEP 3: Deteksi BOS / CHoCH + Order Blocks
 # Mirip LuxAlgo displayStructure()
+# Multi-scale: array harga, parsed H/L dan mitigasi dihitung sekali,
+# lalu tiap panjang swing hanya berjalan per pivot (bukan per bar)
 # ==========================================
-def detect_structure_and_ob(df, parsed_high, parsed_low, swing_high, swing_low, atr_200, label="Swing"):
+def _prepare_structure_arrays(df, parsed_high, parsed_low):
     """
-    Mengembalikan list of dict Order Block:
-    {
-        'type'       : 'Bullish' atau 'Bearish',
-        'structure'  : 'BOS' atau 'CHoCH',
-        'ob_high'    : float,
-        'ob_low'     : float,
-        'ob_idx'     : int (bar index OB),
-        'active'     : bool,
-        'label'      : label (Internal/Swing)
+    Array bersama untuk semua skala struktur.
+    suffix_min_low[k] = min(low[k:]), suffix_max_high[k] = max(high[k:])
+    dipakai untuk cek mitigasi OB dalam O(1) per OB.
+    """
+    highs = df['High'].values.astype(float)
+    lows  = df['Low'].values.astype(float)
+    return {
+        'closes'         : df['Close'].values.astype(float),
+        'highs'          : highs,
+        'lows'           : lows,
+        'ph'             : np.asarray(parsed_high, dtype=float),
+        'pl'             : np.asarray(parsed_low, dtype=float),
+        'suffix_min_low' : np.fmin.accumulate(lows[::-1])[::-1],
+        'suffix_max_high': np.fmax.accumulate(highs[::-1])[::-1],
     }
+
+
+def _first_cross(values, start, stop, level, above):
+    """Index pertama di [start, stop) dimana values menembus level, -1 jika tidak ada."""
+    segment = values[start:stop]
+    hits    = np.flatnonzero(segment > level) if above else np.flatnonzero(segment < level)
+    return start + int(hits[0]) if hits.size else -1
+
+
+def _structure_for_scale(arr, swing_high, swing_low, label, events_out=None):
+    """
+    BOS/CHoCH + OB untuk satu set pivot.
+    Sebuah pivot aktif sejak bar pivot hingga pivot berikutnya (jenis yang sama);
+    crossover pertama di rentang itu = break struktur (mirip flag 'crossed' LuxAlgo).
+    events_out : list opsional; tiap break struktur ditambahkan sebagai dict
+                 (bar, jenis, level, OB, bar mitigasi) untuk event log historis.
     """
-    closes       = df['Close'].values
-    highs        = df['High'].values
-    lows         = df['Low'].values
-    ph_arr       = parsed_high.values
-    pl_arr       = parsed_low.values
-    sh_arr       = swing_high.values   # bool
-    sl_arr       = swing_low.values    # bool
-
-    n = len(df)
-
-    # State
-    last_swing_high_price = np.nan
-    last_swing_high_idx   = -1
-    last_swing_low_price  = np.nan
-    last_swing_low_idx    = -1
-    trend_bias            = 0   # 0=unknown, 1=BULLISH, -1=BEARISH
-
-    # Simpan semua pivot yang terdeteksi (untuk crossed logic)
-    swing_high_crossed = False
-    swing_low_crossed  = False
+    closes, highs, lows = arr['closes'], arr['highs'], arr['lows']
+    n = len(closes)
 
-    order_blocks = []
+    # (bar break, 0=Bullish/1=Bearish, bar pivot) — Bullish dicek lebih dulu di bar yang sama
+    events = []
+
+    sh_idx = np.flatnonzero(np.asarray(swing_high, dtype=bool))
+    for pivot, stop in zip(sh_idx, np.append(sh_idx[1:], n)):
+        j = _first_cross(closes, pivot, stop, highs[pivot], above=True)
+        if j >= 0:
+            events.append((j, 0, pivot))
+
+    sl_idx = np.flatnonzero(np.asarray(swing_low, dtype=bool))
+    for pivot, stop in zip(sl_idx, np.append(sl_idx[1:], n)):
+        j = _first_cross(closes, pivot, stop, lows[pivot], above=False)
+        if j >= 0:
+            events.append((j, 1, pivot))
 
-    for i in range(n):
-        # Update swing pivot saat terdeteksi
-        if sh_arr[i]:
-            last_swing_high_price  = highs[i]
-            last_swing_high_idx    = i
-            swing_high_crossed     = False
-
-        if sl_arr[i]:
-            last_swing_low_price   = lows[i]
-            last_swing_low_idx     = i
-            swing_low_crossed      = False
-
-        # --- Deteksi Bullish BOS/CHoCH (close crossover swing high) ---
-        if (not np.isnan(last_swing_high_price)
-                and closes[i] > last_swing_high_price
-                and not swing_high_crossed
-                and last_swing_high_idx >= 0):
-
-            swing_high_crossed = True
-            structure_type     = 'CHoCH' if trend_bias == -1 else 'BOS'
-            trend_bias         = 1  # BULLISH
-
-            # Cari Bullish OB: candle dengan parsed_low minimum
-            # antara last_swing_high_idx dan i (mirip storeOrderBlock BULLISH)
-            search_start = last_swing_high_idx
-            search_end   = i
-            if search_end > search_start:
-                segment   = pl_arr[search_start:search_end]
-                local_idx = int(np.argmin(segment))
-                ob_idx    = search_start + local_idx
-                ob_high   = ph_arr[ob_idx]
-                ob_low    = pl_arr[ob_idx]
+    events.sort()
 
+    trend_bias   = 0   # 0=unknown, 1=BULLISH, -1=BEARISH
+    order_blocks = []
+    ob_records   = []  # (OB, record event log) untuk diisi bar mitigasi
+
+    for i, kind, pivot in events:
+        n_ob = len(order_blocks)
+        if kind == 0:
+            structure_type = 'CHoCH' if trend_bias == -1 else 'BOS'
+            trend_bias     = 1
+            if i > pivot:
+                # Bullish OB: candle dengan parsed_low minimum antara pivot dan bar break
+                ob_idx = pivot + int(np.argmin(arr['pl'][pivot:i]))
                 order_blocks.append({
                     'type'       : 'Bullish',
                     'structure'  : structure_type,
-                    'ob_high'    : ob_high,
-                    'ob_low'     : ob_low,
+                    'ob_high'    : arr['ph'][ob_idx],
+                    'ob_low'     : arr['pl'][ob_idx],
                     'ob_idx'     : ob_idx,
                     'active'     : True,
                     'label'      : label
                 })
-
-        # --- Deteksi Bearish BOS/CHoCH (close crossunder swing low) ---
-        if (not np.isnan(last_swing_low_price)
-                and closes[i] < last_swing_low_price
-                and not swing_low_crossed
-                and last_swing_low_idx >= 0):
-
-            swing_low_crossed  = True
-            structure_type     = 'CHoCH' if trend_bias == 1 else 'BOS'
-            trend_bias         = -1  # BEARISH
-
-            # Cari Bearish OB: candle dengan parsed_high maximum
-            search_start = last_swing_low_idx
-            search_end   = i
-            if search_end > search_start:
-                segment   = ph_arr[search_start:search_end]
-                local_idx = int(np.argmax(segment))
-                ob_idx    = search_start + local_idx
-                ob_high   = ph_arr[ob_idx]
-                ob_low    = pl_arr[ob_idx]
-
+        else:
+            structure_type = 'CHoCH' if trend_bias == 1 else 'BOS'
+            trend_bias     = -1
+            if i > pivot:
+                # Bearish OB: candle dengan parsed_high maximum
+                ob_idx = pivot + int(np.argmax(arr['ph'][pivot:i]))
                 order_blocks.append({
                     'type'       : 'Bearish',
                     'structure'  : structure_type,
-                    'ob_high'    : ob_high,
-                    'ob_low'     : ob_low,
+                    'ob_high'    : arr['ph'][ob_idx],
+                    'ob_low'     : arr['pl'][ob_idx],
                     'ob_idx'     : ob_idx,
                     'active'     : True,
                     'label'      : label
                 })
 
+        if events_out is not None:
+            ob = order_blocks[-1] if len(order_blocks) > n_ob else None
+            record = {
+                'scale'         : label,
+                'bar_idx'       : i,
+                'event'         : structure_type,
+                'direction'     : 'Bullish' if kind == 0 else 'Bearish',
+                'level'         : highs[pivot] if kind == 0 else lows[pivot],
+                'pivot_idx'     : pivot,
+                'ob_idx'        : ob['ob_idx'] if ob else -1,
+                'ob_high'       : ob['ob_high'] if ob else np.nan,
+                'ob_low'        : ob['ob_low'] if ob else np.nan,
+                'mitigation_idx': -1,
+            }
+            events_out.append(record)
+            if ob:
+                ob_records.append((ob, record))
+
     # --- Mitigasi OB (mirip deleteOrderBlocks LuxAlgo: High/Low mode) ---
-    # Bullish OB mitigated jika low < ob_low
-    # Bearish OB mitigated jika high > ob_high
-    # Cek dari bar setelah OB terbentuk hingga bar terakhir
+    # Bullish OB mitigated jika low < ob_low setelah bar OB
+    # Bearish OB mitigated jika high > ob_high setelah bar OB
     for ob in order_blocks:
         start = ob['ob_idx'] + 1
-        for j in range(start, n):
-            if ob['type'] == 'Bullish' and lows[j] < ob['ob_low']:
-                ob['active'] = False
-                break
-            if ob['type'] == 'Bearish' and highs[j] > ob['ob_high']:
-                ob['active'] = False
-                break
+        if start >= n:
+            continue
+        if ob['type'] == 'Bullish' and arr['suffix_min_low'][start] < ob['ob_low']:
+            ob['active'] = False
+        elif ob['type'] == 'Bearish' and arr['suffix_max_high'][start] > ob['ob_high']:
+            ob['active'] = False
+
+    # Bar mitigasi pertama hanya dicari untuk event log (OB yang sudah tidak aktif)
+    for ob, record in ob_records:
+        if ob['active']:
+            continue
+        start = ob['ob_idx'] + 1
+        if ob['type'] == 'Bullish':
+            hit = lows[start:] < ob['ob_low']
+        else:
+            hit = highs[start:] > ob['ob_high']
+        record['mitigation_idx'] = start + int(np.argmax(hit))
 
     return order_blocks
 
 
+def detect_structure_and_ob(df, parsed_high, parsed_low, swing_high, swing_low, atr_200, label="Swing"):
+    """
+    Mengembalikan list of dict Order Block:
+    {
+        'type'       : 'Bullish' atau 'Bearish',
+        'structure'  : 'BOS' atau 'CHoCH',
+        'ob_high'    : float,
+        'ob_low'     : float,
+        'ob_idx'     : int (bar index OB),
+        'active'     : bool,
+        'label'      : label (Internal/Swing)
+    }
+    """
+    arr = _prepare_structure_arrays(df, parsed_high, parsed_low)
+    return _structure_for_scale(arr, swing_high, swing_low, label)
+
+
+def detect_structure_multi(df, parsed_high, parsed_low, lengths=None, events_out=None):
+    """
+    BOS/CHoCH + OB untuk beberapa panjang swing sekaligus.
+    lengths    : dict {label: swing_length}, default STRUCTURE_LENGTHS
+    events_out : list opsional untuk menampung semua event struktur (lihat build_smc_event_table)
+    Return     : dict {label: list OB} dengan format sama seperti detect_structure_and_ob
+    """
+    if lengths is None:
+        lengths = STRUCTURE_LENGTHS
+
+    arr = _prepare_structure_arrays(df, parsed_high, parsed_low)
+    result = {}
+    for label, length in lengths.items():
+        swing_high, swing_low = get_swing_points(df, length)
+        result[label] = _structure_for_scale(arr, swing_high.values, swing_low.values, label, events_out)
+    return result
+
+
+# ==========================================
+# SMC EVENT LOG (Histori BOS/CHoCH + OB, format kolumnar)
+# ==========================================
+SMC_EVENT_COLUMNS = [
+    "ticker", "date", "scale", "event", "direction", "level",
+    "ob_date", "ob_high", "ob_low", "mitigation_date",
+]
+
+
+def build_smc_event_table(ticker, dates, events):
+    """
+    Ubah list event dari detect_structure_multi(events_out=...) menjadi tabel ringkas:
+    ticker, date (bar break), scale, event (BOS/CHoCH), direction, level (harga pivot),
+    ob_date, ob_high, ob_low, mitigation_date (NaT jika OB masih aktif; dihitung sejak
+    bar OB, sama dengan aturan flag active).
+    """
+    if not events:
+        return pd.DataFrame(columns=SMC_EVENT_COLUMNS)
+
+    dates  = pd.DatetimeIndex(pd.to_datetime(dates))
+    ev     = pd.DataFrame(events)
+    nat    = np.datetime64('NaT')
+
+    def idx_to_date(idx):
+        idx = ev[idx].values
+        return np.where(idx >= 0, dates.values[np.clip(idx, 0, None)], nat)
+
+    table = pd.DataFrame({
+        "ticker"          : pd.Categorical([ticker] * len(ev)),
+        "date"            : dates.values[ev['bar_idx'].values],
+        "scale"           : pd.Categorical(ev['scale']),
+        "event"           : pd.Categorical(ev['event'], categories=['BOS', 'CHoCH']),
+        "direction"       : pd.Categorical(ev['direction'], categories=['Bullish', 'Bearish']),
+        "level"           : ev['level'].astype('float32'),
+        "ob_date"         : idx_to_date('ob_idx'),
+        "ob_high"         : ev['ob_high'].astype('float32'),
+        "ob_low"          : ev['ob_low'].astype('float32'),
+        "mitigation_date" : idx_to_date('mitigation_idx'),
+    })
+    return table.sort_values("date", kind="stable").reset_index(drop=True)
+
+
+def save_smc_event_log(tables, path=None):
+    """Gabungkan tabel event semua ticker dan simpan sebagai parquet (kolumnar)."""
+    path   = path or SMC_EVENT_LOG_PATH
+    tables = [t for t in tables if t is not None and not t.empty]
+    if not tables:
+        return None
+    log = pd.concat(tables, ignore_index=True)
+    for col in ("ticker", "scale", "event", "direction"):
+        log[col] = log[col].astype('category')
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    log.to_parquet(path, index=False)
+    print(f"💾 SMC event log: {len(log)} event, {log['ticker'].nunique()} ticker -> {path}")
+    return log
+
+
+def load_smc_event_log(path=None, columns=None, filters=None):
+    """
+    Baca event log untuk riset/backtest.
+    filters memakai format pyarrow, mis. [("event", "==", "CHoCH"), ("scale", "==", "Swing")]
+    """
+    return pd.read_parquet(path or SMC_EVENT_LOG_PATH, columns=columns, filters=filters)
+
+
 # ==========================================
 # SMC STEP 4: Fair Value Gap (FVG)
 # LuxAlgo: bullishFVG = low[0] > high[2] dan close[1] > high[2]
@@ -290,6 +424,106 @@ def detect_fvg(df):
     return fvg_list
 
 
+# ==========================================
+# SMC HTF: Struktur Weekly dari bar resample
+# ==========================================
+def get_htf_structure_status(df_htf, length=INTERNAL_SWING_LENGTH):
+    """
+    Bias struktur timeframe tinggi = arah break struktur terakhir (BOS/CHoCH)
+    pada bar weekly, memakai engine SMC yang sama dengan daily.
+    """
+    if df_htf is None or len(df_htf) < 2 * length + 2:
+        return "⚪ Data Kurang"
+
+    atr_htf          = calc_atr(df_htf, OB_FILTER_ATR_PERIOD)
+    ph_htf, pl_htf   = get_parsed_hl(df_htf, atr_htf)
+    obs              = detect_structure_multi(df_htf, ph_htf, pl_htf, {"HTF": length})["HTF"]
+    if not obs:
+        return "⚪ Belum Ada Struktur"
+
+    last = obs[-1]
+    icon = "🟢" if last['type'] == 'Bullish' else "🔴"
+    return f"{icon} {last['type']} [{last['structure']}]"
+
+
+# ==========================================
+# VWAP ENGINE: Segmented Cumulative Sum
+# Semua mode (W/M/Q/ANCHOR) dihitung bersama di atas raw array,
+# tanpa menambah kolom ke DataFrame input
+# ==========================================
+def _segment_starts(dates, mode, anchors=None):
+    """
+    Index bar awal segmen untuk tiap bar.
+    W : minggu Senin–Minggu (sama dengan to_period('W'))
+    M : bulan kalender, Q : kuartal kalender
+    ANCHOR : segmen baru di setiap bar anchor (mis. pivot swing)
+    """
+    n = len(dates)
+    if mode == "ANCHOR":
+        is_start = np.zeros(n, dtype=bool) if anchors is None else np.asarray(anchors, dtype=bool).copy()
+    else:
+        days = dates.astype('datetime64[D]').astype(np.int64)
+        if mode == "W":
+            key = (days + 3) // 7            # 1970-01-01 = Kamis -> geser ke Senin
+        elif mode == "M":
+            key = dates.astype('datetime64[M]').astype(np.int64)
+        elif mode == "Q":
+            key = dates.astype('datetime64[M]').astype(np.int64) // 3
+        else:
+            raise ValueError(f"VWAP mode tidak dikenal: {mode}")
+        is_start = np.empty(n, dtype=bool)
+        is_start[1:] = key[1:] != key[:-1]
+    if n:
+        is_start[0] = True
+    return np.maximum.accumulate(np.where(is_start, np.arange(n), 0))
+
+
+def _segmented_cumsum(values, starts):
+    """
+    Cumsum per segmen untuk array 2D (k, n): total kumulatif dikurangi
+    nilai kumulatif tepat sebelum awal segmen masing-masing bar.
+    """
+    padded = np.zeros((values.shape[0], values.shape[1] + 1))
+    np.cumsum(values, axis=1, out=padded[:, 1:])
+    return padded[:, 1:] - np.take_along_axis(padded, starts, axis=1)
+
+
+def calc_vwap_bands(df, modes=VWAP_MODES, anchors=None, mult=VWAP_BAND_MULT):
+    """
+    Anchored VWAP + band sigma untuk beberapa mode sekaligus.
+    df      : DataFrame dengan kolom Date, High, Low, Close, Volume (tidak diubah)
+    anchors : boolean array bar anchor untuk mode ANCHOR
+    Return  : DataFrame (index sama dengan df) berisi kolom
+              VWAP_<mode>, VWAP_<mode>_Stdev, VWAP_<mode>_Upper, VWAP_<mode>_Lower
+    Stdev mengikuti rumus lama: deviasi TP terhadap VWAP berjalan, dibobot volume.
+    """
+    modes  = list(modes)
+    dates  = pd.to_datetime(df['Date']).values.astype('datetime64[ns]')
+    tp     = ((df['High'].values + df['Low'].values + df['Close'].values) / 3).astype(float)
+    vol    = np.nan_to_num(df['Volume'].values.astype(float))
+    tp_vol = np.nan_to_num(tp * vol)
+
+    starts = np.vstack([_segment_starts(dates, m, anchors) for m in modes])
+    k      = len(modes)
+
+    cum = _segmented_cumsum(np.vstack([np.tile(tp_vol, (k, 1)), np.tile(vol, (k, 1))]),
+                            np.vstack([starts, starts]))
+    cum_tpv, cum_vol = cum[:k], cum[k:]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vwap   = cum_tpv / cum_vol
+        dev_sq = np.nan_to_num((tp - vwap) ** 2 * vol)
+        stdev  = np.sqrt(_segmented_cumsum(dev_sq, starts) / cum_vol)
+
+    out = {}
+    for j, m in enumerate(modes):
+        out[f'VWAP_{m}']       = vwap[j]
+        out[f'VWAP_{m}_Stdev'] = stdev[j]
+        out[f'VWAP_{m}_Upper'] = vwap[j] + mult * stdev[j]
+        out[f'VWAP_{m}_Lower'] = vwap[j] - mult * stdev[j]
+    return pd.DataFrame(out, index=df.index)
+
+
 # ==========================================
 # FUNGSI UTAMA STATUS OB TERHADAP HARGA
 # ==========================================
@@ -339,357 +573,377 @@ def get_ob_touch_status(price, active_obs):
 # ==========================================
 # ANALYZE FUNCTION
 # ==========================================
-def analyze_sector(sector_name, ticker_list):
-    tz_jkt       = pytz.timezone("Asia/Jakarta")
-    waktu_update = datetime.now(tz_jkt).strftime("%Y-%m-%d %H:%M:%S")
+def analyze_ticker(ticker, df, df_htf, waktu_update, collect_events=False):
+    """
+    Analisa KC + VWAP + SMC untuk satu ticker (dipanggil di worker pool).
+    df     : OHLCV harian ber-index Date, df_htf : OHLCV weekly
+    Return : (row dict untuk sheet atau None, tabel event SMC atau None)
+    """
+    if df is None or df.empty or len(df) < 120:
+        return None, None
 
-    results = []
-    print(f"\n🚀 Scan {sector_name} | Total: {len(ticker_list)} saham")
+    try:
+        df = df.copy()
+        df.reset_index(inplace=True)
+
+        # ============================================
+        # 1. KELTNER CHANNEL
+        # ============================================
+        df['EMA_20'] = df['Close'].ewm(span=20, adjust=False).mean()
+
+        hl  = df['High'] - df['Low']
+        hc  = (df['High'] - df['Close'].shift(1)).abs()
+        lc  = (df['Low']  - df['Close'].shift(1)).abs()
+        tr  = pd.concat([hl, hc, lc], axis=1).max(axis=1)
+        df['ATR_10']    = tr.ewm(alpha=1/10, adjust=False).mean()
+        df['KCUe_20_2'] = df['EMA_20'] + (2.0 * df['ATR_10'])
+        df['KCLe_20_2'] = df['EMA_20'] - (2.0 * df['ATR_10'])
+        df['KCMa_20_2'] = df['EMA_20']
+
+        # ============================================
+        # 2. VWAP BANDS (WEEKLY + MONTHLY + ANCHORED)
+        # ============================================
+        if df['Date'].dtype != 'datetime64[ns]':
+            df['Date'] = pd.to_datetime(df['Date'])
+        if hasattr(df['Date'].iloc[0], 'tzinfo') and df['Date'].iloc[0].tzinfo is not None:
+            df['Date'] = df['Date'].dt.tz_localize(None)
+
+        sh_anchor, sl_anchor = get_swing_points(df, VWAP_ANCHOR_LENGTH)
+        vwap = calc_vwap_bands(df, anchors=(sh_anchor | sl_anchor).values)
+
+        # ============================================
+        # 3. KONFIRMASI CANDLE
+        # Cek apakah 1-2 candle terakhir bullish (close > open)
+        # ============================================
+        c_close1 = float(df['Close'].iloc[-1])
+        c_open1  = float(df['Open'].iloc[-1])
+        c_close2 = float(df['Close'].iloc[-2])
+        c_open2  = float(df['Open'].iloc[-2])
+
+        candle1_bull = c_close1 > c_open1
+        candle2_bull = c_close2 > c_open2
+
+        if candle1_bull and candle2_bull:
+            candle_status = "🟢 2 Candle Bullish"
+        elif candle1_bull:
+            candle_status = "🟡 Candle Hari Ini Bullish"
+        elif candle2_bull:
+            candle_status = "🟡 Candle Kemarin Bullish"
+        else:
+            candle_status = "🔴 2 Candle Bearish"
+
+        # ============================================
+        # 4. SMC — ATR 200 untuk filter OB
+        # ============================================
+        atr_200 = calc_atr(df, OB_FILTER_ATR_PERIOD)
+
+        parsed_high, parsed_low = get_parsed_hl(df, atr_200)
+
+        # --- Order Blocks semua skala (Internal=5, Swing=50) dalam satu pass ---
+        smc_events  = [] if collect_events else None
+        structure   = detect_structure_multi(df, parsed_high, parsed_low, events_out=smc_events)
+        events      = build_smc_event_table(ticker, df['Date'], smc_events) if collect_events else None
+        ob_internal = structure["Internal"]
+        ob_swing    = structure["Swing"]
+
+        all_obs = [ob for obs in structure.values() for ob in obs]
+
+        # --- Fair Value Gap ---
+        fvg_list = detect_fvg(df)
+
+        # --- Struktur Weekly (HTF) ---
+        htf_status = get_htf_structure_status(df_htf)
+
+        # ============================================
+        # 5. EKSTRAKSI HARGA
+        # ============================================
+        price_today      = float(df["Close"].iloc[-1])
+        upper_kc         = float(df['KCUe_20_2'].iloc[-1])
+        middle_kc        = float(df['KCMa_20_2'].iloc[-1])
+        lower_kc         = float(df['KCLe_20_2'].iloc[-1])
+        vwap_today       = float(vwap['VWAP_W'].iloc[-1])
+        vwap_upper_today = float(vwap['VWAP_W_Upper'].iloc[-1])
+        vwap_lower_today = float(vwap['VWAP_W_Lower'].iloc[-1])
+        vwap_month_today = float(vwap['VWAP_M'].iloc[-1])
+        vwap_anchor_today= float(vwap['VWAP_ANCHOR'].iloc[-1])
+        atr_today        = float(df['ATR_10'].iloc[-1])
+        atr_pct          = (atr_today / price_today) * 100
+
+        # ============================================
+        # 6. STATUS SMC — OB TOUCH DETECTION & TP
+        # ============================================
+        active_obs       = [o for o in all_obs if o['active']]
+        bull_int, bull_sw, bear_int, bear_sw = get_ob_touch_status(price_today, active_obs)
+
+        # Kumpulkan semua OB aktif
+        all_active_bull_int = [o for o in ob_internal if o['active'] and o['type']=='Bullish']
+        all_active_bull_sw  = [o for o in ob_swing   if o['active'] and o['type']=='Bullish']
+        all_active_bear_int = [o for o in ob_internal if o['active'] and o['type']=='Bearish']
+        all_active_bear_sw  = [o for o in ob_swing   if o['active'] and o['type']=='Bearish']
+
+        # OB paling baru (latest bar index)
+        def latest_ob(obs_list):
+            if not obs_list: return None
+            return max(obs_list, key=lambda x: x['ob_idx'])
+
+        nearest_bull_int = latest_ob(all_active_bull_int)
+        nearest_bull_sw  = latest_ob(all_active_bull_sw)
+        nearest_bear_int = latest_ob(all_active_bear_int)
+        nearest_bear_sw  = latest_ob(all_active_bear_sw)
+
+        # ============================================
+        # TP = ob_low Bearish OB aktif TERDEKAT di atas harga
+        # Prioritas: Internal OB dulu, lalu Swing OB
+        # Fallback: EMA20 jika tidak ada Bearish OB di atas harga
+        # ============================================
+        # Kumpulkan semua Bearish OB aktif yang ob_low-nya di atas harga saat ini
+        bear_obs_above = [
+            o for o in (all_active_bear_int + all_active_bear_sw)
+            if o['ob_low'] > price_today
+        ]
 
-    for ticker in ticker_list:
-        try:
-            # Download data harian — lebih panjang agar swing 50 bisa berjalan
-            df = yf.download(
-                ticker, period="2y", interval="1d",
-                progress=False, auto_adjust=True, threads=False
-            )
+        if bear_obs_above:
+            # Terdekat = ob_low terkecil yang masih di atas harga
+            nearest_bear_tp = min(bear_obs_above, key=lambda x: x['ob_low'])
+            target_tp_price = nearest_bear_tp['ob_low']
+            tp_source       = f"Bear {nearest_bear_tp['label']} OB [{nearest_bear_tp['structure']}]"
+        else:
+            # Fallback ke EMA20
+            nearest_bear_tp = None
+            target_tp_price = float(df['KCMa_20_2'].iloc[-1])
+            tp_source       = "EMA20 (fallback)"
+
+        potensi_tp_pct = ((target_tp_price - price_today) / price_today) * 100
+
+        # --- Status OB String ---
+        smc_bull_int_status = "⚪ Tidak Ada"
+        smc_bull_sw_status  = "⚪ Tidak Ada"
+        smc_bear_int_status = "⚪ Tidak Ada"
+        smc_bear_sw_status  = "⚪ Tidak Ada"
+
+        ob_touch_score = 0
+        ob_touch_label = ""
+
+        # Bullish Internal OB
+        if bull_int:
+            ob, inside = bull_int
+            if inside:
+                smc_bull_int_status = f"🎯 DI DALAM [{ob['structure']}]"
+                ob_touch_score += 100
+                ob_touch_label  = f"🎯 Dalam Bullish Internal OB ({ob['structure']})"
+            else:
+                smc_bull_int_status = f"🚀 BOUNCE [{ob['structure']}]"
+                ob_touch_score += 60
+                ob_touch_label  = f"🚀 Bounce Bullish Internal OB ({ob['structure']})"
+        elif nearest_bull_int:
+            ob = nearest_bull_int
+            smc_bull_int_status = f"🟡 Ada OB [{ob['structure']}]"
+
+        # Bullish Swing OB
+        if bull_sw:
+            ob, inside = bull_sw
+            if inside:
+                smc_bull_sw_status = f"🎯 DI DALAM [{ob['structure']}]"
+                ob_touch_score += 80
+                if not ob_touch_label:
+                    ob_touch_label = f"🎯 Dalam Bullish Swing OB ({ob['structure']})"
+            else:
+                smc_bull_sw_status = f"🚀 BOUNCE [{ob['structure']}]"
+                ob_touch_score += 50
+                if not ob_touch_label:
+                    ob_touch_label = f"🚀 Bounce Bullish Swing OB ({ob['structure']})"
+        elif nearest_bull_sw:
+            ob = nearest_bull_sw
+            smc_bull_sw_status = f"🟡 Ada OB [{ob['structure']}]"
+
+        # Bearish Internal OB
+        if bear_int:
+            ob, inside = bear_int
+            if inside:
+                smc_bear_int_status = f"⚠️ DI DALAM [{ob['structure']}] (Resistensi)"
+                ob_touch_score -= 50
+            else:
+                smc_bear_int_status = f"⚠️ DEKAT [{ob['structure']}] (Resistensi)"
+                ob_touch_score -= 30
+        elif nearest_bear_int:
+            ob = nearest_bear_int
+            smc_bear_int_status = f"🟡 Ada Bearish OB [{ob['structure']}]"
+
+        # Bearish Swing OB
+        if bear_sw:
+            ob, inside = bear_sw
+            if inside:
+                smc_bear_sw_status = f"⚠️ DI DALAM [{ob['structure']}] (Resistensi)"
+                ob_touch_score -= 40
+            else:
+                smc_bear_sw_status = f"⚠️ DEKAT [{ob['structure']}] (Resistensi)"
+                ob_touch_score -= 20
+        elif nearest_bear_sw:
+            ob = nearest_bear_sw
+            smc_bear_sw_status = f"🟡 Ada Bearish OB [{ob['structure']}]"
+
+        # --- FVG Status ---
+        active_fvg      = [f for f in fvg_list if f['active']]
+        bull_fvg_active = [f for f in active_fvg if f['type'] == 'Bullish']
+        bear_fvg_active = [f for f in active_fvg if f['type'] == 'Bearish']
+
+        fvg_status = "⚪ Tidak Ada FVG"
+        for fvg in bull_fvg_active[-3:]:  # cek 3 FVG bullish terakhir
+            if fvg['bottom'] <= price_today <= fvg['top']:
+                fvg_status = "🟢 Di Dalam Bullish FVG"
+                ob_touch_score += 20
+                break
+        else:
+            for fvg in bear_fvg_active[-3:]:
+                if fvg['bottom'] <= price_today <= fvg['top']:
+                    fvg_status = "🔴 Di Dalam Bearish FVG"
+                    ob_touch_score -= 20
+                    break
 
-            if isinstance(df.columns, pd.MultiIndex):
-                df.columns = df.columns.get_level_values(0)
+        # ============================================
+        # 7. SCORING KELTNER + VWAP + RUBBER BAND
+        # ============================================
+        score      = ob_touch_score
+        kc_status  = "⚪ INSIDE KC"
+        vwap_status= "⚪ NORMAL"
+        action     = "WAIT"
 
-            if df.empty or len(df) < 120:
+        # Keltner
+        for i in range(1, 5):
+            try:
+                p_close = float(df["Close"].iloc[-i])
+                p_upper = float(df['KCUe_20_2'].iloc[-i])
+                p_lower = float(df['KCLe_20_2'].iloc[-i])
+                hari_teks = "Hari Ini" if i == 1 else f"{i-1}H Lalu"
+                if p_close > p_upper:
+                    kc_status = f"🔥 KC BREAKOUT ATAS ({hari_teks})"
+                    score -= 50; break
+                elif p_close < p_lower:
+                    kc_status = f"📉 KC BREAKOUT BAWAH ({hari_teks})"
+                    score += 30; break
+            except Exception:
                 continue
 
-            df = df.copy()
-            df.reset_index(inplace=True)
-
-            # ============================================
-            # 1. KELTNER CHANNEL
-            # ============================================
-            df['EMA_20'] = df['Close'].ewm(span=20, adjust=False).mean()
-
-            hl  = df['High'] - df['Low']
-            hc  = (df['High'] - df['Close'].shift(1)).abs()
-            lc  = (df['Low']  - df['Close'].shift(1)).abs()
-            tr  = pd.concat([hl, hc, lc], axis=1).max(axis=1)
-            df['ATR_10']    = tr.ewm(alpha=1/10, adjust=False).mean()
-            df['KCUe_20_2'] = df['EMA_20'] + (2.0 * df['ATR_10'])
-            df['KCLe_20_2'] = df['EMA_20'] - (2.0 * df['ATR_10'])
-            df['KCMa_20_2'] = df['EMA_20']
-
-            # ============================================
-            # 2. VWAP BANDS (WEEKLY)
-            # ============================================
-            if df['Date'].dtype != 'datetime64[ns]':
-                df['Date'] = pd.to_datetime(df['Date'])
-            if hasattr(df['Date'].iloc[0], 'tzinfo') and df['Date'].iloc[0].tzinfo is not None:
-                df['Date'] = df['Date'].dt.tz_localize(None)
-
-            df['Week']  = df['Date'].dt.to_period('W')
-            df['TP']    = (df['High'] + df['Low'] + df['Close']) / 3
-            df['TPV']   = df['TP'] * df['Volume']
-
-            df['Cum_TPV']       = df.groupby('Week')['TPV'].cumsum()
-            df['Cum_Vol']       = df.groupby('Week')['Volume'].cumsum()
-            df['VWAP']          = df['Cum_TPV'] / df['Cum_Vol']
-            df['Dev']           = df['TP'] - df['VWAP']
-            df['Dev_Sq_Vol']    = (df['Dev'] ** 2) * df['Volume']
-            df['Cum_Dev_Sq_Vol']= df.groupby('Week')['Dev_Sq_Vol'].cumsum()
-            df['VWAP_Stdev']    = np.sqrt(df['Cum_Dev_Sq_Vol'] / df['Cum_Vol'])
-            df['VWAP_Upper']    = df['VWAP'] + (2.0 * df['VWAP_Stdev'])
-            df['VWAP_Lower']    = df['VWAP'] - (2.0 * df['VWAP_Stdev'])
-
-            # ============================================
-            # 3. KONFIRMASI CANDLE
-            # Cek apakah 1-2 candle terakhir bullish (close > open)
-            # ============================================
-            c_close1 = float(df['Close'].iloc[-1])
-            c_open1  = float(df['Open'].iloc[-1])
-            c_close2 = float(df['Close'].iloc[-2])
-            c_open2  = float(df['Open'].iloc[-2])
-
-            candle1_bull = c_close1 > c_open1
-            candle2_bull = c_close2 > c_open2
-
-            if candle1_bull and candle2_bull:
-                candle_status = "🟢 2 Candle Bullish"
-            elif candle1_bull:
-                candle_status = "🟡 Candle Hari Ini Bullish"
-            elif candle2_bull:
-                candle_status = "🟡 Candle Kemarin Bullish"
+        # VWAP + Rubber Band
+        is_deep_oversold = (price_today < lower_kc) and (price_today < vwap_lower_today)
+
+        if price_today > vwap_upper_today:
+            vwap_status = "🔥 OVERVALUED"
+            score -= 50
+        elif is_deep_oversold:
+            vwap_status = "🧊 DEEP OVERSOLD"
+            if atr_pct >= 3.0 and potensi_tp_pct >= 10.0:
+                score += 100
             else:
-                candle_status = "🔴 2 Candle Bearish"
-
-            # ============================================
-            # 4. SMC — ATR 200 untuk filter OB
-            # ============================================
-            atr_200 = calc_atr(df, OB_FILTER_ATR_PERIOD)
-
-            parsed_high, parsed_low = get_parsed_hl(df, atr_200)
-
-            # --- Swing Points Internal (length=5) ---
-            sh_internal, sl_internal = get_swing_points(df, INTERNAL_SWING_LENGTH)
-
-            # --- Swing Points Swing (length=50) ---
-            sh_swing, sl_swing = get_swing_points(df, SWING_LENGTH)
-
-            # --- Order Blocks Internal ---
-            ob_internal = detect_structure_and_ob(
-                df, parsed_high, parsed_low,
-                sh_internal, sl_internal, atr_200, label="Internal"
-            )
-
-            # --- Order Blocks Swing ---
-            ob_swing = detect_structure_and_ob(
-                df, parsed_high, parsed_low,
-                sh_swing, sl_swing, atr_200, label="Swing"
-            )
-
-            all_obs = ob_internal + ob_swing
-
-            # --- Fair Value Gap ---
-            fvg_list = detect_fvg(df)
-
-            # ============================================
-            # 5. EKSTRAKSI HARGA
-            # ============================================
-            price_today      = float(df["Close"].iloc[-1])
-            upper_kc         = float(df['KCUe_20_2'].iloc[-1])
-            middle_kc        = float(df['KCMa_20_2'].iloc[-1])
-            lower_kc         = float(df['KCLe_20_2'].iloc[-1])
-            vwap_today       = float(df['VWAP'].iloc[-1])
-            vwap_upper_today = float(df['VWAP_Upper'].iloc[-1])
-            vwap_lower_today = float(df['VWAP_Lower'].iloc[-1])
-            atr_today        = float(df['ATR_10'].iloc[-1])
-            atr_pct          = (atr_today / price_today) * 100
-
-            # ============================================
-            # 6. STATUS SMC — OB TOUCH DETECTION & TP
-            # ============================================
-            active_obs       = [o for o in all_obs if o['active']]
-            bull_int, bull_sw, bear_int, bear_sw = get_ob_touch_status(price_today, active_obs)
-
-            # Kumpulkan semua OB aktif
-            all_active_bull_int = [o for o in ob_internal if o['active'] and o['type']=='Bullish']
-            all_active_bull_sw  = [o for o in ob_swing   if o['active'] and o['type']=='Bullish']
-            all_active_bear_int = [o for o in ob_internal if o['active'] and o['type']=='Bearish']
-            all_active_bear_sw  = [o for o in ob_swing   if o['active'] and o['type']=='Bearish']
-
-            # OB paling baru (latest bar index)
-            def latest_ob(obs_list):
-                if not obs_list: return None
-                return max(obs_list, key=lambda x: x['ob_idx'])
-
-            nearest_bull_int = latest_ob(all_active_bull_int)
-            nearest_bull_sw  = latest_ob(all_active_bull_sw)
-            nearest_bear_int = latest_ob(all_active_bear_int)
-            nearest_bear_sw  = latest_ob(all_active_bear_sw)
-
-            # ============================================
-            # TP = ob_low Bearish OB aktif TERDEKAT di atas harga
-            # Prioritas: Internal OB dulu, lalu Swing OB
-            # Fallback: EMA20 jika tidak ada Bearish OB di atas harga
-            # ============================================
-            # Kumpulkan semua Bearish OB aktif yang ob_low-nya di atas harga saat ini
-            bear_obs_above = [
-                o for o in (all_active_bear_int + all_active_bear_sw)
-                if o['ob_low'] > price_today
-            ]
-
-            if bear_obs_above:
-                # Terdekat = ob_low terkecil yang masih di atas harga
-                nearest_bear_tp = min(bear_obs_above, key=lambda x: x['ob_low'])
-                target_tp_price = nearest_bear_tp['ob_low']
-                tp_source       = f"Bear {nearest_bear_tp['label']} OB [{nearest_bear_tp['structure']}]"
+                score += 40
+        elif price_today < vwap_lower_today:
+            vwap_status = "🧊 UNDERVALUED"
+            score += 20
+
+        # ============================================
+        # 8. ACTION — Prioritas: Harga Menyentuh Bullish OB
+        # Konfirmasi: minimal 1 candle bullish terakhir
+        # ============================================
+        if ob_touch_label:
+            if candle1_bull or candle2_bull:
+                action = f"🟢 BUY: {ob_touch_label}"
+                score += 50
             else:
-                # Fallback ke EMA20
-                nearest_bear_tp = None
-                target_tp_price = float(df['KCMa_20_2'].iloc[-1])
-                tp_source       = "EMA20 (fallback)"
-
-            potensi_tp_pct = ((target_tp_price - price_today) / price_today) * 100
-
-            # --- Status OB String ---
-            smc_bull_int_status = "⚪ Tidak Ada"
-            smc_bull_sw_status  = "⚪ Tidak Ada"
-            smc_bear_int_status = "⚪ Tidak Ada"
-            smc_bear_sw_status  = "⚪ Tidak Ada"
-
-            ob_touch_score = 0
-            ob_touch_label = ""
-
-            # Bullish Internal OB
-            if bull_int:
-                ob, inside = bull_int
-                if inside:
-                    smc_bull_int_status = f"🎯 DI DALAM [{ob['structure']}]"
-                    ob_touch_score += 100
-                    ob_touch_label  = f"🎯 Dalam Bullish Internal OB ({ob['structure']})"
-                else:
-                    smc_bull_int_status = f"🚀 BOUNCE [{ob['structure']}]"
-                    ob_touch_score += 60
-                    ob_touch_label  = f"🚀 Bounce Bullish Internal OB ({ob['structure']})"
-            elif nearest_bull_int:
-                ob = nearest_bull_int
-                smc_bull_int_status = f"🟡 Ada OB [{ob['structure']}]"
-
-            # Bullish Swing OB
-            if bull_sw:
-                ob, inside = bull_sw
-                if inside:
-                    smc_bull_sw_status = f"🎯 DI DALAM [{ob['structure']}]"
-                    ob_touch_score += 80
-                    if not ob_touch_label:
-                        ob_touch_label = f"🎯 Dalam Bullish Swing OB ({ob['structure']})"
-                else:
-                    smc_bull_sw_status = f"🚀 BOUNCE [{ob['structure']}]"
-                    ob_touch_score += 50
-                    if not ob_touch_label:
-                        ob_touch_label = f"🚀 Bounce Bullish Swing OB ({ob['structure']})"
-            elif nearest_bull_sw:
-                ob = nearest_bull_sw
-                smc_bull_sw_status = f"🟡 Ada OB [{ob['structure']}]"
-
-            # Bearish Internal OB
-            if bear_int:
-                ob, inside = bear_int
-                if inside:
-                    smc_bear_int_status = f"⚠️ DI DALAM [{ob['structure']}] (Resistensi)"
-                    ob_touch_score -= 50
-                else:
-                    smc_bear_int_status = f"⚠️ DEKAT [{ob['structure']}] (Resistensi)"
-                    ob_touch_score -= 30
-            elif nearest_bear_int:
-                ob = nearest_bear_int
-                smc_bear_int_status = f"🟡 Ada Bearish OB [{ob['structure']}]"
-
-            # Bearish Swing OB
-            if bear_sw:
-                ob, inside = bear_sw
-                if inside:
-                    smc_bear_sw_status = f"⚠️ DI DALAM [{ob['structure']}] (Resistensi)"
-                    ob_touch_score -= 40
-                else:
-                    smc_bear_sw_status = f"⚠️ DEKAT [{ob['structure']}] (Resistensi)"
-                    ob_touch_score -= 20
-            elif nearest_bear_sw:
-                ob = nearest_bear_sw
-                smc_bear_sw_status = f"🟡 Ada Bearish OB [{ob['structure']}]"
+                action = f"⏳ WAIT: {ob_touch_label} (Tunggu Candle Bullish)"
+                score -= 10
+        elif ob_touch_score < 0:
+            action = "🛑 HINDARI (Di Area Bearish OB)"
+        elif score > 120:
+            action = "🔍 PANTAU KETAT (Oversold)"
+        elif vwap_status == "🔥 OVERVALUED":
+            action = "🛑 JANGAN BELI (Pucuk)"
+        else:
+            action = "⏳ WAIT"
+
+        # --- Format OB range untuk kolom ---
+        def fmt_ob(ob):
+            if ob is None: return "-"
+            return f"{int(ob['ob_low'])}-{int(ob['ob_high'])} [{ob['structure']}]"
+
+        row = {
+            "Ticker"            : ticker,
+            "Action"            : action,
+            "Score"             : score,
+            "Harga Skrg"        : int(price_today),
+            "Target TP"         : int(target_tp_price),
+            "TP Source"         : tp_source,
+            "Potensi TP (%)"    : round(potensi_tp_pct, 2),
+            "ATR (%)"           : round(atr_pct, 2),
+            # --- Konfirmasi Candle ---
+            "Candle"            : candle_status,
+            # --- SMC OB Internal ---
+            "Bull Internal OB"  : smc_bull_int_status,
+            "Bull Int OB Range" : fmt_ob(nearest_bull_int),
+            "Bear Internal OB"  : smc_bear_int_status,
+            "Bear Int OB Range" : fmt_ob(nearest_bear_int),
+            # --- SMC OB Swing ---
+            "Bull Swing OB"     : smc_bull_sw_status,
+            "Bull Sw OB Range"  : fmt_ob(nearest_bull_sw),
+            "Bear Swing OB"     : smc_bear_sw_status,
+            "Bear Sw OB Range"  : fmt_ob(nearest_bear_sw),
+            # --- FVG ---
+            "FVG Status"        : fvg_status,
+            "Struktur Weekly"   : htf_status,
+            # --- Keltner & VWAP ---
+            "Status Keltner"    : kc_status,
+            "Status VWAP"       : vwap_status,
+            "VWAP Bulanan"      : int(vwap_month_today) if np.isfinite(vwap_month_today) else "-",
+            "VWAP Anchor Swing" : int(vwap_anchor_today) if np.isfinite(vwap_anchor_today) else "-",
+            "Last Update"       : waktu_update
+        }
+        return row, events
 
-            # --- FVG Status ---
-            active_fvg      = [f for f in fvg_list if f['active']]
-            bull_fvg_active = [f for f in active_fvg if f['type'] == 'Bullish']
-            bear_fvg_active = [f for f in active_fvg if f['type'] == 'Bearish']
+    except Exception as e:
+        print(f"  -> ❌ Gagal untuk {ticker}: {e}")
+        return None, None
 
-            fvg_status = "⚪ Tidak Ada FVG"
-            for fvg in bull_fvg_active[-3:]:  # cek 3 FVG bullish terakhir
-                if fvg['bottom'] <= price_today <= fvg['top']:
-                    fvg_status = "🟢 Di Dalam Bullish FVG"
-                    ob_touch_score += 20
-                    break
-            else:
-                for fvg in bear_fvg_active[-3:]:
-                    if fvg['bottom'] <= price_today <= fvg['top']:
-                        fvg_status = "🔴 Di Dalam Bearish FVG"
-                        ob_touch_score -= 20
-                        break
-
-            # ============================================
-            # 7. SCORING KELTNER + VWAP + RUBBER BAND
-            # ============================================
-            score      = ob_touch_score
-            kc_status  = "⚪ INSIDE KC"
-            vwap_status= "⚪ NORMAL"
-            action     = "WAIT"
-
-            # Keltner
-            for i in range(1, 5):
-                try:
-                    p_close = float(df["Close"].iloc[-i])
-                    p_upper = float(df['KCUe_20_2'].iloc[-i])
-                    p_lower = float(df['KCLe_20_2'].iloc[-i])
-                    hari_teks = "Hari Ini" if i == 1 else f"{i-1}H Lalu"
-                    if p_close > p_upper:
-                        kc_status = f"🔥 KC BREAKOUT ATAS ({hari_teks})"
-                        score -= 50; break
-                    elif p_close < p_lower:
-                        kc_status = f"📉 KC BREAKOUT BAWAH ({hari_teks})"
-                        score += 30; break
-                except Exception:
-                    continue
-
-            # VWAP + Rubber Band
-            is_deep_oversold = (price_today < lower_kc) and (price_today < vwap_lower_today)
-
-            if price_today > vwap_upper_today:
-                vwap_status = "🔥 OVERVALUED"
-                score -= 50
-            elif is_deep_oversold:
-                vwap_status = "🧊 DEEP OVERSOLD"
-                if atr_pct >= 3.0 and potensi_tp_pct >= 10.0:
-                    score += 100
-                else:
-                    score += 40
-            elif price_today < vwap_lower_today:
-                vwap_status = "🧊 UNDERVALUED"
-                score += 20
-
-            # ============================================
-            # 8. ACTION — Prioritas: Harga Menyentuh Bullish OB
-            # Konfirmasi: minimal 1 candle bullish terakhir
-            # ============================================
-            if ob_touch_label:
-                if candle1_bull or candle2_bull:
-                    action = f"🟢 BUY: {ob_touch_label}"
-                    score += 50
-                else:
-                    action = f"⏳ WAIT: {ob_touch_label} (Tunggu Candle Bullish)"
-                    score -= 10
-            elif ob_touch_score < 0:
-                action = "🛑 HINDARI (Di Area Bearish OB)"
-            elif score > 120:
-                action = "🔍 PANTAU KETAT (Oversold)"
-            elif vwap_status == "🔥 OVERVALUED":
-                action = "🛑 JANGAN BELI (Pucuk)"
-            else:
-                action = "⏳ WAIT"
-
-            # --- Format OB range untuk kolom ---
-            def fmt_ob(ob):
-                if ob is None: return "-"
-                return f"{int(ob['ob_low'])}-{int(ob['ob_high'])} [{ob['structure']}]"
-
-            results.append({
-                "Ticker"            : ticker,
-                "Action"            : action,
-                "Score"             : score,
-                "Harga Skrg"        : int(price_today),
-                "Target TP"         : int(target_tp_price),
-                "TP Source"         : tp_source,
-                "Potensi TP (%)"    : round(potensi_tp_pct, 2),
-                "ATR (%)"           : round(atr_pct, 2),
-                # --- Konfirmasi Candle ---
-                "Candle"            : candle_status,
-                # --- SMC OB Internal ---
-                "Bull Internal OB"  : smc_bull_int_status,
-                "Bull Int OB Range" : fmt_ob(nearest_bull_int),
-                "Bear Internal OB"  : smc_bear_int_status,
-                "Bear Int OB Range" : fmt_ob(nearest_bear_int),
-                # --- SMC OB Swing ---
-                "Bull Swing OB"     : smc_bull_sw_status,
-                "Bull Sw OB Range"  : fmt_ob(nearest_bull_sw),
-                "Bear Swing OB"     : smc_bear_sw_status,
-                "Bear Sw OB Range"  : fmt_ob(nearest_bear_sw),
-                # --- FVG ---
-                "FVG Status"        : fvg_status,
-                # --- Keltner & VWAP ---
-                "Status Keltner"    : kc_status,
-                "Status VWAP"       : vwap_status,
-                "Last Update"       : waktu_update
-            })
 
-        except Exception as e:
-            print(f"  -> ❌ Gagal untuk {ticker}: {e}")
+def _analyze_task(task):
+    """Task worker: baca OHLCV dari shared memory, kembalikan hasil ringkas."""
+    ticker, daily_bounds, weekly_bounds, waktu_update, collect_events = task
+    arrays = shared_mem.attached()
+    df     = shared_mem.frame_from(arrays, daily_bounds)
+    df_htf = shared_mem.frame_from(arrays, weekly_bounds)
+    return analyze_ticker(ticker, df, df_htf, waktu_update, collect_events)
+
+
+def analyze_sector(sector_name, ticker_list, event_log=None, workers=None):
+    """
+    event_log : list opsional, diisi tabel event SMC per ticker (lihat build_smc_event_table).
+    workers   : jumlah proses untuk tahap indikator/SMC (default shared_mem.N_WORKERS).
+    """
+    tz_jkt       = pytz.timezone("Asia/Jakarta")
+    waktu_update = datetime.now(tz_jkt).strftime("%Y-%m-%d %H:%M:%S")
+
+    print(f"\n🚀 Scan {sector_name} | Total: {len(ticker_list)} saham")
+
+    # --- Tahap 1: load data (I/O, proses utama) ---
+    # Data harian dari cache — lebih panjang agar swing 50 bisa berjalan
+    # Weekly diturunkan dari daily yang sama (tanpa download tambahan)
+    panel = {}
+    for ticker in ticker_list:
+        frames = data_cache.load_timeframes(ticker, period="2y", auto_adjust=True, intervals=("1wk",))
+        if frames["1d"] is None or len(frames["1d"]) < 120:
+            continue
+        panel[(ticker, "1d")]  = frames["1d"]
+        panel[(ticker, "1wk")] = frames["1wk"]
+
+    # --- Tahap 2: indikator + SMC paralel, OHLCV lewat shared memory ---
+    arrays, bounds = shared_mem.pack_ohlcv(panel)
+    tasks = [
+        (ticker, bounds[(ticker, "1d")], bounds.get((ticker, "1wk")), waktu_update, event_log is not None)
+        for ticker in dict.fromkeys(t for t, _ in bounds)
+    ]
+    outputs = shared_mem.map_shared(_analyze_task, tasks, arrays, workers=workers) if tasks else []
+
+    results = [row for row, _ in outputs if row is not None]
+    if event_log is not None:
+        event_log.extend(events for _, events in outputs if events is not None)
 
     df_result = pd.DataFrame(results)
 
@@ -701,8 +955,9 @@ def analyze_sector(sector_name, ticker_list):
         "Bear Internal OB", "Bear Int OB Range",
         "Bull Swing OB",    "Bull Sw OB Range",
         "Bear Swing OB",    "Bear Sw OB Range",
-        "FVG Status",
+        "FVG Status", "Struktur Weekly",
         "Status Keltner", "Status VWAP",
+        "VWAP Bulanan", "VWAP Anchor Swing",
         "Last Update"
     ]
 
@@ -851,12 +1106,16 @@ if __name__ == "__main__":
     print("   TP        : ob_low Bearish OB aktif terdekat di atas harga")
     print("=" * 65)
 
+    smc_event_tables = []
+    flagged = []
+
     for sheet_name, saham_list in SECTOR_CONFIG.items():
-        df_final = analyze_sector(sheet_name, saham_list)
+        df_final = analyze_sector(sheet_name, saham_list, event_log=smc_event_tables)
 
         if df_final.empty:
             print(f"⚠️  Tidak ada data valid untuk {sheet_name}")
             continue
+        flagged.extend(df_final.loc[df_final["Action"].str.contains("BUY|WAIT:"), "Ticker"])
 
         ws = connect_gsheet(sheet_name)
         if ws:
@@ -869,4 +1128,24 @@ if __name__ == "__main__":
 
         time.sleep(2)   # Hindari rate limit yfinance / Google Sheets
 
+    try:
+        save_smc_event_log(smc_event_tables)
+    except Exception as e:
+        print(f"❌ Gagal simpan SMC event log: {e}")
+
+    # Analog historis: window harga termirip di seluruh universe untuk emiten flagged
+    if flagged:
+        try:
+            universe = [t for saham_list in SECTOR_CONFIG.values() for t in saham_list]
+            df_analog, df_ringkas = analog_search.search(universe, flagged)
+            print(f"🔎 Analog historis: {df_ringkas.shape[0]} emiten x {analog_search.TOP_K} analog")
+            if not df_ringkas.empty:
+                print(df_ringkas.to_string(index=False))
+            ws = connect_gsheet(ANALOG_SHEET)
+            if ws and not df_analog.empty:
+                ws.clear()
+                set_with_dataframe(ws, df_analog)
+        except Exception as e:
+            print(f"❌ Analog historis gagal: {e}")
+
     print("\n🏁 SELESAI 🏁")
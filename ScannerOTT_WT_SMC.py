@@ -16,6 +16,8 @@ import os
 import time
 from google.oauth2.service_account import Credentials
 
+import trade_params
+
 warnings.filterwarnings('ignore')
 
 SPREADSHEET_ID = "1RppJjEjmwBr3eXh_Bs54Wbs2EAIRWuOlsw8ELD8uUfY"
@@ -259,6 +261,7 @@ def analyze_sector(sector_name, ticker_list):
     tz_jkt = pytz.timezone("Asia/Jakarta")
     waktu_update = datetime.now(tz_jkt).strftime("%Y-%m-%d %H:%M:%S")
     results = []
+    tp_price, tp_levels, tp_atr = [], [], []   # input target TP per baris results
     print(f"\n🚀 Scan {sector_name} | Total: {len(ticker_list)} saham (TRIAL)")
 
     for ticker in ticker_list:
@@ -376,26 +379,11 @@ def analyze_sector(sector_name, ticker_list):
                     break
 
             # ============================================
-            # SET TARGET TP (OB vs ATR Fallback)
+            # LEVEL TP: batas bawah Bearish OB terdekat di atas harga
+            # (target final + fallback ATR dihitung batch setelah loop)
             # ============================================
-            bear_obs_above = [o for o in active_obs if o['type'] == 'Bearish' and o['ob_low'] > price_today]
-            tp_source = ""
-            
-            if bear_obs_above:
-                # Prioritas 1: Gunakan batas bawah Bearish OB terdekat
-                nearest_bear_ob = min(bear_obs_above, key=lambda x: x['ob_low'])
-                target_tp = nearest_bear_ob['ob_low']
-                tp_source = "Bearish OB"
-            else:
-                # Prioritas 2: Gunakan Proyeksi ATR (Harga + Multiplier * ATR)
-                if not pd.isna(atr_today) and atr_today > 0:
-                    target_tp = price_today + (ATR_MULTIPLIER_TP * atr_today)
-                    tp_source = f"Proyeksi ATR (x{ATR_MULTIPLIER_TP})"
-                else:
-                    target_tp = price_today * 1.05 # Fallback absolut 5% jika ATR gagal
-                    tp_source = "Statik 5%"
-                    
-            potensi_tp_pct = ((target_tp - price_today) / price_today) * 100
+            bear_obs_above = [o['ob_low'] for o in active_obs if o['type'] == 'Bearish' and o['ob_low'] > price_today]
+            tp_level = min(bear_obs_above) if bear_obs_above else np.nan
 
             # ============================================
             # SCORING & ACTION (Logika Confluence)
@@ -437,9 +425,6 @@ def analyze_sector(sector_name, ticker_list):
             elif trend == "DOWNTREND" and smc_score < 0:
                 action = "🔴 HINDARI (Downtrend & Resistensi)"
             
-            tp_text = str(int(target_tp))
-            potensi_text = f"{round(potensi_tp_pct, 2)}%"
-
             results.append({
                 "Ticker"             : ticker,
                 "Action"             : action,
@@ -451,9 +436,9 @@ def analyze_sector(sector_name, ticker_list):
                 "Bear Int OB Range"  : bear_int_range,
                 "Bull Sw OB Range"   : bull_sw_range,
                 "Bear Sw OB Range"   : bear_sw_range,
-                "Target TP"          : tp_text,
-                "Sumber TP"          : tp_source,
-                "Potensi TP"         : potensi_text,
+                "Target TP"          : None,
+                "Sumber TP"          : None,
+                "Potensi TP"         : None,
                 "Umur OTT Cross"     : days_since_ott_cross,
                 "WT Cross Terakhir"  : wt_cross_type,
                 "Umur WT Cross"      : days_since_wt_cross,
@@ -462,10 +447,28 @@ def analyze_sector(sector_name, ticker_list):
                 "OTT Line"           : round(ott_today, 2),
                 "Last Update"        : waktu_update
             })
+            tp_price.append(price_today); tp_levels.append(tp_level); tp_atr.append(atr_today)
 
         except Exception as e:
             print(f"  -> ❌ Gagal untuk {ticker}: {e}")
 
+    # ============================================
+    # SET TARGET TP (OB -> ATR -> 5%) — semua ticker, satu panggilan
+    # ============================================
+    if results:
+        price = np.array(tp_price, dtype=float)
+        target_tp, source = trade_params.atr_target(
+            price, np.array(tp_atr, dtype=float),
+            ATR_MULTIPLIER_TP, level=np.array(tp_levels, dtype=float))
+        labels = {trade_params.SRC_LEVEL: "Bearish OB",
+                  trade_params.SRC_ATR  : f"Proyeksi ATR (x{ATR_MULTIPLIER_TP})",
+                  trade_params.SRC_PCT  : "Statik 5%"}
+        potensi_tp_pct = (target_tp - price) / price * 100
+        for k, row in enumerate(results):
+            row["Target TP"]  = str(int(target_tp[k]))
+            row["Sumber TP"]  = labels[int(source[k])]
+            row["Potensi TP"] = f"{round(potensi_tp_pct[k], 2)}%"
+
     df_result = pd.DataFrame(results)
 
     desired_order = [
@@ -17,6 +17,9 @@ import gspread
 from gspread_dataframe import set_with_dataframe
 from google.oauth2.service_account import Credentials
 
+import data_cache
+import tv_rating
+
 warnings.filterwarnings("ignore")
 
 # ── CONFIG ─────────────────────────────────────────────────────────────────
@@ -176,7 +179,7 @@ FALLBACK = {"Nickel":"DBB","Aluminium":"DBB","Zinc":"DBB",
 
 DISPLAY_COLS = [
     "Ticker", "Kategori Strategi", "Sektor", "Action", "Harga", "Batas Jual (SL)", 
-    "Supertrend Signal", "Tgl Breakout Supertrend", "Skor Tambahan", "ADTV (M)",
+    "Supertrend Signal", "Tgl Breakout Supertrend", "Supertrend Weekly", "Skor Tambahan", "ADTV (M)",
     "Skor TV", "Rek TV", "Alasan Rek TV",
     "Commodity Bullish %", "Commodity Context",
 ]
@@ -206,39 +209,22 @@ def gsheet(name):
 
 # ── DATA DOWNLOAD ──────────────────────────────────────────────────────────
 def get_ohlcv(ticker, days=DOWNLOAD_DAYS):
-    end   = datetime.today()
-    start = end - timedelta(days=days)
-
-    try:
-        df = yf.download(
-            ticker,
-            start=start.strftime("%Y-%m-%d"),
-            end=end.strftime("%Y-%m-%d"),
-            interval="1d",
-            progress=False,
-            auto_adjust=False,
-        )
-    except Exception as e:
-        return None
-
+    # Cache harian dipakai bersama; bar hari ini dikecualikan seperti end=today di yfinance
+    df = data_cache.load_daily(ticker, days=days, auto_adjust=False)
     if df is None or df.empty:
         return None
-
-    if isinstance(df.columns, pd.MultiIndex):
-        df.columns = [c[0] for c in df.columns]
-
-    if "Close" not in df.columns and "Adj Close" in df.columns:
-        df["Close"] = df["Adj Close"]
-
-    needed = ["High", "Low", "Close", "Volume"]
-    if not all(c in df.columns for c in needed):
+    df = df[df.index < pd.Timestamp(datetime.today().date())]
+    return df.copy() if not df.empty else None
+
+def get_htf_ohlcv(ticker, interval="1wk"):
+    # Bar harian hari ini dibuang dulu (sama dengan get_ohlcv), baru di-resample:
+    # label W-FRI minggu berjalan ada di masa depan, jadi minggu parsial tetap ikut
+    daily = data_cache.load_daily(ticker, auto_adjust=False)
+    if daily is None or daily.empty:
         return None
-
-    df = df[["Open","High","Low","Close","Volume"]].dropna(
-        subset=["High","Low","Close"]).copy()
-    df.index = pd.to_datetime(df.index)
-    df.sort_index(inplace=True)
-    return df
+    daily = daily[daily.index < pd.Timestamp(datetime.today().date())]
+    df = data_cache.resample_ohlcv(daily, data_cache.TIMEFRAMES[interval])
+    return df if not df.empty else None
 
 # ── STRATEGY CLASSIFICATION ────────────────────────────────────────────────
 def get_strategy_category(sector, current_price, adtv_miliar):
@@ -264,7 +250,8 @@ def get_strategy_category(sector, current_price, adtv_miliar):
         return "Trend-Following"
 
 # ── SUPERTREND LOGIC ───────────────────────────────────────────────────────
-def calc_supertrend(df, period=ATR_LENGTH, multiplier=FACTOR):
+def supertrend_signals(df, period=ATR_LENGTH, multiplier=FACTOR):
+    """State Supertrend seluruh histori: direction, sl_price, entry_long, entry_short per bar"""
     high = df['High'].values
     low = df['Low'].values
     close = df['Close'].values
@@ -312,6 +299,11 @@ def calc_supertrend(df, period=ATR_LENGTH, multiplier=FACTOR):
     df_sig['entry_long']  = (df_sig['direction'] == 1) & (df_sig['direction'].shift(1) == -1)
     df_sig['entry_short'] = (df_sig['direction'] == -1) & (df_sig['direction'].shift(1) == 1)
 
+    return df_sig
+
+def calc_supertrend(df, period=ATR_LENGTH, multiplier=FACTOR):
+    df_sig = supertrend_signals(df, period, multiplier)
+
     def get_last_signal(series):
         arr = series.values
         idx = df.index
@@ -400,110 +392,10 @@ def calc_custom_score(df, sector, current_price):
   
 # ── TV SCORE ───────────────────────────────────────────────────────────────
 def calc_tv(df):
-    s, n = 0, 0
-    # Abaikan return reason dari TV lama, tapi hitungannya dibiarkan jalan
-    def add(v): nonlocal s, n; s += v; n += 1
+    # Rating vektorisasi (tv_rating varian 'screener'); dipakai nilai bar terakhir
     try:
-        c = df["Close"]; h = df["High"]; l = df["Low"]; cn = float(c.iloc[-1])
-        
-        for p in [10, 20, 50, 100, 200]:
-            sma = c.rolling(p).mean().iloc[-1]
-            ema = c.ewm(span=p, adjust=False).mean().iloc[-1]
-            if pd.notna(sma): add(1 if cn > sma else -1 if cn < sma else 0)
-            if pd.notna(ema): add(1 if cn > ema else -1 if cn < ema else 0)
-
-        tk = (h.rolling(9).max() + l.rolling(9).min()) / 2
-        kj = (h.rolling(26).max() + l.rolling(26).min()) / 2
-        sa = ((tk + kj) / 2).shift(26)
-        sb2 = ((h.rolling(52).max() + l.rolling(52).min()) / 2).shift(26)
-        
-        tk_0, kj_0, sa_0, sb2_0 = tk.iloc[-1], kj.iloc[-1], sa.iloc[-1], sb2.iloc[-1]
-        if pd.notna(sb2_0):
-            if sa_0 > sb2_0 and kj_0 > sa_0 and tk_0 > kj_0 and cn > tk_0: add(1)
-            elif sa_0 < sb2_0 and kj_0 < sa_0 and tk_0 < kj_0 and cn < tk_0: add(-1)
-            else: add(0)
-
-        import ta as _ta
-
-        rsi = _ta.momentum.RSIIndicator(c, 14).rsi()
-        r0, r1 = rsi.iloc[-1], rsi.iloc[-2]
-        if pd.notna(r0):
-            if r0 < 30 and r0 > r1: add(1)
-            elif r0 > 70 and r0 < r1: add(-1)
-            else: add(0)
-
-        stoch = _ta.momentum.StochasticOscillator(h, l, c, window=14, smooth_window=3)
-        k, d = stoch.stoch(), stoch.stoch_signal()
-        k0, d0 = k.iloc[-1], d.iloc[-1]
-        if pd.notna(k0) and pd.notna(d0):
-            if k0 < 20 and d0 < 20 and k0 > d0: add(1)
-            elif k0 > 80 and d0 > 80 and k0 < d0: add(-1)
-            else: add(0)
-
-        cci = _ta.trend.CCIIndicator(h, l, c, window=20).cci()
-        c0, c1 = cci.iloc[-1], cci.iloc[-2]
-        if pd.notna(c0):
-            if c0 < -100 and c0 > c1: add(1)
-            elif c0 > 100 and c0 < c1: add(-1)
-            else: add(0)
-
-        adxi = _ta.trend.ADXIndicator(h, l, c, 14)
-        adx, pdi, mdi = adxi.adx(), adxi.adx_pos(), adxi.adx_neg()
-        av0, av1 = adx.iloc[-1], adx.iloc[-2]
-        if pd.notna(av0):
-            if pdi.iloc[-1] > mdi.iloc[-1] and av0 > 20 and av0 > av1: add(1)
-            elif pdi.iloc[-1] < mdi.iloc[-1] and av0 > 20 and av0 > av1: add(-1)
-            else: add(0)
-
-        ao = _ta.momentum.AwesomeOscillatorIndicator(h, l).awesome_oscillator()
-        ao0, ao1, ao2 = ao.iloc[-1], ao.iloc[-2], ao.iloc[-3]
-        if pd.notna(ao0):
-            saucer_buy = ao0 > 0 and ao0 > ao1 and ao1 < ao2
-            zero_cross_buy = ao0 > 0 and ao1 < 0
-            saucer_sell = ao0 < 0 and ao0 < ao1 and ao1 > ao2
-            zero_cross_sell = ao0 < 0 and ao1 > 0
-            if saucer_buy or zero_cross_buy: add(1)
-            elif saucer_sell or zero_cross_sell: add(-1)
-            else: add(0)
-
-        mom = c.diff(10)
-        m0, m1 = mom.iloc[-1], mom.iloc[-2]
-        if pd.notna(m0):
-            if m0 > m1: add(1)
-            elif m0 < m1: add(-1)
-            else: add(0)
-
-        macd = _ta.trend.MACD(c)
-        m_line, m_sig = macd.macd(), macd.macd_signal()
-        if pd.notna(m_line.iloc[-1]):
-            if m_line.iloc[-1] > m_sig.iloc[-1]: add(1)
-            elif m_line.iloc[-1] < m_sig.iloc[-1]: add(-1)
-            else: add(0)
-
-        wpr = _ta.momentum.WilliamsRIndicator(h, l, c, 14).williams_r()
-        w0, w1 = wpr.iloc[-1], wpr.iloc[-2]
-        if pd.notna(w0):
-            if w0 < -80 and w0 > w1: add(1)
-            elif w0 > -20 and w0 < w1: add(-1)
-            else: add(0)
-
-        uo = _ta.momentum.UltimateOscillator(h, l, c).ultimate_oscillator()
-        u0 = uo.iloc[-1]
-        if pd.notna(u0):
-            if u0 > 70: add(1)
-            elif u0 < 30: add(-1)
-            else: add(0)
-
-        fv = s / n if n > 0 else 0
-        
-        if -1.0 <= fv < -0.5: lbl = "Jual Kuat"
-        elif -0.5 <= fv < -0.1: lbl = "Jual"
-        elif -0.1 <= fv <= 0.1: lbl = "Netral"
-        elif 0.1 < fv <= 0.5: lbl = "Beli"
-        elif 0.5 < fv <= 1.0: lbl = "Beli Kuat"
-        else: lbl = "Netral"
-            
-        return round(fv, 2), lbl, "-"
+        fv = float(tv_rating.tv_value(df, "screener")[-1])
+        return round(fv, 2), tv_rating.tv_label(fv, "screener"), "-"
     except Exception as e:
         return 0.0, "Netral", "-"
 
@@ -558,6 +450,8 @@ def analyze(ticker, sector, ctx):
     custom_score, adtv, strat_cat, skor_reasons = calc_custom_score(df, sector, close_now)
     
     st = calc_supertrend(df)
+    df_w = get_htf_ohlcv(ticker, "1wk")
+    st_w = calc_supertrend(df_w) if df_w is not None and len(df_w) > ATR_LENGTH + 2 else None
     tvs, tvl, _ = calc_tv(df)
     comm = comm_sector(sector, ctx)
 
@@ -581,6 +475,7 @@ def analyze(ticker, sector, ctx):
         "Tgl Data"                : tgl,
         "Supertrend Signal"       : st["label"],
         "Tgl Breakout Supertrend" : st["date"],
+        "Supertrend Weekly"       : ("Long" if st_w["type"] == "Supertrend Long" else "Short") if st_w else "-",
         "Skor Tambahan"           : custom_score,
         "_type"                   : st["type"],
         "_bars"                   : st["bars"],
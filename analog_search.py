@@ -0,0 +1,261 @@
+# ==========================================
+# ANALOG HISTORIS
+# Cari k window harga historis paling mirip (seluruh universe cache) untuk emiten
+# yang di-flag scanner, lengkap dengan return sesudahnya.
+# Index = matriks window log-close z-normalised (float32) yang dihitung sekali dan
+# disimpan ke disk. Untuk vektor z-normalised panjang m berlaku
+#   jarak_euclid^2 = 2m * (1 - korelasi),  korelasi = dot(a, b) / m
+# sehingga query = satu perkalian matriks (index x query), lalu top-k via argpartition.
+# ==========================================
+
+import os
+import hashlib
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+import data_cache
+
+WINDOW         = int(os.environ.get("ANALOG_WINDOW", "40"))   # Panjang window (20-60 bar)
+HORIZONS       = (5, 10, 20)   # Return sesudah window (bar)
+TOP_K          = 10            # Analog per query
+MAX_QUERIES    = 50            # Batas emiten yang di-query per run
+MIN_STD        = 1e-6          # Window datar (suspend / tidak ada transaksi) dibuang
+CHUNK_ROWS     = 200_000       # Baris index per blok perkalian matriks (batas memori)
+CANDIDATES     = 20            # Kandidat per k sebelum buang trivial match (ticker sama, window bertumpuk)
+
+
+# ==========================================
+# Z-NORMALISASI
+# ==========================================
+def znorm(windows):
+    """Z-normalisasi per baris (axis terakhir); window dengan std < MIN_STD -> NaN."""
+    w    = np.asarray(windows, dtype=np.float64)
+    mean = w.mean(axis=-1, keepdims=True)
+    std  = w.std(axis=-1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = (w - mean) / std
+    z[np.broadcast_to(std < MIN_STD, z.shape)] = np.nan
+    return z
+
+
+def _log_close(df):
+    close = df['Close'].to_numpy(dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.log(np.where(close > 0, close, np.nan))
+
+
+# ==========================================
+# BUILD INDEX
+# ==========================================
+def build_index(frames, window=WINDOW):
+    """
+    frames : dict {ticker: DataFrame OHLCV harian}
+    Index hanya berisi window yang minimal return HORIZONS[0] sesudahnya sudah diketahui;
+    horizon yang belum lengkap bernilai NaN.
+    Return dict array: z (n x window float32), ticker (int32), end (posisi bar akhir),
+    date (tanggal bar akhir), fwd (n x len(HORIZONS) float32, persen), plus metadata.
+    """
+    parts, tickers, last_dates = [], [], []
+    for ticker, df in frames.items():
+        if df is None or len(df) < window + HORIZONS[0]:
+            continue
+        logc = _log_close(df)
+        n    = len(logc)
+        ends = np.arange(window - 1, n - HORIZONS[0])
+        z    = znorm(sliding_window_view(logc, window)[:len(ends)])
+        ok   = ~np.isnan(z).any(axis=1)
+        if not ok.any():
+            continue
+
+        fwd = np.full((len(ends), len(HORIZONS)), np.nan)
+        for j, h in enumerate(HORIZONS):
+            valid = ends + h < n
+            fwd[valid, j] = (np.exp(logc[ends[valid] + h] - logc[ends[valid]]) - 1) * 100
+
+        tid = len(tickers)
+        tickers.append(ticker)
+        last_dates.append(np.datetime64(df.index[-1], 'ns'))
+        parts.append((z[ok], np.full(ok.sum(), tid, dtype=np.int32), ends[ok].astype(np.int32),
+                      df.index.values.astype('datetime64[ns]')[ends[ok]], fwd[ok]))
+
+    if not parts:
+        return {"window": window, "tickers": np.array([], dtype=object),
+                "last_dates": np.array([], dtype='datetime64[ns]'),
+                "z": np.empty((0, window), dtype=np.float32), "ticker": np.empty(0, dtype=np.int32),
+                "end": np.empty(0, dtype=np.int32), "date": np.empty(0, dtype='datetime64[ns]'),
+                "fwd": np.empty((0, len(HORIZONS)), dtype=np.float32)}
+    z, tid, end, date, fwd = (np.concatenate(p) for p in zip(*parts))
+    return {"window": window, "tickers": np.array(tickers, dtype=object),
+            "last_dates": np.array(last_dates, dtype='datetime64[ns]'),
+            "z": np.ascontiguousarray(z, dtype=np.float32), "ticker": tid, "end": end,
+            "date": date, "fwd": fwd.astype(np.float32)}
+
+
+def _index_path(tickers, window):
+    digest = hashlib.md5("|".join(sorted(tickers)).encode()).hexdigest()[:8]
+    return os.path.join(data_cache.CACHE_DIR, "analog", f"index_w{window}_{digest}.npz")
+
+
+def _load_index(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=True) as f:
+            index = {k: f[k] for k in f.files}
+        index["window"] = int(index["window"])
+        return index
+    except Exception as e:
+        print(f"  -> ⚠️ Index analog rusak {path}: {e}")
+        return None
+
+
+def load_frames(tickers):
+    """OHLCV harian dari data_cache; ticker tanpa data dilewati."""
+    frames = {}
+    for ticker in dict.fromkeys(tickers):
+        try:
+            df = data_cache.load_daily(ticker)
+        except Exception as e:
+            print(f"  -> ⚠️ Analog {ticker} dilewati: {e}")
+            df = None
+        if df is not None and not df.empty:
+            frames[ticker] = df.dropna(subset=['Close'])
+    return frames
+
+
+def get_index(frames, window=WINDOW, path=None):
+    """
+    Index dari disk jika bar terakhir semua ticker sama dengan saat index dibangun,
+    selain itu dibangun ulang lalu disimpan.
+    """
+    path  = path or _index_path(frames, window)
+    index = _load_index(path)
+    if index is not None:
+        built = dict(zip(index["tickers"], index["last_dates"]))
+        if all(built.get(t) == np.datetime64(df.index[-1], 'ns')
+               for t, df in frames.items() if len(df) >= window + HORIZONS[0]):
+            return index
+
+    index = build_index(frames, window)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez(path, **index)
+    except Exception as e:
+        print(f"  -> ⚠️ Gagal simpan index analog: {e}")
+    print(f"  -> 🗂️ Index analog w={window}: {len(index['z'])} window dari {len(index['tickers'])} emiten")
+    return index
+
+
+# ==========================================
+# QUERY
+# ==========================================
+def _query_windows(frames, tickers, window):
+    names, rows, ends = [], [], []
+    for ticker in tickers:
+        df = frames.get(ticker)
+        if df is None or len(df) < window:
+            continue
+        z = znorm(_log_close(df)[-window:])
+        if np.isnan(z).any():
+            continue
+        names.append(ticker)
+        rows.append(z)
+        ends.append(len(df) - 1)
+    return names, np.array(rows, dtype=np.float32).reshape(-1, window), np.array(ends, dtype=np.int64)
+
+
+def _top_candidates(index, q, n_cand):
+    """Top n_cand kandidat (skor dot tertinggi) per query, blok demi blok."""
+    n_q     = len(q)
+    best_i  = np.empty((n_q, 0), dtype=np.int64)
+    best_s  = np.empty((n_q, 0), dtype=np.float32)
+    for start in range(0, len(index["z"]), CHUNK_ROWS):
+        scores = q @ index["z"][start:start + CHUNK_ROWS].T            # (n_q x blok)
+        take   = min(n_cand, scores.shape[1])
+        part   = np.argpartition(scores, -take, axis=1)[:, -take:]
+        best_i = np.concatenate([best_i, part + start], axis=1)
+        best_s = np.concatenate([best_s, np.take_along_axis(scores, part, axis=1)], axis=1)
+        if best_i.shape[1] > n_cand:
+            keep   = np.argpartition(best_s, -n_cand, axis=1)[:, -n_cand:]
+            best_i = np.take_along_axis(best_i, keep, axis=1)
+            best_s = np.take_along_axis(best_s, keep, axis=1)
+    order = np.argsort(-best_s, axis=1)
+    return np.take_along_axis(best_i, order, axis=1), np.take_along_axis(best_s, order, axis=1)
+
+
+def find_analogs(index, frames, tickers, k=TOP_K):
+    """
+    k analog terdekat untuk window terakhir tiap ticker.
+    Dibuang: window ticker yang sama yang bertumpuk dengan window query, dan analog
+    yang bertumpuk > setengah window dengan analog ticker sama yang sudah terpilih.
+    Return DataFrame satu baris per (ticker, analog).
+    """
+    window = index["window"]
+    names, q, q_end = _query_windows(frames, tickers, window)
+    cols = (["Ticker", "Rank", "Analog", "Tanggal Akhir", "Korelasi", "Jarak"]
+            + [f"Ret {h}D (%)" for h in HORIZONS])
+    if not names or len(index["z"]) == 0:
+        return pd.DataFrame(columns=cols)
+
+    cand_i, cand_s = _top_candidates(index, q, k * CANDIDATES)
+    tickers_idx    = {t: i for i, t in enumerate(index["tickers"])}
+    zone           = max(window // 2, 1)
+
+    rows = []
+    for qi, ticker in enumerate(names):
+        own    = tickers_idx.get(ticker, -1)
+        chosen = []
+        for ci, score in zip(cand_i[qi], cand_s[qi]):
+            tid, end = index["ticker"][ci], index["end"][ci]
+            if tid == own and end > q_end[qi] - window:
+                continue
+            if any(tid == index["ticker"][c] and abs(int(end) - int(index["end"][c])) < zone for c in chosen):
+                continue
+            chosen.append(ci)
+            corr = float(np.clip(score / window, -1.0, 1.0))
+            rows.append([ticker, len(chosen), index["tickers"][tid], pd.Timestamp(index["date"][ci]),
+                         round(corr, 4), round(float(np.sqrt(2 * window * (1 - corr))), 3)]
+                        + [round(float(r), 2) if np.isfinite(r) else np.nan for r in index["fwd"][ci]])
+            if len(chosen) == k:
+                break
+    return pd.DataFrame(rows, columns=cols)
+
+
+def summarize(analogs):
+    """Ringkasan per ticker: median return & % analog naik per horizon."""
+    if analogs.empty:
+        return pd.DataFrame()
+    ret_cols = [f"Ret {h}D (%)" for h in HORIZONS]
+    g = analogs.groupby("Ticker", sort=False)
+    out = pd.DataFrame({"Analog": g.size(), "Korelasi Rata2": g["Korelasi"].mean().round(3)})
+    for col, h in zip(ret_cols, HORIZONS):
+        out[f"Median {h}D (%)"] = g[col].median().round(2)
+        out[f"Naik {h}D (%)"]   = g[col].apply(lambda s: round((s.dropna() > 0).mean() * 100, 1)
+                                                if s.notna().any() else np.nan)
+    return out.reset_index()
+
+
+def search(universe, flagged, window=WINDOW, k=TOP_K):
+    """
+    Satu langkah untuk scanner: index universe (cache disk) + query emiten flagged
+    (maks MAX_QUERIES, urutan dipertahankan). Return (DataFrame analog, DataFrame ringkasan).
+    """
+    flagged = list(dict.fromkeys(flagged))[:MAX_QUERIES]
+    frames  = load_frames(list(universe) + flagged)
+    index   = get_index(frames, window)
+    analogs = find_analogs(index, frames, flagged, k)
+    return analogs, summarize(analogs)
+
+
+# ==========================================
+# MAIN: python analog_search.py BBCA.JK TLKM.JK ...  (universe ScannerPattern2)
+# ==========================================
+if __name__ == "__main__":
+    import sys
+    from ScannerPattern2 import SECTOR_CONFIG
+
+    universe = [t for saham_list in SECTOR_CONFIG.values() for t in saham_list]
+    df_analog, df_ringkas = search(universe, sys.argv[1:])
+    print(df_analog.to_string(index=False))
+    print(df_ringkas.to_string(index=False))
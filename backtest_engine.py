@@ -0,0 +1,605 @@
+# ==========================================
+# BACKTEST ENGINE — VEKTORISASI
+# Pengganti loop per-bar generate_signal + simulate_exit_with_trailing di
+# BacktestAndGridSearch: sinyal dari SIGNAL_REGISTRY (kondisi generate_signal lama,
+# dievaluasi pattern_engine sebagai array untuk semua bar sekaligus), exit dihitung
+# di matriks [trade x MAX_HOLD_DAYS].
+# Hanya pemilihan posisi portofolio (bergantung equity berjalan) yang tetap loop,
+# dan loop itu cuma melewati sinyal yang sudah lolos filter.
+# ==========================================
+
+import hashlib
+import heapq
+
+import numpy as np
+import pandas as pd
+
+import pattern_engine
+import shared_mem
+
+# ==========================================
+# REGISTRY SINYAL BACKTEST (format pattern_engine.compile_registry)
+# Kondisi & tier disalin 1:1 dari generate_signal asli BacktestAndGridSearch, bukan
+# registry scanner (pattern_engine.PATTERNS), agar trade yang diambil tidak berubah:
+# - tier = ct(): 3 jika >= 4 filter terpenuhi, 2 jika >= 2, selain itu 1 -> tier_at (4, 2);
+#   Abandoned Baby memakai ct([..4 filter.., True]) -> tier_at (3, 1)
+# - candle bearish = bukan bullish (Close <= Open), seperti `bear = not bull`
+# - near support dari range High/Low 20 bar yang boleh belum penuh di awal frame
+#   (iloc[max(0, idx-19):idx+1]), dihitung di frame yang sama dengan loop lama
+# Urutan list = urutan cek lama (prioritas saat tier & base prob sama).
+# ==========================================
+SIGNAL_TERMS = {
+    'range_high_20'  : "np.fmax.reduce([shift(day3.high, k) for k in range(20)])",
+    'range_low_20'   : "np.fmin.reduce([shift(day3.low, k) for k in range(20)])",
+    'range_pos_20'   : "np.where(range_high_20 - range_low_20 > 0, "
+                       "(close - range_low_20) / (range_high_20 - range_low_20), 0.5)",
+    'near_support_20': "range_pos_20 < 0.25",
+    'vol_accel_3'    : "(day1.volume > shift(vol_sma20, 2)) & (day2.volume >= day1.volume) & (day3.volume >= day2.volume)",
+    'body_bear_2'    : "day2.open - day2.close",
+    'pen_ratio'      : "np.where(body_bear_2 > 0, (day3.close - day2.close) / body_bear_2, 0)",
+}
+
+_TIER_OS  = ['is_oversold_context', 'near_support_20', 'is_volume_thrust', 'macd_bullish']
+_TIER_EXT = ['is_extreme_oversold', 'near_support_20', 'is_volume_thrust', 'macd_bullish']
+_TIER_AVG = ['is_oversold_context', 'near_support_20', 'is_volume_above_avg', 'macd_bullish']
+
+
+def _signal(key, when, tier_filters, tier_at=(4, 2)):
+    return {'key': key, 'label': pattern_engine.PATTERN_LABELS[key], 'direction': 'bullish',
+            'base_prob': pattern_engine.BASE_PROB[key], 'when': when,
+            'tier_filters': tier_filters, 'tier_at': tier_at}
+
+
+SIGNAL_DEFS = [
+    _signal('3ws', [
+        "is_downtrend_basic", "day1.bull", "day2.bull", "day3.bull",
+        "day1.body >= 0.5 * day1.range", "day2.body >= 0.5 * day2.range", "day3.body >= 0.5 * day3.range",
+        "day2.close > day1.close", "day3.close > day2.close",
+        "day2.open >= day1.open", "day2.open <= day1.close",
+        "day3.open >= day2.open", "day3.open <= day2.close",
+        "day1.close_near_high()", "day2.close_near_high()", "day3.close_near_high()",
+        "candle_is_significant",
+    ], ['vol_accel_3', 'is_extreme_oversold', 'near_support_20', 'macd_bullish', 'is_volatile_regime']),
+    _signal('bull_abandoned', [
+        "is_downtrend_basic", "~day1.bull", "day3.bull",
+        "day1.body >= 0.5 * day1.range", "day3.body >= 0.5 * day3.range",
+        "day2.range > 0", "day2.body <= 0.1 * day2.range",
+        "day2.high < day1.low", "day2.high < day3.low", "day3.close > day1.mid",
+    ], _TIER_EXT, (3, 1)),
+    _signal('morning_star', [
+        "is_proper_downtrend", "~day1.bull", "day1.range > 0", "day1.body >= 0.6 * day1.range",
+        "day2.range > 0", "day2.body <= 0.3 * day2.range",
+        "day3.bull", "day3.range > 0", "day3.body >= 0.6 * day3.range",
+        "day3.close >= day1.mid", "candle_is_significant",
+    ], _TIER_EXT + ['is_volatile_regime']),
+    _signal('3_inside_up', [
+        "is_downtrend_basic", "~day1.bull", "day1.body >= 0.5 * day1.range",
+        "day2.bull", "day2.body <= 0.6 * day1.body",
+        "day2.body_top <= day1.body_top", "day2.body_bottom >= day1.body_bottom",
+        "day3.bull", "day3.close > day1.high",
+    ], _TIER_AVG),
+    _signal('3_outside_up', [
+        "is_downtrend_basic", "~day1.bull", "day2.bull",
+        "day2.close > day1.open", "day2.open < day1.close", "day2.body > day1.body * 1.2",
+        "day3.bull", "day3.body >= 0.5 * day3.range", "day3.close > day2.high", "candle_is_significant",
+    ], _TIER_OS),
+    _signal('bull_engulf', [
+        "~day2.bull", "day3.bull", "day3.close > day2.open", "day3.open < day2.close",
+        "day3.body > day2.body * 1.08", "day2.body >= 0.5 * day2.range", "day3.body >= 0.5 * day3.range",
+        "day3.close < sma50", "candle_is_significant",
+    ], _TIER_EXT[:3] + ['is_ranging_market', 'macd_bullish']),
+    _signal('bull_kicker', [
+        "~day2.bull", "day2.body >= 0.5 * day2.range", "day3.bull", "day3.body >= 0.5 * day3.range",
+        "day3.open > day2.high", "day3.low > day2.high", "candle_is_significant",
+    ], _TIER_OS),
+    _signal('bull_island', [
+        "d1.low > np.maximum.reduce([m.high for m in middle])",
+        "d5.low > np.maximum.reduce([m.high for m in middle])", "d5.bull",
+    ], ['is_oversold_context', 'is_volume_thrust', 'macd_bullish']),
+    _signal('piercing', [
+        "is_proper_downtrend", "~day2.bull", "body_bear_2 >= 0.6 * day2.range", "day3.bull",
+        "day3.open < day2.close * 0.999", "pen_ratio >= 0.5", "day3.close < day2.open",
+        "candle_is_significant",
+    ], _TIER_EXT),
+    _signal('tweezer_bottom', [
+        "is_downtrend_basic", "~day2.bull", "day2.body >= 0.5 * day2.range",
+        "day3.bull", "day3.body >= 0.5 * day3.range",
+        "near(day2.low, day3.low)", "day3.close > day2.close", "candle_is_significant",
+    ], _TIER_AVG),
+    _signal('bull_harami', [
+        "is_downtrend_basic", "~day2.bull", "day2.body >= 0.5 * day2.range", "day3.bull",
+        "day3.body >= 0.2 * day3.range", "day3.body <= 0.6 * day2.body",
+        "day3.body_top <= day2.body_top", "day3.body_bottom >= day2.body_bottom",
+    ], _TIER_AVG),
+    _signal('hammer', [
+        "day3.range > 0", "day3.body > 0", "day3.body <= 0.3 * day3.range",
+        "day3.lower_shade >= 2 * day3.body", "day3.upper_shade <= 0.15 * day3.range",
+        "(day3.high - day3.close) <= 0.25 * day3.range", "day3.close < sma20", "candle_is_significant",
+    ], ['is_proper_downtrend', 'is_extreme_oversold', 'near_support_20', 'is_volume_above_avg']),
+    _signal('inv_hammer', [
+        "day3.range > 0", "day3.body > 0", "day3.body <= 0.3 * day3.range",
+        "day3.upper_shade >= 2 * day3.body", "day3.lower_shade <= 0.15 * day3.range",
+        "(day3.close - day3.low) <= 0.25 * day3.range", "sma20 < sma50", "candle_is_significant",
+    ], ['is_proper_downtrend', 'is_oversold_context', 'near_support_20']),
+    _signal('dragonfly_doji', [
+        "day3.range > 0", "day3.body <= 0.08 * day3.range",
+        "day3.lower_shade >= 0.7 * day3.range", "day3.upper_shade <= 0.1 * day3.range",
+    ], ['is_oversold_context', 'near_support_20']),
+]
+
+SIGNAL_REGISTRY = pattern_engine.compile_registry(SIGNAL_DEFS, SIGNAL_TERMS)
+SIGNAL_PATTERNS = SIGNAL_REGISTRY['keys']
+CONFLUENCE_COLS = ['near_support_20', 'is_extreme_oversold', 'is_volume_thrust',
+                   'macd_bullish', 'is_oversold_context']
+MIN_BARS        = 60     # Bar minimum di periode backtest per ticker
+WARMUP_BARS     = 5      # Sinyal baru dibaca mulai bar ke-5 (pola 5 candle)
+GRID_BATCH      = 27     # Setting exit per task grid (satu matriks simulate_exits_batch)
+
+# Kode alasan exit -> label trade log
+EXIT_SL, EXIT_TRAIL, EXIT_TP, EXIT_TIME = 0, 1, 2, 3
+EXIT_REASONS = np.array(["SL", "Trailing SL", "TP", "Time Exit"], dtype=object)
+
+
+# ==========================================
+# SINYAL
+# ==========================================
+def signal_arrays(df):
+    """
+    Sinyal mentah per bar (tidak bergantung parameter grid): pola bullish terbaik
+    (tier tertinggi, lalu BASE_PROB, lalu urutan SIGNAL_PATTERNS), tier, konfluensi,
+    skor pola, nilai transaksi dan flag filter.
+    df : frame backtest satu ticker (kolom add_indicators, setelah dropna); registry
+         SIGNAL_REGISTRY dievaluasi di frame ini, jadi shift / window sama dengan loop lama
+    """
+    cols  = pattern_engine.detect_versions(df, {'backtest': SIGNAL_REGISTRY})['backtest']
+    n     = len(df)
+    best  = np.full(n, -1, dtype=np.int16)
+    tier  = np.zeros(n, dtype=np.int8)
+    bprob = np.zeros(n)
+    for i, key in enumerate(SIGNAL_PATTERNS):
+        t  = cols[f'tier_{key}']
+        bp = pattern_engine.BASE_PROB.get(key, 0)
+        better = (t > 0) & ((t > tier) | ((t == tier) & (bp > bprob)))
+        best   = np.where(better, i, best)
+        tier   = np.where(better, t, tier).astype(np.int8)
+        bprob  = np.where(better, bp, bprob)
+
+    flags = {c: np.asarray(cols[c], dtype=bool) for c in CONFLUENCE_COLS}
+    conf  = np.sum([flags[c] for c in CONFLUENCE_COLS], axis=0)
+    prob  = np.array([pattern_engine.BASE_PROB.get(k, 0.51) for k in SIGNAL_PATTERNS] + [0.51])[best]
+    value = (df['VOL_VALUE'] if 'VOL_VALUE' in df else df['Close'] * df['Volume']).to_numpy(dtype=np.float64)
+    return {
+        'best'       : best,
+        'tier'       : tier,
+        'pat_score'  : np.where(best >= 0, pattern_engine.pattern_scores(prob, tier, conf), 0.0),
+        'vol_value'  : value,
+        'near_sup'   : flags['near_support_20'],
+        'vol_thrust' : flags['is_volume_thrust'],
+    }
+
+
+def signal_mask(sig, params):
+    """Bar yang lolos filter parameter (likuiditas, tier, skor, support, volume thrust)."""
+    ok = (sig['best'] >= 0) & (sig['tier'] >= params.get("MIN_TIER", 3))
+    if params.get("USE_LIQUIDITY_FILTER", True):
+        ok &= ~(sig['vol_value'] < params.get("MIN_VOLUME_IDR", 500_000_000))
+    ok &= sig['pat_score'] > params.get("MIN_SCORE", 65)
+    ok &= sig['near_sup'] & sig['vol_thrust']
+    return ok
+
+
+# ==========================================
+# EXIT (TRAILING STOP)
+# ==========================================
+# Parameter yang hanya mengubah exit (bukan pemilihan sinyal) -> bisa di-batch
+EXIT_PARAMS = ("MAX_HOLD_DAYS", "RR_TARGET", "TRAILING_ACTIVATE", "TRAILING_DISTANCE")
+
+
+def exit_settings(params_list):
+    """Array setting exit (max_hold, rr, trail_act, trail_dist) dari list dict parameter."""
+    get = lambda k, d: np.array([p.get(k, d) for p in params_list])
+    return {
+        'max_hold'  : get("MAX_HOLD_DAYS", 10).astype(np.int64),
+        'rr'        : get("RR_TARGET", 2.0).astype(np.float64),
+        'trail_act' : get("TRAILING_ACTIVATE", 0.04).astype(np.float64),
+        'trail_dist': get("TRAILING_DISTANCE", 0.02).astype(np.float64),
+    }
+
+
+def simulate_exits_batch(prices, entry_idx, entry_price, sl, tp, max_hold, trail_act, trail_dist):
+    """
+    Exit semua trade untuk S setting sekaligus di matriks [setting x trade x hold],
+    aturan sama dengan simulate_exit_with_trailing:
+    - trailing aktif setelah high tertinggi >= entry x (1 + trail_act),
+      SL trail = high tertinggi x (1 - trail_dist)
+    - SL & TP kena di bar yang sama: Open <= SL -> SL di min(Open, SL), selain itu TP
+    - hanya SL kena: exit di SL ('Trailing SL' jika trailing aktif)
+    - bar ke-max_hold -> Time Exit di Close; window melewati akhir data -> Time Exit
+      di Close bar terakhir
+    prices   : dict array 'Open','High','Low','Close' satu ticker (periode backtest)
+    sl, tp   : [T] atau [S x T]; max_hold, trail_act, trail_dist : [S]
+    Return (exit_idx, exit_price, kode alasan EXIT_*), masing-masing [S x T].
+    """
+    max_hold   = np.atleast_1d(np.asarray(max_hold, dtype=np.int64))
+    trail_act  = np.atleast_1d(np.asarray(trail_act, dtype=np.float64))[:, None, None]
+    trail_dist = np.atleast_1d(np.asarray(trail_dist, dtype=np.float64))[:, None, None]
+    n_set      = len(max_hold)
+    n_bars     = len(prices['Close'])
+    entry_idx  = np.asarray(entry_idx, dtype=np.int64)
+    n_trade    = len(entry_idx)
+    entry      = np.asarray(entry_price, dtype=np.float64)[None, :, None]
+    sl         = np.broadcast_to(np.asarray(sl, dtype=np.float64), (n_set, n_trade))[:, :, None]
+    tp         = np.broadcast_to(np.asarray(tp, dtype=np.float64), (n_set, n_trade))[:, :, None]
+
+    # Window harga & high tertinggi tidak bergantung setting: [1 x trade x hold]
+    width = int(max_hold.max()) if n_set else 0
+    hold  = entry_idx[:, None] + np.arange(1, width + 1)[None, :]
+    valid = hold < n_bars
+    at    = np.minimum(hold, n_bars - 1)
+    o, h, l, c = (prices[k][at][None] for k in ('Open', 'High', 'Low', 'Close'))
+    highest = np.maximum(np.maximum.accumulate(np.where(valid, h[0], -np.inf), axis=1)[None], entry)
+
+    active = (highest - entry) / entry >= trail_act
+    # highest tidak pernah turun -> SL trail terbesar selalu dari highest terbaru
+    cur_sl = np.where(active, np.maximum(sl, highest * (1 - trail_dist)), sl)
+    hit_sl = l <= cur_sl
+    hit_tp = h >= tp
+
+    last = np.arange(width)[None, None, :] == (max_hold - 1)[:, None, None]
+    stop = ~valid[None] | hit_sl | hit_tp | last
+    j    = stop.argmax(axis=2)
+    ss, tt = np.ogrid[:n_set, :n_trade]
+    pick = lambda a: np.broadcast_to(a, (n_set, n_trade, width))[ss, tt, j]
+
+    in_df  = pick(valid[None])
+    o_j, c_j, sl_j, tp_j = pick(o), pick(c), pick(cur_sl), tp[:, :, 0]
+    sl_hit, tp_hit, act_j = pick(hit_sl) & in_df, pick(hit_tp) & in_df, pick(active)
+
+    both       = sl_hit & tp_hit
+    gap_sl     = both & (o_j <= sl_j)
+    exit_price = np.select([gap_sl, both, sl_hit, tp_hit], [np.minimum(o_j, sl_j), tp_j, sl_j, tp_j], c_j)
+    reason     = np.select([gap_sl, both, sl_hit & act_j, sl_hit, tp_hit],
+                           [EXIT_SL, EXIT_TP, EXIT_TRAIL, EXIT_SL, EXIT_TP], EXIT_TIME)
+    exit_idx   = np.where(in_df, pick(hold[None]), n_bars - 1)
+    exit_price = np.where(in_df, exit_price, prices['Close'][n_bars - 1])
+    return exit_idx, exit_price, reason
+
+
+def simulate_exits(prices, entry_idx, entry_price, sl, tp, params):
+    """simulate_exits_batch untuk satu set parameter; Return array [trade]."""
+    st = exit_settings([params])
+    out = simulate_exits_batch(prices, entry_idx, entry_price, sl, tp,
+                               st['max_hold'], st['trail_act'], st['trail_dist'])
+    return tuple(x[0] for x in out)
+
+
+# ==========================================
+# KANDIDAT TRADE PER TICKER
+# ==========================================
+PRICE_COLS  = ['Open', 'High', 'Low', 'Close']
+PER_SETTING = ('tp_price', 'exit_date', 'exit_price', 'exit_reason')
+SIGNAL_KEYS = ['best', 'tier', 'pat_score', 'vol_value', 'near_sup', 'vol_thrust']
+
+
+def ticker_arrays(df_ind, regime_ok=None, sig=None):
+    """
+    Semua yang dibutuhkan backtest satu ticker sebagai array: dates (datetime64[ns]),
+    OHLC, signal_arrays, dan 'regime' (bool per bar, True semua jika tanpa regime filter).
+    """
+    arrays = {'dates': df_ind.index.values.astype('datetime64[ns]')}
+    arrays.update({k: df_ind[k].to_numpy(dtype=np.float64) for k in PRICE_COLS})
+    arrays.update(sig if sig is not None else signal_arrays(df_ind))
+    arrays['regime'] = (np.ones(len(df_ind), dtype=bool) if regime_ok is None
+                        else np.asarray(regime_ok, dtype=bool))
+    return arrays
+
+
+def candidate_trades(arr, params, bt_start, bt_end, batch=None):
+    """
+    Semua trade kandidat satu ticker di [bt_start, bt_end]: sinyal di bar t, entry Open t+1,
+    SL = Low t, TP = entry + risk x RR_TARGET, plus exit-nya (dihitung untuk semua kandidat,
+    bukan hanya yang akhirnya diambil portofolio).
+    arr   : ticker_arrays(); regime dipakai jika USE_IHSG_FILTER.
+    batch : list parameter yang hanya berbeda di EXIT_PARAMS (default [params]);
+            kolom tp_price / exit_* berbentuk [setting x trade], sisanya [trade].
+    Return dict array (kosong -> None).
+    """
+    dates  = arr['dates']
+    lo, hi = (dates.searchsorted(np.datetime64(pd.Timestamp(bt_start), 'ns'), side='left'),
+              dates.searchsorted(np.datetime64(pd.Timestamp(bt_end), 'ns'), side='right'))
+    if hi - lo < MIN_BARS:
+        return None
+
+    pos = np.arange(lo + WARMUP_BARS, hi - 1)
+    ok  = signal_mask(arr, params)
+    if params.get("USE_IHSG_FILTER", True):
+        ok = ok & arr['regime']
+    pos = pos[ok[pos]]
+
+    entry_price = arr['Open'][pos + 1]
+    sl_price    = np.round(arr['Low'][pos], 2)
+    risk_ps     = entry_price - sl_price
+    keep        = (entry_price > 0) & ~np.isnan(entry_price) & (risk_ps > 0)
+    pos, entry_price, sl_price, risk_ps = pos[keep], entry_price[keep], sl_price[keep], risk_ps[keep]
+    if not len(pos):
+        return None
+
+    st       = exit_settings(batch or [params])
+    tp_price = entry_price[None, :] + risk_ps[None, :] * st['rr'][:, None]
+    prices   = {k: arr[k][lo:hi] for k in PRICE_COLS}
+    exit_idx, exit_price, reason = simulate_exits_batch(
+        prices, pos + 1 - lo, entry_price, sl_price, tp_price,
+        st['max_hold'], st['trail_act'], st['trail_dist'])
+    return {
+        'signal_date': dates[pos],
+        'entry_date' : dates[pos + 1],
+        'entry_price': entry_price,
+        'sl_price'   : sl_price,
+        'risk_ps'    : risk_ps,
+        'pattern'    : arr['best'][pos],
+        'tier'       : arr['tier'][pos],
+        'pat_score'  : arr['pat_score'][pos],
+        'tp_price'   : tp_price,
+        'exit_date'  : dates[lo + exit_idx],
+        'exit_price' : exit_price,
+        'exit_reason': reason,
+    }
+
+
+def collect_trades(arrays, params, bt_start, bt_end, batch=None):
+    """
+    Kandidat trade seluruh ticker, diurutkan entry_date naik, tier turun, skor turun
+    (urutan asli dipertahankan jika sama). arrays : dict {ticker: ticker_arrays()}.
+    Return dict array + kolom 'ticker' (None jika tidak ada kandidat); dengan batch,
+    list dict seperti itu, satu per setting exit (kandidat & urutannya sama).
+    """
+    n_set = len(batch) if batch else 1
+    parts = []
+    for ticker, arr in arrays.items():
+        t = candidate_trades(arr, params, bt_start, bt_end, batch)
+        if t is not None:
+            t['ticker'] = np.full(len(t['entry_price']), ticker, dtype=object)
+            parts.append(t)
+    if not parts:
+        return [None] * n_set if batch else None
+
+    trades = {k: np.concatenate([p[k] for p in parts], axis=-1) for k in parts[0]}
+    order  = np.lexsort((-trades['pat_score'], -trades['tier'].astype(np.int64),
+                         trades['entry_date'].view(np.int64)))
+    trades = {k: v[..., order] for k, v in trades.items()}
+    out = [{k: (v[i] if k in PER_SETTING else v) for k, v in trades.items()} for i in range(n_set)]
+    return out if batch else out[0]
+
+
+# ==========================================
+# CACHE SINYAL (GRID SEARCH)
+# ==========================================
+class SignalCache:
+    """
+    Array backtest per ticker (ticker_arrays: harga, sinyal mentah, regime per bar),
+    dihitung sekali lalu dipakai semua kombinasi grid: parameter grid (MAX_HOLD_DAYS,
+    RR_TARGET, MIN_SCORE, TRAILING_*) hanya mengubah filter & exit, bukan deteksi pola.
+    regime : callable(dates) -> array bool (mis. regime.RegimeSeries, as-of join per ticker)
+    """
+
+    def __init__(self, all_ticker_data, regime=None):
+        self.arrays = {
+            t: ticker_arrays(df, regime(df.index) if regime is not None else None)
+            for t, df in all_ticker_data.items()
+        }
+
+    def trades(self, params, bt_start, bt_end, batch=None):
+        """collect_trades untuk satu kombinasi parameter tanpa menghitung ulang sinyal."""
+        return collect_trades(self.arrays, params, bt_start, bt_end, batch)
+
+    def pack(self):
+        """
+        Semua ticker disambung per kolom (untuk shared_mem) + {ticker: (start, stop)}.
+        Worker membangun ulang view per ticker lewat unpack() tanpa pickle DataFrame.
+        """
+        bounds, pos = {}, 0
+        for ticker, arr in self.arrays.items():
+            bounds[ticker] = (pos, pos + len(arr['dates']))
+            pos += len(arr['dates'])
+        keys   = next(iter(self.arrays.values())).keys() if self.arrays else []
+        shared = {k: np.concatenate([arr[k] for arr in self.arrays.values()]) for k in keys}
+        return shared, bounds
+
+
+def unpack(shared, bounds):
+    """dict {ticker: ticker_arrays} (view, tanpa salinan) dari array hasil SignalCache.pack()."""
+    return {t: {k: v[a:b] for k, v in shared.items()} for t, (a, b) in bounds.items()}
+
+
+# ==========================================
+# GRID SEARCH PARALEL
+# ==========================================
+def _grid_task(task):
+    batch, bt_start, bt_end, bounds, modal_awal, sizing, evaluate = task
+    try:
+        trades = collect_trades(unpack(shared_mem.attached(), bounds), batch[0], bt_start, bt_end, batch)
+    except Exception:
+        return [None] * len(batch)
+    results = []
+    for t in trades:
+        try:
+            results.append(evaluate(*simulate_portfolio(t, modal_awal, **(sizing or {}))))
+        except Exception:
+            results.append(None)
+    return results
+
+
+def exit_batches(combos, size=GRID_BATCH):
+    """
+    Kelompokkan index kombinasi yang hanya berbeda di EXIT_PARAMS (kandidat sinyal sama),
+    dipotong per `size` agar tetap ada cukup task untuk process pool.
+    """
+    groups = {}
+    for i, p in enumerate(combos):
+        key = tuple(sorted((k, v) for k, v in p.items() if k not in EXIT_PARAMS))
+        groups.setdefault(key, []).append(i)
+    return [idx[k:k + size] for idx in groups.values() for k in range(0, len(idx), size)]
+
+
+class SearchSession:
+    """
+    cache.pack() + satu shared_mem.SharedPool untuk beberapa panggilan grid_search /
+    range_search berturut-turut (mis. batch TPE di param_search): universe disalin ke
+    shared memory dan worker di-spawn sekali per sesi, bukan sekali per panggilan.
+    Dipakai sebagai `with SearchSession(cache, workers) as session:`.
+    """
+
+    def __init__(self, cache, workers=None):
+        self.shared, self.bounds = cache.pack()
+        self.pool = shared_mem.SharedPool(self.shared, workers)
+
+    def __enter__(self):
+        self.pool.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        self.pool.close()
+
+
+def grid_search(cache, combos, bt_start, bt_end, evaluate, modal_awal, sizing=None, workers=None,
+                session=None):
+    """
+    Backtest setiap kombinasi parameter di process pool; array cache di shared memory
+    (di-attach worker sekali lewat initializer), task hanya membawa parameter.
+    Kombinasi dengan filter sinyal sama dijalankan satu task: kandidat dihitung sekali,
+    exit semua setting lewat simulate_exits_batch.
+    evaluate : fungsi level-modul (portfolio, final_equity) -> hasil (None = dibuang)
+    sizing   : kwargs simulate_portfolio (lot_size, slots, fee_buy, fee_sell)
+    session  : SearchSession terbuka (pool + shared memory dipakai ulang); None = pool sendiri
+    Generator (index kombinasi, params, hasil) sesuai urutan selesai; kombinasi yang
+    error menghasilkan None.
+    """
+    for _, i, params, result in range_search(cache, [(bt_start, bt_end)], combos, evaluate,
+                                             modal_awal, sizing, workers, session):
+        yield i, params, result
+
+
+def range_search(cache, ranges, combos, evaluate, modal_awal, sizing=None, workers=None, session=None):
+    """
+    grid_search untuk beberapa rentang (bt_start, bt_end) sekaligus dalam satu pool
+    (mis. fold walk-forward): task semua rentang berjalan paralel, bukan per rentang.
+    Generator (index rentang, index kombinasi, params, hasil) sesuai urutan selesai.
+    """
+    combos, ranges = list(combos), list(ranges)
+    if not combos or not ranges:
+        return
+    batches = exit_batches(combos)
+    jobs    = [(r, idx) for r in range(len(ranges)) for idx in batches]
+    if session is None:
+        with SearchSession(cache, min(workers or shared_mem.N_WORKERS, len(jobs))) as session:
+            yield from range_search(cache, ranges, combos, evaluate, modal_awal, sizing, session=session)
+        return
+
+    tasks = [([combos[i] for i in idx], *ranges[r], session.bounds, modal_awal, sizing, evaluate)
+             for r, idx in jobs]
+    for b, results in session.pool.imap(_grid_task, tasks):
+        r, idx = jobs[b]
+        for i, result in zip(idx, results):
+            yield r, i, combos[i], result
+
+
+def range_fingerprint(cache, bt_start, bt_end):
+    """
+    Hash isi cache yang dibaca backtest [bt_start, bt_end] (semua array per ticker di
+    rentang tsb.); berubah jika data / sinyal di rentang itu berubah.
+    """
+    start = np.datetime64(pd.Timestamp(bt_start), 'ns')
+    end   = np.datetime64(pd.Timestamp(bt_end), 'ns')
+    h     = hashlib.sha1()
+    for ticker in sorted(cache.arrays):
+        arr    = cache.arrays[ticker]
+        lo, hi = arr['dates'].searchsorted(start, side='left'), arr['dates'].searchsorted(end, side='right')
+        h.update(ticker.encode())
+        for k in sorted(arr):
+            h.update(np.ascontiguousarray(arr[k][lo:hi]).tobytes())
+    return h.hexdigest()
+
+
+# ==========================================
+# PORTOFOLIO (MULTI POSISI, EVENT HEAP)
+# ==========================================
+EV_ENTRY, EV_EXIT = 0, 1
+
+
+def _fmt_date(d):
+    return pd.Timestamp(d).strftime("%Y-%m-%d")
+
+
+def simulate_portfolio(trades, modal_awal, lot_size=100, slots=1, fee_buy=0.0, fee_sell=0.0):
+    """
+    Maksimal `slots` posisi bersamaan, digerakkan heap event entry/exit (O(event log event)):
+    - event urut tanggal; di tanggal yang sama entry diproses sebelum exit, jadi slot /
+      dana dari posisi yang exit hari itu baru bisa dipakai entry hari berikutnya
+    - entry di tanggal sama diprioritaskan tier turun, skor turun, lalu urutan asli
+    - entry dilewati jika slot penuh; ukuran = lot penuh dari min(kas, equity / slots),
+      equity = modal + P/L trade yang sudah selesai
+    - fee_buy / fee_sell : persentase biaya dari nilai transaksi (mis. 0.0015 = 0,15%)
+    slots=1 tanpa fee sama dengan aturan satu posisi (entry <= exit posisi aktif dilewati).
+    Return (trade log list of dict urut tanggal exit, equity akhir).
+    """
+    equity, portfolio = float(modal_awal), []
+    if trades is None:
+        return portfolio, equity
+
+    entry_date = trades['entry_date'].view(np.int64)
+    exit_date  = trades['exit_date'].view(np.int64)
+    events = [(entry_date[i], EV_ENTRY, -int(trades['tier'][i]), -trades['pat_score'][i], i)
+              for i in range(len(entry_date))]
+    heapq.heapify(events)
+
+    stars, invested, held = {1: '⭐', 2: '⭐⭐', 3: '⭐⭐⭐'}, 0.0, {}
+    while events:
+        _, kind, _, _, i = heapq.heappop(events)
+        entry_price = trades['entry_price'][i]
+        entry_cost  = entry_price * (1 + fee_buy)
+
+        if kind == EV_ENTRY:
+            if len(held) >= slots:
+                continue
+            budget     = min(equity - invested, equity / slots)
+            max_shares = int((budget / entry_cost) // lot_size) * lot_size
+            if max_shares <= 0:
+                continue
+            held[i]   = max_shares
+            invested += max_shares * entry_cost
+            heapq.heappush(events, (exit_date[i], EV_EXIT, 0, 0, i))
+            continue
+
+        total_shares = held.pop(i)
+        invested     = invested - total_shares * entry_cost if held else 0.0
+        lot_count    = total_shares // lot_size
+        exit_price   = trades['exit_price'][i]
+        exit_net     = exit_price * (1 - fee_sell)
+        risk_ps      = trades['risk_ps'][i]
+        tier         = int(trades['tier'][i])
+        pola         = SIGNAL_REGISTRY['labels'][trades['pattern'][i]]
+
+        pnl_rp  = (exit_net - entry_cost) * total_shares
+        equity += pnl_rp
+        portfolio.append({
+            "Ticker"          : trades['ticker'][i],
+            "Pola"            : pola + " " + stars.get(tier, ''),
+            "Pola Base"       : pola,
+            "Tier"            : tier,
+            "Skor Pola"       : trades['pat_score'][i],
+            "Entry Date"      : _fmt_date(trades['entry_date'][i]),
+            "Entry Price"     : round(entry_price, 0),
+            "Lot Size"        : lot_count,
+            "Total Investasi" : round(total_shares * entry_price, 0),
+            "Stop Loss"       : round(trades['sl_price'][i], 0),
+            "Target (TP)"     : round(trades['tp_price'][i], 0),
+            "Exit Date"       : _fmt_date(trades['exit_date'][i]),
+            "Exit Price"      : round(exit_price, 0),
+            "Exit Reason"     : EXIT_REASONS[trades['exit_reason'][i]],
+            "Biaya (Rp)"      : round(total_shares * (entry_cost - entry_price + exit_price - exit_net), 0),
+            "Profit/Loss (Rp)": round(pnl_rp, 0),
+            "Return %"        : round((exit_net - entry_cost) / entry_cost * 100, 2),
+            "Equity Setelah"  : round(equity, 0),
+            "R Multiple"      : round((exit_net - entry_cost) / risk_ps if risk_ps > 0 else 0, 2),
+        })
+    return portfolio, equity
@@ -0,0 +1,219 @@
+# ==========================================
+# DATA CACHE OHLCV + MULTI-TIMEFRAME
+# Daily di-download sekali per run, disimpan ke disk (parquet),
+# Weekly / Monthly diturunkan dari daily yang sama (tanpa request tambahan)
+# ==========================================
+
+import os
+import time
+import pandas as pd
+import yfinance as yf
+
+CACHE_DIR      = os.environ.get("SAHAM_CACHE_DIR", ".cache")
+CACHE_PERIOD   = "2y"          # Histori yang disimpan; scanner memotong sesuai kebutuhan
+CACHE_MAX_AGE  = 3 * 60 * 60   # Detik; file lebih tua dari ini di-download ulang
+OHLCV_COLS     = ["Open", "High", "Low", "Close", "Volume"]
+
+# Intraday: histori maksimum yfinance per interval; setelah ada cache hanya
+# INTRADAY_REFRESH terakhir yang di-download lalu digabung ke file yang ada
+INTRADAY_PERIOD  = {"1h": "730d", "30m": "60d", "15m": "60d"}
+INTRADAY_MINUTES = {"1h": 60, "30m": 30, "15m": 15}
+INTRADAY_REFRESH = "5d"
+TZ_MARKET        = "Asia/Jakarta"
+
+
+def _month_end_rule():
+    # pandas >= 2.2 memakai "ME", versi lama "M"
+    try:
+        pd.tseries.frequencies.to_offset("ME")
+        return "ME"
+    except ValueError:
+        return "M"
+
+
+# Interval turunan -> aturan resample (minggu bursa IDX berakhir Jumat)
+TIMEFRAMES = {
+    "1wk": "W-FRI",
+    "1mo": _month_end_rule(),
+}
+
+# Cache in-memory per proses: (interval, ticker, auto_adjust) -> DataFrame
+_MEMO = {}
+
+
+# ==========================================
+# HELPER
+# ==========================================
+def _cache_path(interval, ticker, auto_adjust):
+    adj = "adj" if auto_adjust else "raw"
+    return os.path.join(CACHE_DIR, interval, adj, f"{ticker}.parquet")
+
+
+def _is_fresh(path):
+    return os.path.exists(path) and (time.time() - os.path.getmtime(path)) < CACHE_MAX_AGE
+
+
+def _read(path):
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        print(f"  -> ⚠️ Cache rusak {path}: {e}")
+        return None
+
+
+def _write(path, df):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        df.to_parquet(path)
+    except Exception as e:
+        print(f"  -> ⚠️ Gagal simpan cache {path}: {e}")
+
+
+def normalize_ohlcv(df):
+    """Ratakan kolom MultiIndex yfinance, index datetime tanpa timezone, urut naik."""
+    if df is None or df.empty:
+        return None
+    df = df.copy()
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
+    if "Close" not in df.columns and "Adj Close" in df.columns:
+        df["Close"] = df["Adj Close"]
+    if not all(c in df.columns for c in OHLCV_COLS):
+        return None
+    df = df[OHLCV_COLS].dropna(subset=["High", "Low", "Close"])
+    df.index = pd.to_datetime(df.index)
+    if df.index.tz is not None:
+        df.index = df.index.tz_localize(None)
+    df.index.name = "Date"
+    return df.sort_index()
+
+
+def _slice(df, period=None, days=None):
+    """Potong histori: period gaya yfinance ('6mo', '1y', '2y', '90d') atau jumlah hari."""
+    if df is None or (period is None and days is None):
+        return df
+    today = pd.Timestamp.today().normalize()
+    if days is not None:
+        cutoff = today - pd.Timedelta(days=days)
+    elif period.endswith("mo"):
+        cutoff = today - pd.DateOffset(months=int(period[:-2]))
+    elif period.endswith("y"):
+        cutoff = today - pd.DateOffset(years=int(period[:-1]))
+    elif period.endswith("d"):
+        cutoff = today - pd.Timedelta(days=int(period[:-1]))
+    else:
+        raise ValueError(f"Period tidak dikenal: {period}")
+    return df[df.index >= cutoff]
+
+
+# ==========================================
+# RESAMPLE
+# ==========================================
+def resample_ohlcv(df, rule):
+    """Bar OHLCV timeframe lebih tinggi dari bar harian."""
+    agg = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+    return df.resample(rule).agg(agg).dropna(subset=["Close"])
+
+
+# ==========================================
+# PUBLIC API
+# ==========================================
+def load_daily(ticker, period=None, days=None, auto_adjust=True):
+    """
+    OHLCV harian dari cache (memori -> disk -> yfinance).
+    Download selalu CACHE_PERIOD penuh, lalu dipotong sesuai period/days.
+    Return None jika data tidak tersedia.
+    """
+    key = ("1d", ticker, auto_adjust)
+    if key not in _MEMO:
+        path = _cache_path("1d", ticker, auto_adjust)
+        df   = _read(path) if _is_fresh(path) else None
+        if df is None:
+            try:
+                raw = yf.download(ticker, period=CACHE_PERIOD, interval="1d",
+                                  progress=False, auto_adjust=auto_adjust, threads=False)
+            except Exception as e:
+                print(f"  -> ❌ Download gagal {ticker}: {e}")
+                raw = None
+            df = normalize_ohlcv(raw)
+            if df is not None:
+                _write(path, df)
+        _MEMO[key] = df
+    return _slice(_MEMO[key], period, days)
+
+
+def load_timeframe(ticker, interval, auto_adjust=True):
+    """
+    Bar weekly ('1wk') / monthly ('1mo') diturunkan dari cache harian.
+    Hasil resample ikut disimpan di samping file harian.
+    """
+    if interval == "1d":
+        return load_daily(ticker, auto_adjust=auto_adjust)
+
+    key = (interval, ticker, auto_adjust)
+    if key not in _MEMO:
+        path = _cache_path(interval, ticker, auto_adjust)
+        df   = _read(path) if _is_fresh(path) else None
+        if df is None:
+            daily = load_daily(ticker, auto_adjust=auto_adjust)
+            df    = resample_ohlcv(daily, TIMEFRAMES[interval]) if daily is not None else None
+            if df is not None:
+                _write(path, df)
+        _MEMO[key] = df
+    return _MEMO[key]
+
+
+def load_intraday(ticker, interval="1h", auto_adjust=True, now=None):
+    """
+    Bar intraday ('1h' / '30m' / '15m') dari cache, index jam bursa (WIB) tanpa timezone.
+    Cache dianggap segar selama satu interval; jika basi dan bar terakhir masih dalam
+    jangkauan INTRADAY_REFRESH, hanya bar terbaru yang di-download lalu digabung.
+    Bar yang belum close (mulai + interval > now) dibuang.
+    """
+    key = (interval, ticker, auto_adjust)
+    if key not in _MEMO:
+        step   = pd.Timedelta(minutes=INTRADAY_MINUTES[interval])
+        path   = _cache_path(interval, ticker, auto_adjust)
+        cached = _read(path) if os.path.exists(path) else None
+        df     = cached
+        if cached is None or time.time() - os.path.getmtime(path) >= step.total_seconds():
+            recent = (cached is not None and not cached.empty and
+                      cached.index[-1] >= pd.Timestamp.now(tz=TZ_MARKET).tz_localize(None)
+                      - pd.Timedelta(INTRADAY_REFRESH) + pd.Timedelta(days=1))
+            period = INTRADAY_REFRESH if recent else INTRADAY_PERIOD[interval]
+            try:
+                raw = yf.download(ticker, period=period, interval=interval,
+                                  progress=False, auto_adjust=auto_adjust, threads=False)
+            except Exception as e:
+                print(f"  -> ❌ Download gagal {ticker} {interval}: {e}")
+                raw = None
+            if raw is not None and not raw.empty and raw.index.tz is not None:
+                raw.index = raw.index.tz_convert(TZ_MARKET)
+            fresh = normalize_ohlcv(raw)
+            if fresh is not None:
+                df = fresh if not recent else pd.concat([cached, fresh])
+                df = df[~df.index.duplicated(keep="last")].sort_index()
+                _write(path, df)
+        _MEMO[key] = df
+
+    df = _MEMO[key]
+    if df is None:
+        return None
+    now = now or pd.Timestamp.now(tz=TZ_MARKET).tz_localize(None)
+    return df[df.index + pd.Timedelta(minutes=INTRADAY_MINUTES[interval]) <= now]
+
+
+def load_timeframes(ticker, period=None, days=None, auto_adjust=True, intervals=("1wk", "1mo")):
+    """
+    Dict {'1d': daily (dipotong period/days), '1wk': ..., '1mo': ...}.
+    Timeframe tinggi dikembalikan dengan histori cache penuh agar indikator HTF cukup bar.
+    """
+    frames = {"1d": load_daily(ticker, period=period, days=days, auto_adjust=auto_adjust)}
+    for interval in intervals:
+        frames[interval] = load_timeframe(ticker, interval, auto_adjust=auto_adjust)
+    return frames
+
+
+def clear_memo():
+    """Kosongkan cache in-memory (file di disk tetap)."""
+    _MEMO.clear()
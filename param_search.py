@@ -0,0 +1,94 @@
+# ==========================================
+# PARAMETER SEARCH ADAPTIF — TPE DISKRET
+# Pengganti grid penuh itertools.product: kombinasi dipilih bertahap.
+# Setelah n_init kombinasi acak, hasil dibagi "bagus" (gamma teratas) dan "buruk";
+# tiap nilai parameter diberi densitas l(x) / g(x) (hitungan + prior Laplace,
+# parameter dianggap independen) dan kombinasi grid yang belum dievaluasi dengan
+# rasio l/g terbesar dijalankan berikutnya (per batch lewat backtest_engine.grid_search
+# dalam satu SearchSession: universe dikemas ke shared memory & pool di-spawn sekali
+# untuk seluruh search). Index kombinasi tetap index grid penuh, jadi ranking hasil
+# sama persis dengan mode grid.
+# ==========================================
+
+import itertools
+import math
+
+import numpy as np
+
+import backtest_engine
+import shared_mem
+
+
+def grid_combos(grid, fixed=None):
+    """Semua kombinasi grid (urutan itertools.product) + parameter tetap."""
+    keys = list(grid)
+    return [dict(zip(keys, combo), **(fixed or {}))
+            for combo in itertools.product(*[grid[k] for k in keys])]
+
+
+def _densities(codes, good, sizes, prior=1.0):
+    """log l(x) - log g(x) per parameter per nilai dari index kombinasi bagus vs buruk."""
+    good = np.asarray(good, dtype=bool)
+    out  = []
+    for p, k in enumerate(sizes):
+        cg = np.bincount(codes[good, p], minlength=k) + prior
+        cb = np.bincount(codes[~good, p], minlength=k) + prior
+        out.append(np.log(cg / cg.sum()) - np.log(cb / cb.sum()))
+    return out
+
+
+def tpe_search(cache, grid, fixed, bt_start, bt_end, evaluate, score, modal_awal,
+               sizing=None, budget=None, n_init=None, batch=None, gamma=0.25,
+               seed=None, workers=None, verbose=True):
+    """
+    grid     : {parameter: [nilai]} (sama dengan grid penuh), fixed : parameter tetap
+    evaluate : fungsi level-modul untuk grid_search (None = kombinasi dibuang)
+    score    : hasil evaluate -> nilai yang dibandingkan (lebih besar lebih baik, mis. tuple)
+    budget   : jumlah kombinasi yang dievaluasi (default ~10% grid, minimal 20)
+    Return (combos grid penuh, {index kombinasi: hasil evaluate} untuk yang dievaluasi & valid).
+    """
+    combos = grid_combos(grid, fixed)
+    sizes  = [len(v) for v in grid.values()]
+    codes  = np.array(list(itertools.product(*[range(k) for k in sizes])), dtype=np.int64)
+    total  = len(combos)
+    budget = min(total, budget or max(20, math.ceil(total / 10)))
+    n_init = min(budget, n_init or max(len(sizes) + 1, budget // 3))
+    batch  = batch or max(1, shared_mem.N_WORKERS)
+    rng    = np.random.default_rng(seed)
+
+    results, scores = {}, {}
+    todo = [int(i) for i in rng.choice(total, size=n_init, replace=False)]
+    with backtest_engine.SearchSession(cache, workers) as session:
+        while todo:
+            picked = [combos[i] for i in todo]
+            for j, _, result in backtest_engine.grid_search(cache, picked, bt_start, bt_end, evaluate,
+                                                            modal_awal, sizing, session=session):
+                i = todo[j]
+                scores[i] = score(result) if result is not None else None
+                if result is not None:
+                    results[i] = result
+
+            done = len(scores)
+            if done >= budget:
+                break
+            # Bagus = gamma teratas dari yang valid; kombinasi tidak valid ikut "buruk"
+            done_idx = np.array(sorted(scores))
+            valid    = [i for i in done_idx if scores[i] is not None]
+            n_good   = max(1, math.ceil(gamma * len(valid))) if valid else 0
+            good_set = set(sorted(valid, key=lambda i: scores[i], reverse=True)[:n_good])
+            dens     = _densities(codes[done_idx], [i in good_set for i in done_idx], sizes)
+
+            rest  = np.setdiff1d(np.arange(total), done_idx)
+            ratio = sum(dens[p][codes[rest, p]] for p in range(len(sizes)))
+            order = np.lexsort((rng.random(len(rest)), -ratio))       # seri diacak (seed)
+            todo  = [int(i) for i in rest[order[:min(batch, budget - done)]]]
+            if verbose:
+                best = max(valid, key=lambda i: scores[i], default=None)
+                print(f"   TPE: {done}/{budget} evaluasi  |  valid {len(valid)}"
+                      + (f"  |  terbaik: {scores[best]}" if best is not None else ""))
+
+    if verbose:
+        saved = total - len(scores)
+        print(f"   Evaluasi: {len(scores)} dari {total} kombinasi grid "
+              f"(hemat {saved} backtest, {saved / total * 100:.1f}%)")
+    return combos, results
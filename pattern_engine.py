@@ -0,0 +1,878 @@
+# ==========================================
+# PATTERN ENGINE — CANDLESTICK VEKTORISASI
+# Pola dideklarasikan di registry (kondisi + filter konfluensi + base prob),
+# dikompilasi jadi ekspresi array penuh untuk seluruh histori.
+# Scanner live membaca bar terakhir, backtest membaca seluruh kolom.
+# ==========================================
+
+import ast
+import time
+import numpy as np
+import pandas as pd
+import ta
+
+MA_PERIODS = [10, 20, 50, 100, 200]
+
+
+# ==========================================
+# REGISTRY POLA (DEKLARATIF)
+# Setiap pola = kondisi dasar (di-AND) + filter konfluensi tier + filter skor + base prob.
+# Urutan list = priority ladder (pola paling rare/kuat di atas).
+# Nama yang tersedia di ekspresi: day1/day2/day3 (2 bar lalu, kemarin, hari ini),
+# d1..d5 (4 bar lalu .. hari ini), middle (d2, d3, d4), kolom konteks (compute_context),
+# TERMS di bawah, sma20/sma50/close, shift(), near(), np.
+# ==========================================
+
+# Istilah turunan yang dipakai beberapa pola (dievaluasi berurutan sebelum pola)
+TERMS = {
+    # Volume harus naik tiap candle (konfirmasi institusional)
+    'vol_accel_3'      : "(day1.volume > shift(vol_sma20, 2)) & (day2.volume >= day1.volume) & (day3.volume >= day2.volume)",
+    'small_body_2'     : "(day2.range > 0) & (day2.body <= 0.3 * day2.range)",
+    'harami_inside'    : "(day1.body >= 0.5 * day1.range) & (day2.body <= 0.6 * day1.body) & "
+                         "(day2.body_top <= day1.body_top) & (day2.body_bottom >= day1.body_bottom)",
+    'inside_body_3'    : "(day3.body_top <= day2.body_top) & (day3.body_bottom >= day2.body_bottom)",
+    'inside_d1'        : "np.logical_and.reduce([(m.high < d1.high) & (m.low > d1.low) for m in middle])",
+    'gap_high'         : "np.maximum.reduce([m.high for m in middle])",
+    'gap_low'          : "np.minimum.reduce([m.low for m in middle])",
+    'body_bear_2'      : "day2.open - day2.close",
+    'pen_ratio'        : "np.where(body_bear_2 > 0, (day3.close - day2.close) / body_bear_2, 0)",
+    'is_doji'          : "(day3.range > 0) & (day3.body <= 0.08 * day3.range)",
+    'small_body_3'     : "(day3.range > 0) & (day3.body > 0) & (day3.body <= 0.30 * day3.range)",
+    'valid_uptrend_ss' : "(sma20 > sma50) & (sma20 > shift(sma20, 2)) & "
+                         "(close > shift(close, 2)) & (shift(close, 2) > shift(close, 5))",
+}
+
+_BULL_TIER_OS  = ['is_oversold_context', 'is_near_support', 'is_volume_thrust', 'macd_bullish']
+_BEAR_TIER_OB  = ['is_overbought_context', 'is_near_resistance', 'is_volume_thrust', 'macd_bearish']
+_BULL_TIER_EXT = ['is_extreme_oversold', 'is_near_support', 'is_volume_thrust', 'macd_bullish']
+_BEAR_TIER_EXT = ['is_extreme_overbought', 'is_near_resistance', 'is_volume_thrust', 'macd_bearish']
+_BULL_TIER_AVG = ['is_oversold_context', 'is_near_support', 'is_volume_above_avg', 'macd_bullish']
+_BEAR_TIER_AVG = ['is_overbought_context', 'is_near_resistance', 'is_volume_above_avg', 'macd_bearish']
+
+PATTERNS = [
+    # ==================================================
+    # POLA 3 CANDLE
+    # ==================================================
+    {
+        'key': 'bull_abandoned', 'label': "Bullish: Abandoned Baby", 'direction': 'bullish', 'base_prob': 0.65,
+        'when': [
+            "is_downtrend_basic", "day1.bear", "day3.bull",
+            "day1.body >= 0.5 * day1.range", "day3.body >= 0.5 * day3.range",
+            "day2.body <= 0.1 * day2.range",                        # Doji
+            "day2.high < day1.low", "day2.high < day3.low",         # Gap kiri & kanan
+            "day3.close > day1.mid",
+        ],
+        'tier_filters': _BULL_TIER_EXT, 'tier_at': (3, 2),
+    },
+    {
+        'key': 'bear_abandoned', 'label': "Bearish: Abandoned Baby", 'direction': 'bearish', 'base_prob': 0.65,
+        'when': [
+            "is_uptrend_basic", "day1.bull", "day3.bear",
+            "day1.body >= 0.5 * day1.range", "day3.body >= 0.5 * day3.range",
+            "day2.body <= 0.1 * day2.range",                        # Doji
+            "day2.low > day1.high", "day2.low > day3.high",         # Gap kiri & kanan
+            "day3.close < day1.mid",
+        ],
+        'tier_filters': _BEAR_TIER_EXT, 'tier_at': (3, 2),
+    },
+    {
+        'key': '3ws', 'label': "Bullish: 3 White Soldiers", 'direction': 'bullish', 'base_prob': 0.60,
+        'when': [
+            "is_downtrend_basic", "day1.bull", "day2.bull", "day3.bull",
+            "day1.body >= 0.5 * day1.range", "day2.body >= 0.5 * day2.range", "day3.body >= 0.5 * day3.range",
+            "day2.close > day1.close", "day3.close > day2.close",
+            "day2.open >= day1.open", "day2.open <= day1.close",
+            "day3.open >= day2.open", "day3.open <= day2.close",
+            "day1.close_near_high()", "day2.close_near_high()", "day3.close_near_high()",
+            "candle_is_significant",
+        ],
+        'tier_filters': ['vol_accel_3', 'is_extreme_oversold', 'is_near_support', 'macd_bullish', 'is_volatile_regime'],
+        'tier_at': (4, 2),
+        'score_filters': ['vol_accel_3', 'is_extreme_oversold', 'is_near_support', 'macd_bullish'],
+    },
+    {
+        'key': '3bc', 'label': "Bearish: 3 Black Crows", 'direction': 'bearish', 'base_prob': 0.60,
+        'when': [
+            "is_uptrend_basic", "day1.bear", "day2.bear", "day3.bear",
+            "day1.body >= 0.5 * day1.range", "day2.body >= 0.5 * day2.range", "day3.body >= 0.5 * day3.range",
+            "day2.close < day1.close", "day3.close < day2.close",
+            "day2.open <= day1.open", "day2.open >= day1.close",
+            "day3.open <= day2.open", "day3.open >= day2.close",
+            "day1.close_near_low()", "day2.close_near_low()", "day3.close_near_low()",
+            "candle_is_significant",
+        ],
+        'tier_filters': ['vol_accel_3', 'is_extreme_overbought', 'is_near_resistance', 'macd_bearish', 'is_volatile_regime'],
+        'tier_at': (4, 2),
+        'score_filters': ['vol_accel_3', 'is_extreme_overbought', 'is_near_resistance', 'macd_bearish'],
+    },
+    {
+        'key': 'morning_star', 'label': "Bullish: Morning Star", 'direction': 'bullish', 'base_prob': 0.60,
+        'when': [
+            "is_proper_downtrend",
+            "day1.bear", "day1.range > 0", "day1.body >= 0.6 * day1.range",
+            "small_body_2",
+            "day3.bull", "day3.range > 0", "day3.body >= 0.6 * day3.range",
+            "day3.close >= day1.mid", "candle_is_significant",
+        ],
+        'tier_filters': _BULL_TIER_EXT + ['is_volatile_regime'], 'tier_at': (4, 2),
+        'score_filters': _BULL_TIER_EXT,
+    },
+    {
+        'key': 'evening_star', 'label': "Bearish: Evening Star", 'direction': 'bearish', 'base_prob': 0.60,
+        'when': [
+            "is_proper_uptrend",
+            "day1.bull", "day1.range > 0", "day1.body >= 0.6 * day1.range",
+            "small_body_2",
+            "day3.bear", "day3.range > 0", "day3.body >= 0.6 * day3.range",
+            "day3.close <= day1.mid", "candle_is_significant",
+        ],
+        'tier_filters': _BEAR_TIER_EXT + ['is_volatile_regime'], 'tier_at': (4, 2),
+        'score_filters': _BEAR_TIER_EXT,
+    },
+    {
+        'key': '3_outside_up', 'label': "Bullish: 3 Outside Up", 'direction': 'bullish', 'base_prob': 0.58,
+        'when': [
+            "is_downtrend_basic", "day1.bear", "day2.bull",
+            "day2.close > day1.open", "day2.open < day1.close", "day2.body > day1.body * 1.2",
+            "day3.bull", "day3.body >= 0.5 * day3.range", "day3.close > day2.high",
+            "candle_is_significant",
+        ],
+        'tier_filters': _BULL_TIER_OS, 'tier_at': (3, 2),
+    },
+    {
+        'key': '3_outside_down', 'label': "Bearish: 3 Outside Down", 'direction': 'bearish', 'base_prob': 0.58,
+        'when': [
+            "is_uptrend_basic", "day1.bull", "day2.bear",
+            "day2.close < day1.open", "day2.open > day1.close", "day2.body > day1.body * 1.2",
+            "day3.bear", "day3.body >= 0.5 * day3.range", "day3.close < day2.low",
+            "candle_is_significant",
+        ],
+        'tier_filters': _BEAR_TIER_OB, 'tier_at': (3, 2),
+    },
+    {
+        'key': '3_inside_up', 'label': "Bullish: 3 Inside Up", 'direction': 'bullish', 'base_prob': 0.56,
+        'when': ["is_downtrend_basic", "day1.bear", "day2.bull", "harami_inside", "day3.bull", "day3.close > day1.high"],
+        'tier_filters': _BULL_TIER_AVG, 'tier_at': (3, 2),
+    },
+    {
+        'key': '3_inside_down', 'label': "Bearish: 3 Inside Down", 'direction': 'bearish', 'base_prob': 0.56,
+        'when': ["is_uptrend_basic", "day1.bull", "day2.bear", "harami_inside", "day3.bear", "day3.close < day1.low"],
+        'tier_filters': _BEAR_TIER_AVG, 'tier_at': (3, 2),
+    },
+    {
+        'key': 'rising_3', 'label': "Bullish Cont: Rising 3 Methods", 'direction': 'bullish', 'base_prob': 0.55,
+        'when': [
+            "d1.bull", "d1.body > d1.range * 0.6",
+            "np.logical_and.reduce([m.bear & (m.body < d1.body * 0.5) for m in middle])",
+            "inside_d1",
+            "d5.bull", "d5.body > d5.range * 0.6", "d5.close > d1.close",
+        ],
+        'tier_filters': ['is_uptrend_basic', 'is_volume_thrust', 'macd_bullish'], 'tier_at': (3, 2),
+    },
+    {
+        'key': 'falling_3', 'label': "Bearish Cont: Falling 3 Methods", 'direction': 'bearish', 'base_prob': 0.55,
+        'when': [
+            "d1.close < d1.open", "d5.close < d5.open", "d5.close < d1.close",
+            "np.logical_and.reduce([m.close > m.open for m in middle])",
+            "inside_d1",
+        ],
+        'tier_filters': ['is_downtrend_basic', 'is_volume_thrust', 'macd_bearish'], 'tier_at': (3, 2),
+    },
+    # ==================================================
+    # POLA 2 CANDLE
+    # ==================================================
+    {
+        'key': 'bull_kicker', 'label': "Bullish: Kicker", 'direction': 'bullish', 'base_prob': 0.58,
+        'when': [
+            "day2.bear", "day2.body >= 0.5 * day2.range", "day3.bull", "day3.body >= 0.5 * day3.range",
+            "day3.open > day2.high", "day3.low > day2.high", "candle_is_significant",
+        ],
+        'tier_filters': _BULL_TIER_OS, 'tier_at': (3, 2),
+    },
+    {
+        'key': 'bear_kicker', 'label': "Bearish: Kicker", 'direction': 'bearish', 'base_prob': 0.58,
+        'when': [
+            "day2.bull", "day2.body >= 0.5 * day2.range", "day3.bear", "day3.body >= 0.5 * day3.range",
+            "day3.open < day2.low", "candle_is_significant",
+        ],
+        'tier_filters': _BEAR_TIER_OB, 'tier_at': (3, 2),
+    },
+    {
+        'key': 'bull_island', 'label': "Bullish: Island Reversal", 'direction': 'bullish', 'base_prob': 0.57,
+        'when': ["d1.low > gap_high", "d5.low > gap_high", "d5.bull"],
+        'tier_filters': ['is_oversold_context', 'is_volume_thrust', 'macd_bullish'], 'tier_at': (3, 2),
+    },
+    {
+        'key': 'bear_island', 'label': "Bearish: Island Reversal", 'direction': 'bearish', 'base_prob': 0.57,
+        'when': ["d1.high < gap_low", "d5.high < gap_low", "d5.close < d5.open"],
+        'tier_filters': ['is_overbought_context', 'is_volume_thrust', 'macd_bearish'], 'tier_at': (3, 2),
+    },
+    {
+        'key': 'bear_engulf', 'label': "Bearish: Engulfing", 'direction': 'bearish', 'base_prob': 0.54,
+        'when': [
+            "day2.bull", "day3.bear",
+            "day3.open >= day2.close", "day3.close < day2.open",            # Gap up
+            "day3.body > day2.body * 1.08",
+            "day2.body >= 0.5 * day2.range", "day3.body >= 0.5 * day3.range",
+            "day3.close > sma50", "candle_is_significant",
+        ],
+        'tier_filters': ['is_extreme_overbought', 'is_near_resistance', 'is_volume_thrust', 'is_ranging_market', 'macd_bearish'],
+        'tier_at': (4, 2),
+    },
+    {
+        'key': 'bull_engulf', 'label': "Bullish: Engulfing", 'direction': 'bullish', 'base_prob': 0.54,
+        'when': [
+            "day2.bear", "day3.bull",
+            "day3.close > day2.open", "day3.open < day2.close",             # Gap down
+            "day3.body > day2.body * 1.08",
+            "day2.body >= 0.5 * day2.range", "day3.body >= 0.5 * day3.range",
+            "day3.close < sma50", "candle_is_significant",
+        ],
+        'tier_filters': ['is_extreme_oversold', 'is_near_support', 'is_volume_thrust', 'is_ranging_market', 'macd_bullish'],
+        'tier_at': (4, 2),
+    },
+    {
+        'key': 'dark_cloud', 'label': "Bearish: Dark Cloud Cover", 'direction': 'bearish', 'base_prob': 0.53,
+        'when': [
+            "day2.bull", "day3.bear",
+            "day3.open > day2.high",                                        # Gap up nyata
+            "day3.close <= day2.mid", "day3.close > day2.open",
+            "day3.close > sma50", "candle_is_significant",
+        ],
+        'tier_filters': _BEAR_TIER_EXT, 'tier_at': (3, 2),
+    },
+    {
+        'key': 'piercing', 'label': "Bullish: Piercing Line", 'direction': 'bullish', 'base_prob': 0.53,
+        'when': [
+            "is_proper_downtrend",
+            "day2.bear", "body_bear_2 >= 0.6 * day2.range",
+            "day3.bull",
+            "day3.open < day2.close * 0.999",                               # Gap down nyata
+            "pen_ratio >= 0.5",
+            "day3.close < day2.open",                                       # Tidak jadi Engulfing
+            "candle_is_significant",
+        ],
+        'tier_filters': _BULL_TIER_EXT, 'tier_at': (3, 2),
+    },
+    {
+        'key': 'tweezer_bottom', 'label': "Bullish: Tweezer Bottom", 'direction': 'bullish', 'base_prob': 0.52,
+        'when': [
+            "is_downtrend_basic",
+            "day2.bear", "day2.body >= 0.5 * day2.range", "day3.bull", "day3.body >= 0.5 * day3.range",
+            "near(day2.low, day3.low)", "day3.close > day2.close", "candle_is_significant",
+        ],
+        'tier_filters': _BULL_TIER_AVG, 'tier_at': (3, 2),
+    },
+    {
+        'key': 'tweezer_top', 'label': "Bearish: Tweezer Top", 'direction': 'bearish', 'base_prob': 0.52,
+        'when': [
+            "is_uptrend_basic",
+            "day2.bull", "day2.body >= 0.5 * day2.range", "day3.bear", "day3.body >= 0.5 * day3.range",
+            "near(day2.high, day3.high)", "day3.close < day2.close", "candle_is_significant",
+        ],
+        'tier_filters': _BEAR_TIER_AVG, 'tier_at': (3, 2),
+    },
+    {
+        'key': 'bear_harami', 'label': "Bearish: Harami", 'direction': 'bearish', 'base_prob': 0.51,
+        'when': [
+            "is_uptrend_basic", "day2.bull", "day2.body >= 0.5 * day2.range",
+            "day3.bear", "day3.body <= 0.6 * day2.body", "inside_body_3",
+        ],
+        'tier_filters': _BEAR_TIER_AVG, 'tier_at': (3, 2),
+    },
+    {
+        'key': 'bull_harami', 'label': "Bullish: Harami", 'direction': 'bullish', 'base_prob': 0.51,
+        'when': [
+            "is_downtrend_basic", "day2.bear", "day2.body >= 0.5 * day2.range",
+            "day3.bull", "day3.body >= 0.2 * day3.range", "day3.body <= 0.6 * day2.body", "inside_body_3",
+        ],
+        'tier_filters': _BULL_TIER_AVG, 'tier_at': (3, 2),
+    },
+    # ==================================================
+    # POLA 1 CANDLE
+    # ==================================================
+    {
+        'key': 'shooting_star', 'label': "Bearish: Shooting Star", 'direction': 'bearish', 'base_prob': 0.52,
+        'when': [
+            "small_body_3", "day3.upper_shade >= 2 * day3.body", "day3.upper_shade >= 0.60 * day3.range",
+            "day3.lower_shade <= 0.15 * day3.range", "(day3.close - day3.low) <= 0.25 * day3.range",
+            "day3.bear", "valid_uptrend_ss", "candle_is_significant",
+        ],
+        'tier_filters': ['is_proper_uptrend', 'is_extreme_overbought', 'is_near_resistance', 'is_volume_above_avg'],
+        'tier_at': (3, 2),
+    },
+    {
+        'key': 'hammer', 'label': "Bullish: Hammer", 'direction': 'bullish', 'base_prob': 0.52,
+        'when': [
+            "small_body_3", "day3.lower_shade >= 2 * day3.body", "day3.upper_shade <= 0.15 * day3.range",
+            "(day3.high - day3.close) <= 0.25 * day3.range", "day3.close < sma20", "candle_is_significant",
+        ],
+        'tier_filters': ['is_proper_downtrend', 'is_extreme_oversold', 'is_near_support', 'is_volume_above_avg'],
+        'tier_at': (3, 2),
+    },
+    {
+        'key': 'gravestone_doji', 'label': "Bearish: Gravestone Doji", 'direction': 'bearish', 'base_prob': 0.50,
+        'when': ["is_doji", "day3.upper_shade >= 0.70 * day3.range", "day3.lower_shade <= 0.10 * day3.range"],
+        'tier': 1, 'score_filters': ['is_overbought_context', 'is_near_resistance'],
+    },
+    {
+        'key': 'dragonfly_doji', 'label': "Bullish: Dragonfly Doji", 'direction': 'bullish', 'base_prob': 0.50,
+        'when': ["is_doji", "day3.lower_shade >= 0.70 * day3.range", "day3.upper_shade <= 0.10 * day3.range"],
+        'tier': 1, 'score_filters': ['is_oversold_context', 'is_near_support'],
+    },
+    {
+        'key': 'inv_hammer', 'label': "Bullish: Inverted Hammer", 'direction': 'bullish', 'base_prob': 0.50,
+        'when': [
+            "small_body_3", "day3.upper_shade >= 2 * day3.body", "day3.lower_shade <= 0.15 * day3.range",
+            "(day3.close - day3.low) <= 0.25 * day3.range", "sma20 < sma50", "candle_is_significant",
+        ],
+        'tier_filters': ['is_proper_downtrend', 'is_oversold_context', 'is_near_support'], 'tier_at': (3, 2),
+    },
+    {
+        'key': 'hanging_man', 'label': "Bearish: Hanging Man", 'direction': 'bearish', 'base_prob': 0.50,
+        'when': [
+            "small_body_3", "day3.lower_shade >= 2 * day3.body", "day3.upper_shade <= 0.15 * day3.range",
+            "(day3.high - day3.close) <= 0.25 * day3.range", "sma20 > sma50", "day2.bull", "candle_is_significant",
+        ],
+        'tier_filters': ['is_proper_uptrend', 'is_overbought_context', 'is_near_resistance'], 'tier_at': (3, 2),
+    },
+    {
+        'key': 'long_legged_doji', 'label': "⚠ Indecision Doji", 'direction': 'neutral',
+        'when': ["is_doji", "day3.upper_shade >= 0.35 * day3.range", "day3.lower_shade >= 0.35 * day3.range"],
+        'tier': 1,
+    },
+    {
+        'key': 'spinning_top', 'label': "Netral: Spinning Top", 'direction': 'neutral',
+        'when': [
+            "day3.range > 0", "day3.body > 0.10 * day3.range", "day3.body <= 0.35 * day3.range",
+            "day3.upper_shade >= 0.25 * day3.range", "day3.lower_shade >= 0.25 * day3.range",
+        ],
+        'tier': 0,
+    },
+]
+
+PATTERN_KEYS   = [p['key'] for p in PATTERNS]
+PATTERN_LABELS = {p['key']: p['label'] for p in PATTERNS}
+BASE_PROB      = {p['key']: p['base_prob'] for p in PATTERNS if 'base_prob' in p}
+
+
+# ==========================================
+# INDIKATOR
+# ==========================================
+def add_indicators(df):
+    """Indikator yang dipakai filter konteks & skor TV (kolom ditambahkan ke df)."""
+    for p in MA_PERIODS:
+        df[f'SMA_{p}'] = ta.trend.sma_indicator(df['Close'], window=p)
+        df[f'EMA_{p}'] = ta.trend.ema_indicator(df['Close'], window=p)
+
+    ichi = ta.trend.IchimokuIndicator(high=df['High'], low=df['Low'],
+                                      window1=9, window2=26, window3=52)
+    df['ISA'] = ichi.ichimoku_a()
+    df['ISB'] = ichi.ichimoku_b()
+    df['ITS'] = ichi.ichimoku_conversion_line()
+    df['IKS'] = ichi.ichimoku_base_line()
+
+    df['RSI'] = ta.momentum.rsi(df['Close'], window=14)
+
+    stoch = ta.momentum.StochasticOscillator(
+        high=df['High'], low=df['Low'], close=df['Close'], window=14, smooth_window=3)
+    df['STOCH_K'] = stoch.stoch()
+    df['STOCH_D'] = stoch.stoch_signal()
+
+    df['CCI'] = ta.trend.cci(high=df['High'], low=df['Low'], close=df['Close'], window=20)
+
+    adx_ind = ta.trend.ADXIndicator(high=df['High'], low=df['Low'], close=df['Close'], window=14)
+    df['ADX'] = adx_ind.adx()
+    df['+DI'] = adx_ind.adx_pos()
+    df['-DI'] = adx_ind.adx_neg()
+
+    df['AO']  = ta.momentum.awesome_oscillator(high=df['High'], low=df['Low'], window1=5, window2=34)
+    df['MOM'] = df['Close'].diff(10)
+
+    macd_ind = ta.trend.MACD(close=df['Close'], window_slow=26, window_fast=12, window_sign=9)
+    df['MACD']        = macd_ind.macd()
+    df['MACD_SIGNAL'] = macd_ind.macd_signal()
+
+    stochrsi_ind = ta.momentum.StochRSIIndicator(close=df['Close'], window=14, smooth1=3, smooth2=3)
+    df['SRSI_K'] = stochrsi_ind.stochrsi_k() * 100
+    df['SRSI_D'] = stochrsi_ind.stochrsi_d() * 100
+
+    df['WILLR'] = ta.momentum.williams_r(high=df['High'], low=df['Low'], close=df['Close'], lbp=14)
+
+    df['EMA_13'] = ta.trend.ema_indicator(df['Close'], window=13)
+    df['BULLP']  = df['High'] - df['EMA_13']
+    df['BEARP']  = df['Low']  - df['EMA_13']
+
+    df['UO'] = ta.momentum.ultimate_oscillator(
+        high=df['High'], low=df['Low'], close=df['Close'], window1=7, window2=14, window3=28)
+
+    df['VOL_SMA_20'] = df['Volume'].rolling(window=20).mean()
+    df['VOL_VALUE']  = df['Close'] * df['Volume']
+
+    df['ATR'] = ta.volatility.AverageTrueRange(
+        high=df['High'], low=df['Low'], close=df['Close'], window=14
+    ).average_true_range()
+    df['ATR_SMA20'] = df['ATR'].rolling(window=20).mean()
+    return df
+
+
+def add_base_indicators(df):
+    """Subset murah add_indicators (SMA20/50 + ATR) untuk kaskade pre-filter; nilai identik."""
+    df['SMA_20'] = ta.trend.sma_indicator(df['Close'], window=20)
+    df['SMA_50'] = ta.trend.sma_indicator(df['Close'], window=50)
+    df['ATR'] = ta.volatility.AverageTrueRange(
+        high=df['High'], low=df['Low'], close=df['Close'], window=14
+    ).average_true_range()
+    return df
+
+
+# ==========================================
+# HELPER ARRAY
+# ==========================================
+def _shift(a, k):
+    """
+    a[t-k] pada posisi t (sumbu waktu = sumbu terakhir, jadi berlaku juga untuk panel
+    ticker × hari); k bar pertama NaN (perbandingan dengan NaN = False).
+    """
+    if k == 0:
+        return a
+    out = np.empty_like(a, dtype=np.float64)
+    out[..., :k] = np.nan
+    out[..., k:] = a[..., :-k]
+    return out
+
+
+def _rolling(a, window, func):
+    """Setara Series.rolling(window).<func>() di sumbu terakhir; NaN jika jendela belum penuh / ada NaN."""
+    out = np.full(a.shape, np.nan)
+    if a.shape[-1] >= window:
+        out[..., window - 1:] = func(np.lib.stride_tricks.sliding_window_view(a, window, axis=-1), axis=-1)
+    return out
+
+
+def _columns(src):
+    """Getter kolom float64: src = DataFrame satu ticker atau dict panel {kolom: array 2-D}."""
+    if isinstance(src, pd.DataFrame):
+        return lambda name: src[name].to_numpy(dtype=np.float64)
+    return lambda name: np.asarray(src[name], dtype=np.float64)
+
+
+def _tier(base, flags, t3, t2):
+    """Tier 3/2/1 dari jumlah filter konfluensi; 0 jika pola dasar tidak terbentuk."""
+    sc = np.sum(flags, axis=0)
+    return np.where(base, np.where(sc >= t3, 3, np.where(sc >= t2, 2, 1)), 0).astype(np.int8)
+
+
+def pattern_scores(base_prob, tier, confluence):
+    """Versi array get_pattern_score: skor probabilistik 0–95."""
+    tier_mult = np.select([tier == 2, tier == 3], [1.15, 1.30], 1.00)
+    return np.round(np.minimum(95, base_prob * 100 * tier_mult * (1 + confluence * 0.05)), 1)
+
+
+class _Candle:
+    """Metrik candle pada lag tertentu (0 = bar sekarang)."""
+
+    def __init__(self, o, h, l, c, v, lag):
+        self.open, self.high, self.low = _shift(o, lag), _shift(h, lag), _shift(l, lag)
+        self.close, self.volume        = _shift(c, lag), _shift(v, lag)
+        self.body        = np.abs(self.close - self.open)
+        self.range       = self.high - self.low
+        self.body_top    = np.maximum(self.open, self.close)
+        self.body_bottom = np.minimum(self.open, self.close)
+        self.upper_shade = self.high - self.body_top
+        self.lower_shade = self.body_bottom - self.low
+        self.mid         = (self.open + self.close) / 2
+        self.bull        = self.close > self.open
+        self.bear        = self.open > self.close
+
+    def close_near_high(self, threshold=0.2):
+        return np.where(self.range > 0, self.upper_shade <= threshold * self.range, True)
+
+    def close_near_low(self, threshold=0.2):
+        return np.where(self.range > 0, self.lower_shade <= threshold * self.range, True)
+
+
+def _is_near(p1, p2, pct=0.001):
+    """Toleransi 0.1% untuk harga yang 'identik'"""
+    return np.abs(p1 - p2) / np.maximum(p1, p2) <= pct
+
+
+# ==========================================
+# KONTEKS
+# ==========================================
+def _base_context(col):
+    """Konteks yang dipakai kondisi dasar pola: cukup OHLC + SMA20/50 + ATR (BASE_COLUMNS)."""
+    close        = col('Close')
+    sma20, sma50 = col('SMA_20'), col('SMA_50')
+    atr          = col('ATR')
+    valid_atr    = atr > 0
+    return {
+        'valid_atr'             : valid_atr,
+        # Trend context (pakai lag SMA)
+        'is_proper_downtrend'   : (sma20 < sma50) & (sma20 < _shift(sma20, 5)) & (close < sma50),
+        'is_proper_uptrend'     : (sma20 > sma50) & (sma20 > _shift(sma20, 5)) & (close > sma50),
+        'is_downtrend_basic'    : sma20 < sma50,
+        'is_uptrend_basic'      : sma20 > sma50,
+        # Candle bermakna secara volatilitas
+        'candle_is_significant' : np.where(valid_atr, (col('High') - col('Low')) >= atr * 0.7, True),
+    }
+
+
+def compute_context(src):
+    """Filter konteks yang dipakai bersama oleh semua pola (array per bar; src seperti _columns)."""
+    col   = _columns(src)
+    base  = _base_context(col)
+    close = col('Close')
+    atr, rsi     = col('ATR'), col('RSI')
+    vol, vol_sma = col('Volume'), col('VOL_SMA_20')
+    macd, signal = col('MACD'), col('MACD_SIGNAL')
+    adx          = col('ADX')
+    valid_atr    = base['valid_atr']
+
+    rolling_high_20 = _rolling(col('High'), 20, np.max)
+    rolling_low_20  = _rolling(col('Low'), 20, np.min)
+    price_range_20  = rolling_high_20 - rolling_low_20
+    with np.errstate(divide='ignore', invalid='ignore'):
+        price_position = np.where(price_range_20 > 0, (close - rolling_low_20) / price_range_20, 0.5)
+
+    ctx = {
+        'valid_atr'             : valid_atr,
+        # Trend context (pakai lag SMA)
+        'is_proper_downtrend'   : base['is_proper_downtrend'],
+        'is_proper_uptrend'     : base['is_proper_uptrend'],
+        'is_downtrend_basic'    : base['is_downtrend_basic'],
+        'is_uptrend_basic'      : base['is_uptrend_basic'],
+        # Volatility regime & candle bermakna secara volatilitas
+        'is_volatile_regime'    : np.where(valid_atr, atr > col('ATR_SMA20') * 0.75, True),
+        'candle_is_significant' : base['candle_is_significant'],
+        # Volume
+        'is_volume_thrust'      : vol > vol_sma * 1.5,
+        'is_volume_above_avg'   : vol > vol_sma,
+        # RSI
+        'is_oversold_context'   : rsi < 45,
+        'is_overbought_context' : rsi > 55,
+        'is_extreme_oversold'   : rsi < 35,
+        'is_extreme_overbought' : rsi > 65,
+        # S/R proximity (proxy via 20-day rolling range)
+        'price_position'        : price_position,
+        'is_near_support'       : price_position < 0.25,
+        'is_near_resistance'    : price_position > 0.75,
+        # ADX & MACD
+        'is_strong_trend'       : adx > 25,
+        'is_ranging_market'     : adx < 20,
+        'macd_bullish'          : macd > signal,
+        'macd_bearish'          : macd < signal,
+    }
+    return ctx
+
+# ==========================================
+# KOMPILER REGISTRY
+# Kondisi string tiap pola digabung jadi satu ekspresi `(a) & (b) & ...`
+# dan di-compile sekali saat import; evaluasi = operasi array penuh (tanpa loop per bar).
+# ==========================================
+def _compile(expr, name):
+    return compile(expr, f"<pola {name}>", "eval")
+
+
+def compile_registry(patterns, terms):
+    """
+    Registry siap evaluasi (satu versi detektor): TERMS + kondisi pola ter-compile,
+    urutan ladder, label & arah. Versi lain (mis. pattern_versions) memakai format sama.
+    """
+    compiled_terms = [(name, _compile(expr, name)) for name, expr in terms.items()]
+    compiled = []
+    for p in patterns:
+        when = " & ".join(f"({cond})" for cond in p['when'])
+        compiled.append({
+            **p,
+            'base'          : _compile(when, p['key']),
+            'tier_filters'  : p.get('tier_filters'),
+            'score_filters' : p.get('score_filters', p.get('tier_filters')),
+        })
+    filters = {f for p in compiled for f in (p['tier_filters'] or []) + (p['score_filters'] or [])}
+    return {
+        'terms'    : compiled_terms,
+        'patterns' : compiled,
+        'keys'     : [p['key'] for p in patterns],
+        'labels'   : np.array([p['label'] for p in patterns] + ['-'], dtype=object),
+        'dirs'     : np.array([p['direction'] for p in patterns] + ['neutral'], dtype=object),
+        # TERMS yang dipakai sebagai filter tier/skor ikut jadi kolom konteks output
+        'ctx_terms': [name for name in terms if name in filters],
+    }
+
+
+_REGISTRY = compile_registry(PATTERNS, TERMS)
+
+
+def default_registry():
+    """Registry PATTERNS + TERMS (dipakai detect_patterns); format compile_registry."""
+    return _REGISTRY
+
+
+def _candle_namespace(col):
+    """Nama registry yang cukup dari OHLCV (candle + helper)."""
+    o, h, l, c, v = (col(k) for k in ('Open', 'High', 'Low', 'Close', 'Volume'))
+    d = {lag: _Candle(o, h, l, c, v, lag) for lag in range(5)}
+    return {
+        'np': np, 'shift': _shift, 'near': _is_near,
+        # day1/day2/day3 = 2 bar lalu, kemarin, hari ini
+        'day1': d[2], 'day2': d[1], 'day3': d[0],
+        # d1..d5 = 4 bar lalu .. hari ini; middle = 3 candle di tengah
+        'd1': d[4], 'd5': d[0], 'middle': (d[3], d[2], d[1]),
+        'close': c,
+    }
+
+
+def _namespace(col, ctx):
+    """Nama yang bisa dipakai di kondisi registry (lihat header REGISTRY POLA)."""
+    ns = _candle_namespace(col)
+    ns.update({
+        'sma20'    : col('SMA_20'),
+        'sma50'    : col('SMA_50'),
+        'vol_sma20': col('VOL_SMA_20'),
+    })
+    ns.update(ctx)
+    return ns
+
+
+# ==========================================
+# DETEKSI POLA
+# ==========================================
+def detect_patterns(df, timings=None):
+    """
+    df      : OHLCV + kolom add_indicators()
+    timings : dict opsional; diisi akumulasi detik evaluasi per pola
+              (+ '_context', '_terms', '_ladder') untuk profile_report()
+    Return  : DataFrame (index sama dengan df) berisi
+              hit_<pola> (bool) dan tier_<pola> (int8 0–3) untuk setiap pola di PATTERNS,
+              kolom konteks (is_near_support, is_volume_thrust, price_position, ...),
+              dan hasil priority ladder: pattern, pola, tier, direction, pat_score, confluence.
+    """
+    return pd.DataFrame(_detect(df, timings), index=df.index)
+
+
+def detect_patterns_panel(panel, timings=None):
+    """
+    Versi universe dari detect_patterns: satu panggilan untuk semua ticker.
+    panel  : dict {kolom ENGINE_COLUMNS: array 2-D [ticker, bar]} dari stack_panel()
+    Return : dict {kolom detect_patterns: array 2-D [ticker, bar]}; bar terakhir = kolom -1.
+    """
+    return _detect(panel, timings)
+
+
+def detect_versions(src, registries, timings=None):
+    """
+    Beberapa versi detektor di atas data yang sama: indikator, konteks dan namespace
+    candle dihitung sekali, lalu tiap registry dievaluasi di salinan namespace-nya.
+    src        : DataFrame indikator atau dict panel (seperti detect_patterns / _panel)
+    registries : dict {versi: compile_registry(patterns, terms)}
+    Return     : dict {versi: dict kolom seperti detect_patterns_panel}
+    """
+    lap = _lap(timings)
+    ctx = compute_context(src)
+    ns  = _namespace(_columns(src), ctx)
+    lap('_context')
+    return {name: _evaluate(dict(ns), dict(ctx), registry, lap, prefix=f"{name}:")
+            for name, registry in registries.items()}
+
+
+def _lap(timings):
+    clock = time.perf_counter
+    tick  = clock()
+
+    def lap(name):
+        nonlocal tick
+        now = clock()
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + (now - tick)
+        tick = now
+    return lap
+
+
+def _detect(src, timings):
+    lap = _lap(timings)
+    ctx = compute_context(src)
+    ns  = _namespace(_columns(src), ctx)
+    lap('_context')
+    return _evaluate(ns, ctx, _REGISTRY, lap)
+
+
+def _evaluate(ns, ctx, registry, lap, prefix=""):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for name, code in registry['terms']:
+            ns[name] = eval(code, ns)
+        for name in registry['ctx_terms']:
+            ctx[name] = ns[name]
+        lap(f'{prefix}_terms')
+
+        hits, tiers = {}, {}
+        for p in registry['patterns']:
+            key  = p['key']
+            base = np.asarray(eval(p['base'], ns), dtype=bool)
+            if p['tier_filters'] is not None:
+                t3, t2 = p['tier_at']
+                tiers[key] = _tier(base, [ns[f] for f in p['tier_filters']], t3, t2)
+            else:
+                tiers[key] = (base * p['tier']).astype(np.int8)
+            hits[key] = base
+            lap(prefix + key)
+
+    cols = {f'hit_{k}': hits[k] for k in registry['keys']}
+    cols.update({f'tier_{k}': tiers[k] for k in registry['keys']})
+    cols.update(ctx)
+    cols.update(_resolve_ladder(hits, tiers, ctx, registry))
+    lap(f'{prefix}_ladder')
+    return cols
+
+
+def _resolve_ladder(hits, tiers, ctx, registry=_REGISTRY):
+    """Priority ladder per bar: pola pertama yang terbentuk menang (urutan registry)."""
+    shape     = ctx['valid_atr'].shape
+    chosen    = np.full(shape, -1, dtype=np.int16)
+    tier      = np.zeros(shape, dtype=np.int8)
+    pat_score = np.zeros(shape, dtype=np.float64)
+    conf      = np.zeros(shape, dtype=np.int8)
+
+    for i, p in enumerate(registry['patterns']):
+        key = p['key']
+        hit = hits[key] & (chosen < 0)
+        if not hit.any():
+            continue
+        chosen[hit] = i
+        tier[hit]   = tiers[key][hit]
+        if p['score_filters']:
+            cf = np.sum([ctx[f][hit] for f in p['score_filters']], axis=0)
+            conf[hit]      = cf
+            pat_score[hit] = pattern_scores(p['base_prob'], tier[hit], cf)
+
+    keys = np.array(registry['keys'] + [''], dtype=object)
+
+    return {
+        'pattern'   : keys[chosen],                 # index -1 -> elemen terakhir (tidak ada pola)
+        'pola'      : registry['labels'][chosen],
+        'tier'      : tier,
+        'direction' : registry['dirs'][chosen],
+        'pat_score' : pat_score,
+        'confluence': conf,                         # jumlah filter skor yang terpenuhi
+    }
+
+
+# ==========================================
+# KASKADE PRE-FILTER
+# Kondisi registry dipecah menurut data yang dibutuhkan:
+#   'shape' : cukup OHLCV (bentuk candle)              -> paling murah
+#   'base'  : + SMA20/50 + ATR (BASE_COLUMNS)          -> mask dasar pola persis
+# Ticker tanpa pola di bar terakhir bisa dibuang sebelum indikator lengkap.
+# ==========================================
+BASE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'SMA_20', 'SMA_50', 'ATR']
+
+_SHAPE_NAMES = {'np', 'shift', 'near', 'day1', 'day2', 'day3', 'd1', 'd5', 'middle', 'close'}
+_BASE_NAMES  = _SHAPE_NAMES | {'sma20', 'sma50', 'valid_atr', 'is_proper_downtrend', 'is_proper_uptrend',
+                               'is_downtrend_basic', 'is_uptrend_basic', 'candle_is_significant'}
+
+
+def _free_names(expr):
+    """Nama global yang dibaca ekspresi (variabel comprehension tidak dihitung)."""
+    nodes  = [n for n in ast.walk(ast.parse(expr, mode='eval')) if isinstance(n, ast.Name)]
+    loads  = {n.id for n in nodes if isinstance(n.ctx, ast.Load)}
+    stores = {n.id for n in nodes if isinstance(n.ctx, ast.Store)}
+    return loads - stores
+
+
+def _compile_level(available):
+    """TERMS + kondisi pola yang bisa dievaluasi hanya dengan nama di `available`."""
+    available = set(available)
+    terms = []
+    for name, expr in TERMS.items():
+        if _free_names(expr) <= available:
+            terms.append((name, _compile(expr, name)))
+            available.add(name)
+    masks = {}
+    for p in PATTERNS:
+        conds = [c for c in p['when'] if _free_names(c) <= available]
+        masks[p['key']] = _compile(" & ".join(f"({c})" for c in conds), p['key']) if conds else None
+    return terms, masks
+
+
+_LEVELS = {'shape': _compile_level(_SHAPE_NAMES), 'base': _compile_level(_BASE_NAMES)}
+
+
+def _level_masks(ns, level):
+    terms, masks = _LEVELS[level]
+    shape = ns['close'].shape
+    out = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for name, code in terms:
+            ns[name] = eval(code, ns)
+        for key, code in masks.items():
+            out[key] = np.ones(shape, dtype=bool) if code is None else np.asarray(eval(code, ns), dtype=bool)
+    return out
+
+
+def shape_masks(src):
+    """Syarat bentuk candle tiap pola (syarat perlu, bukan cukup); src cukup kolom OHLCV."""
+    return _level_masks(_candle_namespace(_columns(src)), 'shape')
+
+
+def base_masks(src):
+    """Mask dasar pola persis sama dengan hit_<pola> detect_patterns; src cukup BASE_COLUMNS."""
+    col = _columns(src)
+    ns  = _candle_namespace(col)
+    ns.update({'sma20': col('SMA_20'), 'sma50': col('SMA_50')})
+    ns.update(_base_context(col))
+    return _level_masks(ns, 'base')
+
+
+def any_pattern_last(masks):
+    """True per ticker (panel) / skalar (1 ticker) jika ada pola yang lolos di bar terakhir."""
+    return np.logical_or.reduce([m[..., -1] for m in masks.values()])
+
+
+# ==========================================
+# PANEL UNIVERSE (TICKER × HARI)
+# ==========================================
+# Kolom add_indicators() yang dibaca compute_context() + registry
+ENGINE_COLUMNS = [
+    'Open', 'High', 'Low', 'Close', 'Volume',
+    'SMA_20', 'SMA_50', 'VOL_SMA_20', 'ATR', 'ATR_SMA20',
+    'RSI', 'MACD', 'MACD_SIGNAL', 'ADX',
+]
+
+
+def stack_panel(frames, columns=ENGINE_COLUMNS):
+    """
+    frames : dict {ticker: DataFrame hasil add_indicators()}
+    Return : (tickers, dates [ticker, bar] datetime64, panel {kolom: float64 [ticker, bar]}).
+    Tiap baris rata kanan pada bar miliknya sendiri (bar terakhir = kolom -1) dan
+    diisi NaN di kiri untuk histori yang lebih pendek — urutan bar per ticker tidak
+    disisipi tanggal libur/suspensi ticker lain, jadi hasil pola sama dengan detect_patterns.
+    """
+    tickers = [t for t, df in frames.items() if df is not None and not df.empty]
+    n_bars  = max((len(frames[t]) for t in tickers), default=0)
+    dates   = np.full((len(tickers), n_bars), np.datetime64('NaT'), dtype='datetime64[ns]')
+    panel   = {c: np.full((len(tickers), n_bars), np.nan) for c in columns}
+    for i, t in enumerate(tickers):
+        df = frames[t]
+        dates[i, n_bars - len(df):] = pd.DatetimeIndex(df.index).values.astype('datetime64[ns]')
+        for c in columns:
+            panel[c][i, n_bars - len(df):] = df[c].to_numpy(dtype=np.float64)
+    return tickers, dates, panel
+
+
+def panel_last_bar(pats):
+    """Kolom bar terakhir tiap ticker dari detect_patterns_panel -> dict {kolom: array 1-D}."""
+    return {name: arr[:, -1] for name, arr in pats.items()}
+
+
+# ==========================================
+# PROFILING
+# ==========================================
+def profile_report(timings, calls=1):
+    """
+    Ringkasan biaya evaluasi dari dict timings detect_patterns().
+    calls : jumlah panggilan detect_patterns yang diakumulasi (untuk rata-rata per panggilan)
+    """
+    rep = pd.DataFrame({'step': list(timings), 'seconds': list(timings.values())})
+    rep['ms_per_call'] = rep['seconds'] * 1000 / max(calls, 1)
+    rep['share']       = rep['seconds'] / max(rep['seconds'].sum(), 1e-12)
+    return rep.sort_values('seconds', ascending=False).reset_index(drop=True)
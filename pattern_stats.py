@@ -0,0 +1,217 @@
+# ==========================================
+# STATISTIK POLA DARI HISTORI
+# Hit rate forward-return per (pola, tier, sektor, regime) dihitung dari cache harian
+# dengan pattern_engine panel, disimpan ke disk (parquet) dan di-refresh inkremental:
+# hanya bar yang outcome-nya baru diketahui sejak run sebelumnya yang ditambahkan.
+# Saat scan, base prob = lookup dict O(1) (fallback ke BASE_PROB statis).
+# ==========================================
+
+import os
+import numpy as np
+import pandas as pd
+
+import data_cache
+import pattern_engine
+
+STATS_PATH     = os.path.join(data_cache.CACHE_DIR, "pattern_stats.parquet")
+STATE_PATH     = os.path.join(data_cache.CACHE_DIR, "pattern_stats_state.parquet")
+HORIZON        = 5      # Bar ke depan untuk menilai hit (close[t+H] searah pola vs close[t])
+MIN_SAMPLES    = 20     # Sel dengan sampel lebih sedikit -> naik ke level agregat
+PRIOR_WEIGHT   = 20     # Shrinkage ke BASE_PROB statis (setara 20 sampel pseudo)
+ALL            = "*"    # Label agregat sektor / regime
+
+STATS_KEYS     = ["pattern", "tier", "sector", "regime"]
+
+
+# ==========================================
+# REGIME
+# ==========================================
+def regime_labels(ctx):
+    """
+    Regime pasar per bar dari kolom konteks detect_patterns (array / skalar):
+    'sideways' jika ADX < 20, selain itu 'up' / 'down' dari SMA20 vs SMA50.
+    """
+    return np.select(
+        [np.asarray(ctx['is_ranging_market'], dtype=bool),
+         np.asarray(ctx['is_uptrend_basic'], dtype=bool),
+         np.asarray(ctx['is_downtrend_basic'], dtype=bool)],
+        ['sideways', 'up', 'down'], 'sideways',
+    )
+
+
+# ==========================================
+# BUILD / REFRESH
+# ==========================================
+def _load_frame(ticker):
+    df = data_cache.load_daily(ticker)
+    if df is None or df.empty:
+        return None
+    df = df.dropna().copy()
+    if len(df) < 60 + HORIZON:
+        return None
+    return pattern_engine.add_indicators(df)
+
+
+def _outcomes(frames, sector_of, watermark):
+    """Sampel (pola, tier, sektor, regime, win) untuk bar setelah watermark tiap ticker."""
+    tickers, dates, panel = pattern_engine.stack_panel(frames)
+    if not tickers:
+        return pd.DataFrame(columns=STATS_KEYS + ["win"]), {}
+    pats  = pattern_engine.detect_patterns_panel(panel)
+    close = panel['Close']
+
+    fwd = np.full(close.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fwd[:, :-HORIZON] = close[:, HORIZON:] / close[:, :-HORIZON] - 1
+
+    since = np.array([watermark.get(t, np.datetime64('NaT')) for t in tickers], dtype='datetime64[ns]')
+    fresh = np.where(np.isnat(since)[:, None], True, dates > since[:, None])
+    known = ~np.isnan(fwd)
+    sign  = np.select([pats['direction'] == 'bullish', pats['direction'] == 'bearish'], [1.0, -1.0], 0.0)
+    take  = fresh & known & (sign != 0) & (pats['tier'] > 0)
+
+    rows, cols = np.nonzero(take)
+    sector     = np.array([sector_of[t] for t in tickers], dtype=object)
+    samples = pd.DataFrame({
+        "pattern": pats['pattern'][rows, cols],
+        "tier"   : pats['tier'][rows, cols].astype(np.int8),
+        "sector" : sector[rows],
+        "regime" : regime_labels(pats)[rows, cols],
+        "win"    : (fwd[rows, cols] * sign[rows, cols]) > 0,
+    })
+
+    # Watermark baru = bar terakhir yang outcome-nya sudah diketahui
+    new_mark = {}
+    for i, t in enumerate(tickers):
+        known_dates = dates[i][known[i]]
+        if len(known_dates):
+            new_mark[t] = known_dates.max()
+    return samples, new_mark
+
+
+def load_stats(path=None):
+    """Tabel hitungan (pattern, tier, sector, regime, n, wins); kosong jika belum ada."""
+    path = path or STATS_PATH
+    if os.path.exists(path):
+        try:
+            return pd.read_parquet(path)
+        except Exception as e:
+            print(f"  -> ⚠️ Statistik pola rusak {path}: {e}")
+    return pd.DataFrame({"pattern": pd.Series(dtype=object), "tier": pd.Series(dtype=np.int8),
+                         "sector": pd.Series(dtype=object), "regime": pd.Series(dtype=object),
+                         "n": pd.Series(dtype=np.int64), "wins": pd.Series(dtype=np.int64)})
+
+
+def _load_state(path):
+    if os.path.exists(path):
+        try:
+            state = pd.read_parquet(path)
+            return dict(zip(state["ticker"], state["as_of"].values.astype("datetime64[ns]")))
+        except Exception as e:
+            print(f"  -> ⚠️ State statistik rusak {path}: {e}")
+    return {}
+
+
+def refresh(sector_config, path=None, state_path=None):
+    """
+    Tambahkan outcome baru ke tabel statistik.
+    sector_config : dict {sektor: [ticker, ...]} (format SECTOR_CONFIG scanner)
+    Hitungan (n, wins) bersifat aditif, jadi run berikutnya hanya memproses bar
+    setelah watermark per ticker. Return tabel terbaru.
+    """
+    path       = path or STATS_PATH
+    state_path = state_path or STATE_PATH
+    watermark  = _load_state(state_path)
+
+    sector_of = {}
+    for sector, tickers in sector_config.items():
+        for ticker in tickers:
+            sector_of.setdefault(ticker, sector)
+
+    frames = {}
+    for ticker in sector_of:
+        try:
+            df = _load_frame(ticker)
+        except Exception as e:
+            print(f"  -> ⚠️ Statistik {ticker} dilewati: {e}")
+            df = None
+        if df is None:
+            continue
+        # Tidak ada bar dengan outcome baru sejak run terakhir
+        mark = watermark.get(ticker)
+        if mark is not None and len(df) > HORIZON and df.index[-1 - HORIZON] <= mark:
+            continue
+        frames[ticker] = df
+
+    samples, new_mark = _outcomes(frames, sector_of, watermark)
+    table = load_stats(path)
+    if not samples.empty:
+        added = samples.groupby(STATS_KEYS, observed=True)["win"].agg(n="size", wins="sum").reset_index()
+        table = (pd.concat([table, added], ignore_index=True)
+                   .groupby(STATS_KEYS, observed=True)[["n", "wins"]].sum().reset_index())
+        table["tier"] = table["tier"].astype(np.int8)
+        table["n"]    = table["n"].astype(np.int64)
+        table["wins"] = table["wins"].astype(np.int64)
+
+    watermark.update(new_mark)
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        table.to_parquet(path, index=False)
+        pd.DataFrame({"ticker": list(watermark), "as_of": pd.to_datetime(list(watermark.values()))}) \
+          .to_parquet(state_path, index=False)
+    except Exception as e:
+        print(f"  -> ⚠️ Gagal simpan statistik pola: {e}")
+
+    print(f"  -> 📈 Statistik pola: {len(samples)} sampel baru dari {len(frames)} emiten")
+    return table
+
+
+# ==========================================
+# LOOKUP
+# ==========================================
+def build_lookup(table=None):
+    """
+    Dict {(pattern, tier, sector, regime): (n, wins)} plus baris agregat
+    sektor/regime = ALL, supaya lookup() cukup beberapa akses dict.
+    """
+    table = load_stats() if table is None else table
+    if table.empty:
+        return {}
+    levels = [
+        table,
+        table.assign(sector=ALL),
+        table.assign(regime=ALL),
+        table.assign(sector=ALL, regime=ALL),
+    ]
+    agg = (pd.concat(levels, ignore_index=True)
+             .groupby(STATS_KEYS, observed=True)[["n", "wins"]].sum())
+    return {(pat, int(tier), sec, reg): (int(n), int(w))
+            for (pat, tier, sec, reg), n, w in zip(agg.index, agg["n"], agg["wins"])}
+
+
+def lookup(stats, pattern, tier, sector=None, regime=None):
+    """
+    Base prob empiris untuk (pola, tier, sektor, regime).
+    Fallback: sektor+regime -> regime saja -> sektor saja -> semua; sel dengan
+    sampel < MIN_SAMPLES dilewati. Hit rate di-shrink ke BASE_PROB statis.
+    Return (prob, True) jika dari data, (BASE_PROB statis, False) jika tidak ada sel cukup.
+    """
+    prior = pattern_engine.BASE_PROB.get(pattern, 0.51)
+    sector, regime = sector or ALL, regime or ALL
+    for key in ((pattern, tier, sector, regime), (pattern, tier, ALL, regime),
+                (pattern, tier, sector, ALL), (pattern, tier, ALL, ALL)):
+        cell = stats.get(key)
+        if cell and cell[0] >= MIN_SAMPLES:
+            n, wins = cell
+            return (wins + PRIOR_WEIGHT * prior) / (n + PRIOR_WEIGHT), True
+    return prior, False
+
+
+# ==========================================
+# MAIN: refresh untuk universe ScannerPattern2
+# ==========================================
+if __name__ == "__main__":
+    from ScannerPattern2 import SECTOR_CONFIG
+
+    table = refresh(SECTOR_CONFIG)
+    print(table.sort_values("n", ascending=False).head(30).to_string(index=False))
@@ -0,0 +1,288 @@
+# ==========================================
+# STREAMING POLA INTRADAY (1h / 30m)
+# Deteksi pola inkremental: tiap run hanya bar yang baru close sejak run sebelumnya
+# yang dievaluasi. Pola di bar t hanya membaca bar <= t, jadi hasil bar lama tidak
+# berubah dan tidak perlu dihitung ulang.
+# - Indikator engine (ENGINE_COLUMNS) juga inkremental: run berikutnya melanjutkan
+#   state rekursif (EMA / Wilder ATR/RSI/ADX) + ekor TAIL bar yang disimpan di samping
+#   watermark, hanya untuk bar baru. Seluruh histori cache hanya dihitung sekali
+#   (run pertama per ticker, atau ekor hilang / histori cache direvisi).
+# - Registry pola dievaluasi di panel semua ticker, hanya pada segmen
+#   bar baru + LOOKBACK bar yang dibaca kondisi pola/konteks.
+# Watermark + state indikator per ticker + log sinyal disimpan di cache (parquet).
+# ==========================================
+
+import os
+import numpy as np
+import pandas as pd
+
+import data_cache
+import pattern_engine
+
+INTERVAL   = os.environ.get("SCAN_INTERVAL", "1h")
+LOOKBACK   = 25    # Bar sebelum t yang dibaca pola di t (rolling high/low 20, shift 5, d1 = 4 bar lalu)
+TAIL       = 50    # Ekor indikator disimpan per ticker (>= LOOKBACK dan window SMA_50)
+MIN_BARS   = 60    # Histori minimum per ticker
+WILDER     = 14    # Window ATR / RSI / ADX (sama dengan add_indicators)
+
+# State rekursif di bar watermark: EMA 12/26 (MACD), rata-rata Wilder up/down (RSI),
+# jumlah Wilder TR/+DM/-DM (ADX). ATR, ADX dan MACD_SIGNAL dibaca dari ekor.
+STATE_COLS = ['ema_12', 'ema_26', 'rsi_up', 'rsi_dn', 'adx_tr', 'adx_pos', 'adx_neg']
+
+
+def _state_path(interval):
+    return os.path.join(data_cache.CACHE_DIR, "stream", f"state_{interval}.parquet")
+
+
+def _signals_path(interval):
+    return os.path.join(data_cache.CACHE_DIR, "stream", f"signals_{interval}.parquet")
+
+
+def _tail_path(interval):
+    return os.path.join(data_cache.CACHE_DIR, "stream", f"tail_{interval}.parquet")
+
+
+def _load_state(path):
+    """dict {ticker: {'as_of', kolom STATE_COLS}}; state format lama hanya berisi as_of."""
+    if os.path.exists(path):
+        try:
+            state = pd.read_parquet(path)
+            state["as_of"] = pd.to_datetime(state["as_of"])
+            return {row.pop("ticker"): row for row in state.to_dict("records")}
+        except Exception as e:
+            print(f"  -> ⚠️ State streaming rusak {path}: {e}")
+    return {}
+
+
+def _load_tails(path):
+    """dict {ticker: DataFrame ekor TAIL bar, kolom ENGINE_COLUMNS}."""
+    if os.path.exists(path):
+        try:
+            tails = pd.read_parquet(path)
+            return {t: g.drop(columns="ticker").set_index("date")
+                    for t, g in tails.groupby("ticker", sort=False)}
+        except Exception as e:
+            print(f"  -> ⚠️ Ekor indikator streaming rusak {path}: {e}")
+    return {}
+
+
+def _save(state, tails, signals, interval):
+    try:
+        os.makedirs(os.path.dirname(_state_path(interval)), exist_ok=True)
+        pd.DataFrame([{"ticker": t, **row} for t, row in state.items()]) \
+          .to_parquet(_state_path(interval), index=False)
+        if tails:
+            pd.concat([tail.assign(ticker=t) for t, tail in tails.items()]) \
+              .rename_axis("date").reset_index().to_parquet(_tail_path(interval), index=False)
+        if not signals.empty:
+            path = _signals_path(interval)
+            log  = pd.concat([pd.read_parquet(path), signals], ignore_index=True) \
+                   if os.path.exists(path) else signals
+            log.to_parquet(path, index=False)
+    except Exception as e:
+        print(f"  -> ⚠️ Gagal simpan state streaming: {e}")
+
+
+# ==========================================
+# INDIKATOR INKREMENTAL
+# Rumus & urutan operasi sama dengan ta (add_indicators):
+# - EMA / Wilder RSI = ewm(adjust=False): state cukup nilai terakhir, identik bit per bit.
+# - Wilder ATR / ADX = rekursi yang sama dengan loop ta, identik.
+# - SMA / rolling mean dihitung ulang dari ekor window: selisih dengan running sum
+#   pandas di seluruh histori <= ~1 ulp (relatif ~1e-16).
+# ==========================================
+def _ewm_next(prev, values, **kw):
+    """Lanjutkan ewm(adjust=False) dari nilai terakhir prev ke array values."""
+    return pd.Series(np.r_[prev, values]).ewm(adjust=False, **kw).mean().to_numpy()[1:]
+
+
+def _adx_sums(df, n=WILDER):
+    """Jumlah Wilder TR/+DM/-DM di bar terakhir (inisialisasi & rekursi = ta.ADXIndicator)."""
+    high, low, close = (df[c].to_numpy(dtype=np.float64) for c in ("High", "Low", "Close"))
+    prev_h, prev_l, prev_c = (np.r_[np.nan, a[:-1]] for a in (high, low, close))
+    up, down = high - prev_h, prev_l - low
+    moves = (np.amax([high, prev_c], axis=0) - np.amin([low, prev_c], axis=0),
+             np.abs(((up > down) & (up > 0)) * up),
+             np.abs(((down > up) & (down > 0)) * down))
+    sums = [pd.Series(m).dropna().iloc[0:n].sum() for m in moves]
+    for i in range(n + 1, len(close)):
+        sums = [s - (s / float(n)) + m[i] for s, m in zip(sums, moves)]
+    return sums
+
+
+def _seed(df):
+    """Indikator engine dari seluruh histori (= scan batch) + state rekursif bar terakhir."""
+    full   = pattern_engine.add_indicators(df.copy())[pattern_engine.ENGINE_COLUMNS]
+    close  = df["Close"]
+    diff   = close.diff()
+    up, dn = diff.where(diff > 0, 0.0), -diff.where(diff < 0, 0.0)
+    values = [close.ewm(span=12, adjust=False).mean().iloc[-1],
+              close.ewm(span=26, adjust=False).mean().iloc[-1],
+              up.ewm(alpha=1 / WILDER, adjust=False).mean().iloc[-1],
+              dn.ewm(alpha=1 / WILDER, adjust=False).mean().iloc[-1],
+              *_adx_sums(df)]
+    return full, dict(zip(STATE_COLS, map(float, values)))
+
+
+def _advance(tail, state, new, n=WILDER):
+    """Indikator engine bar baru `new` (OHLCV) melanjutkan ekor + state. Return (ekor + bar baru, state)."""
+    last  = tail.iloc[-1]
+    high, low, close = (new[c].to_numpy(dtype=np.float64) for c in ("High", "Low", "Close"))
+    prev_h, prev_l, prev_c = (np.r_[last[c], a[:-1]] for c, a in
+                              (("High", high), ("Low", low), ("Close", close)))
+
+    ema_12 = _ewm_next(state["ema_12"], close, span=12)
+    ema_26 = _ewm_next(state["ema_26"], close, span=26)
+    macd   = ema_12 - ema_26
+    diff   = close - prev_c
+    rsi_up = _ewm_next(state["rsi_up"], np.where(diff > 0, diff, 0.0), alpha=1 / n)
+    rsi_dn = _ewm_next(state["rsi_dn"], -np.where(diff < 0, diff, 0.0), alpha=1 / n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(rsi_dn == 0, 100, 100 - (100 / (1 + rsi_up / rsi_dn)))
+
+    true_range = np.max([high - low, np.abs(high - prev_c), np.abs(low - prev_c)], axis=0)
+    atr, adx   = np.empty(len(new)), np.empty(len(new))
+    a, x       = last["ATR"], last["ADX"]
+    s_tr, s_pos, s_neg = state["adx_tr"], state["adx_pos"], state["adx_neg"]
+    for i in range(len(new)):
+        up, down = high[i] - prev_h[i], prev_l[i] - low[i]
+        s_tr  = s_tr - (s_tr / float(n)) + (max(high[i], prev_c[i]) - min(low[i], prev_c[i]))
+        s_pos = s_pos - (s_pos / float(n)) + (up if up > down and up > 0 else 0.0)
+        s_neg = s_neg - (s_neg / float(n)) + (down if down > up and down > 0 else 0.0)
+        di_pos = 100 * (s_pos / s_tr) if s_tr != 0 else 0
+        di_neg = 100 * (s_neg / s_tr) if s_tr != 0 else 0
+        dx     = 100 * np.abs((di_pos - di_neg) / (di_pos + di_neg)) if di_pos + di_neg != 0 else 0
+        a = (a * (n - 1) + true_range[i]) / float(n)
+        x = (x * (n - 1) + dx) / float(n)
+        atr[i], adx[i] = a, x
+
+    step = new[data_cache.OHLCV_COLS].astype(np.float64).assign(
+        ATR=atr, ADX=adx, RSI=rsi, MACD=macd,
+        MACD_SIGNAL=_ewm_next(last["MACD_SIGNAL"], macd, span=9))
+    ext = pd.concat([tail, step])[pattern_engine.ENGINE_COLUMNS]
+    for col, src, window in (("SMA_20", "Close", 20), ("SMA_50", "Close", 50),
+                             ("VOL_SMA_20", "Volume", 20), ("ATR_SMA20", "ATR", 20)):
+        ext.iloc[-len(new):, ext.columns.get_loc(col)] = ext[src].rolling(window).mean().to_numpy()[-len(new):]
+
+    carry = [ema_12[-1], ema_26[-1], rsi_up[-1], rsi_dn[-1], s_tr, s_pos, s_neg]
+    return ext, dict(zip(STATE_COLS, map(float, carry)))
+
+
+def _carry_ok(df, tail, row):
+    """Ekor + state run sebelumnya masih sesuai cache (tidak hilang, bar lama tidak direvisi)?"""
+    if tail is None or len(tail) < TAIL or tail.index[-1] != row["as_of"]:
+        return False
+    if any(pd.isna(row.get(c)) for c in STATE_COLS):
+        return False
+    cached = df.reindex(tail.index)[data_cache.OHLCV_COLS].to_numpy(dtype=np.float64)
+    return np.array_equal(cached, tail[data_cache.OHLCV_COLS].to_numpy(dtype=np.float64))
+
+
+# ==========================================
+# UPDATE INKREMENTAL
+# ==========================================
+def segment(df, n_new, tail=None, row=None):
+    """
+    Segmen n_new bar terakhir + LOOKBACK bar sebelumnya dengan kolom ENGINE_COLUMNS.
+    Dengan ekor + state run sebelumnya hanya bar baru yang dihitung; tanpa itu indikator
+    di-seed dari seluruh histori. Return (segmen, ekor TAIL bar, state) untuk run berikutnya.
+    """
+    if tail is None:
+        full, state = _seed(df)
+    else:
+        full, state = _advance(tail, row, df.iloc[-n_new:])
+    return full.iloc[-(n_new + LOOKBACK):], full.iloc[-TAIL:], state
+
+
+def detect_new_bars(segs, n_new):
+    """
+    segs : dict {ticker: segmen dari segment()}; n_new : dict {ticker: jumlah bar baru}
+    Return DataFrame satu baris per (ticker, bar baru) berisi hasil priority ladder.
+    """
+    tickers, dates, panel = pattern_engine.stack_panel(segs)
+    if not tickers:
+        return pd.DataFrame()
+    pats = pattern_engine.detect_patterns_panel(panel)
+
+    width = dates.shape[1]
+    cols  = np.arange(width)
+    take  = cols[None, :] >= width - np.array([n_new[t] for t in tickers])[:, None]
+    rows, idx = np.nonzero(take)
+    return pd.DataFrame({
+        "Ticker"   : np.array(tickers, dtype=object)[rows],
+        "Waktu"    : dates[rows, idx],
+        "Harga"    : panel['Close'][rows, idx],
+        "pattern"  : pats['pattern'][rows, idx],
+        "Pola"     : pats['pola'][rows, idx],
+        "Arah"     : pats['direction'][rows, idx],
+        "Tier"     : pats['tier'][rows, idx],
+        "Skor Pola": pats['pat_score'][rows, idx],
+    })
+
+
+def update(sector_config, interval=INTERVAL, now=None, verbose=True):
+    """
+    Evaluasi bar intraday yang baru close sejak run terakhir untuk seluruh universe.
+    Run pertama per ticker hanya mengevaluasi bar terakhir (tanpa backfill histori).
+    Return DataFrame sinyal baru (pola terbentuk), juga ditambahkan ke log di cache.
+    """
+    state = _load_state(_state_path(interval))
+    tails = _load_tails(_tail_path(interval))
+    sector_of = {}
+    for sector, tickers in sector_config.items():
+        for ticker in tickers:
+            sector_of.setdefault(ticker, sector)
+
+    segs, n_new, seeded = {}, {}, 0
+    for ticker in sector_of:
+        try:
+            df = data_cache.load_intraday(ticker, interval, now=now)
+        except Exception as e:
+            print(f"  -> ⚠️ Intraday {ticker} dilewati: {e}")
+            df = None
+        if df is None or len(df) < MIN_BARS:
+            continue
+        row = state.get(ticker)
+        n   = 1 if row is None else int((df.index > row["as_of"]).sum())
+        if not n:
+            continue
+        tail = tails.get(ticker) if row is not None and _carry_ok(df, tails.get(ticker), row) else None
+        seeded += tail is None
+        segs[ticker], tails[ticker], carry = segment(df, n, tail, row)
+        state[ticker] = {"as_of": df.index[-1], **carry}
+        n_new[ticker] = n
+
+    bars = detect_new_bars(segs, n_new)
+
+    signals = pd.DataFrame()
+    if not bars.empty:
+        signals = bars[bars["pattern"] != ""].drop(columns="pattern")
+        signals.insert(1, "Sektor", signals["Ticker"].map(sector_of))
+        signals["Interval"] = interval
+        signals = signals.sort_values(["Waktu", "Skor Pola"], ascending=[True, False]).reset_index(drop=True)
+    _save(state, tails, signals, interval)
+
+    if verbose:
+        print(f"  -> ⏱️ Streaming {interval}: {sum(n_new.values())} bar baru dari {len(segs)} emiten "
+              f"({seeded} seed histori penuh), {len(signals)} sinyal pola")
+    return signals
+
+
+# ==========================================
+# MAIN: jalankan tiap jam (SCAN_INTERVAL=1h / 30m), universe ScannerPattern2
+# ==========================================
+if __name__ == "__main__":
+    from gspread_dataframe import set_with_dataframe
+    from ScannerPattern2 import SECTOR_CONFIG, connect_gsheet
+
+    sheet   = f"POLA_{INTERVAL.upper()}"
+    signals = update(SECTOR_CONFIG, INTERVAL)
+    if not signals.empty:
+        print(signals.to_string(index=False))
+        ws = connect_gsheet(sheet)
+        if ws:
+            try:
+                ws.clear()
+                set_with_dataframe(ws, signals)
+            except Exception as e:
+                print(f"❌ Upload Error {sheet}: {e}")
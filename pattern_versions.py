@@ -0,0 +1,313 @@
+# ==========================================
+# VERSI DETEKTOR POLA — SIDE BY SIDE + DIFF
+# Beberapa versi detektor (v1 = ScannerPattern.py, v2 = pattern_engine) dijalankan
+# di atas frame cache yang sama dalam satu proses: data & indikator dimuat sekali,
+# konteks + namespace candle dihitung sekali (pattern_engine.detect_versions),
+# lalu hanya registry tiap versi yang dievaluasi. Output: tabel ringkas sinyal yang
+# berbeda antar versi di bar terakhir. Validasi versi baru = tanpa I/O tambahan.
+# ==========================================
+
+import os
+import numpy as np
+import pandas as pd
+
+import pattern_engine
+
+# ==========================================
+# REGISTRY v1 (ScannerPattern.py, format pattern_engine)
+# Kondisi disalin 1:1 dari analyze_stock v1 (day1 = 2 bar lalu, day2 = kemarin,
+# day3 = hari ini); urutan list = urutan if/elif v1. Dua nama yang tidak terdefinisi
+# di v1 (mid_1, is_tweezer_top -> NameError) diisi sesuai maksudnya: day1.mid dan
+# definisi Tweezer Top; Tweezer Bottom memakai definisi pertamanya.
+# Key pola = key pattern_engine (diff membandingkan key); label v1 hanya untuk tampilan.
+# ==========================================
+TERMS_V1 = {
+    # Tren v1 dibaca per candle: _1 = day1 (2 bar lalu), _2 = day2, tanpa akhiran = day3
+    'sma20_1'           : "shift(sma20, 2)",
+    'sma50_1'           : "shift(sma50, 2)",
+    'down_1'            : "sma20_1 < sma50_1",
+    'up_1'              : "sma20_1 > sma50_1",
+    'down_2'            : "shift(sma20, 1) < shift(sma50, 1)",
+    'up_2'              : "shift(sma20, 1) > shift(sma50, 1)",
+    'is_downtrend_v1'   : "(day1.close < sma20_1) & down_1",
+    'is_uptrend_v1'     : "(day1.close > sma20_1) & up_1",
+    'vol_conf'          : "(day3.volume > vol_sma20) | (day3.volume > day2.volume)",
+    'sm_body_2'         : "(day2.range > 0) & (day2.body <= 0.3 * day2.range)",
+    'pen_ratio_v1'      : "(day3.close - day2.close) / (day2.open - day2.close)",
+    'valid_uptrend_v1'  : "(sma20 > sma50) & (sma20 > shift(sma20, 2)) & "
+                          "(close > shift(close, 2)) & (shift(close, 2) > shift(close, 5))",
+    'bull_harami_in'    : "down_1 & day1.bear & (day1.body >= 0.5 * day1.range) & day2.bull & "
+                          "(day2.body <= 0.6 * day1.body) & "
+                          "(day2.body_top <= day1.body_top) & (day2.body_bottom >= day1.body_bottom)",
+    # v1: body_day2 <= 0.6 * body_day2 (selalu benar untuk body > 0), disalin apa adanya
+    'bear_harami_in'    : "up_1 & day1.bull & (day1.body >= 0.5 * day1.range) & day2.bear & "
+                          "(day2.body <= 0.6 * day2.body) & "
+                          "(day2.body_top <= day1.body_top) & (day2.body_bottom >= day1.body_bottom)",
+    'gap_high'          : "np.maximum.reduce([m.high for m in middle])",
+    'gap_low'           : "np.minimum.reduce([m.low for m in middle])",
+    'is_doji_v1'        : "(day3.range > 0) & (day3.body <= 0.08 * day3.range)",
+}
+
+
+def _v1(key, label, direction, when):
+    return {'key': key, 'label': label, 'direction': direction, 'tier': 1, 'when': when}
+
+
+PATTERNS_V1 = [
+    # Pola 3 candle
+    _v1('3ws', "Bullish: 3 White Soldiers", 'bullish', [
+        "down_1", "day1.bull", "day2.bull", "day3.bull",
+        "day1.body >= 0.5 * day1.range", "day2.body >= 0.5 * day2.range", "day3.body >= 0.5 * day3.range",
+        "day2.close > day1.close", "day3.close > day2.close",
+        "day2.open >= day1.open", "day2.open <= day1.close",
+        "day3.open >= day2.open", "day3.open <= day2.close",
+        "day1.close_near_high()", "day2.close_near_high()", "day3.close_near_high()",
+        "vol_conf",
+    ]),
+    _v1('3bc', "Bearish: 3 Black Crows", 'bearish', [
+        "up_1", "day1.bear", "day2.bear", "day3.bear",
+        "day1.body >= 0.5 * day1.range", "day2.body >= 0.5 * day2.range", "day3.body >= 0.5 * day3.range",
+        "day2.close < day1.close", "day3.close < day2.close",
+        "day2.open <= day1.open", "day2.open >= day1.close",
+        "day3.open <= day2.open", "day3.open >= day2.close",
+        "day1.close_near_low()", "day2.close_near_low()", "day3.close_near_low()",
+    ]),
+    _v1('evening_star', "Bearish: Evening Star", 'bearish', [
+        "is_uptrend_v1", "day1.bull", "day1.range > 0", "day1.body >= 0.6 * day1.range",
+        "sm_body_2", "day3.bear", "day3.range > 0", "day3.body >= 0.6 * day3.range",
+        "day3.close <= day1.mid",
+    ]),
+    _v1('morning_star', "Bullish: Morning Star", 'bullish', [
+        "is_downtrend_v1", "day1.bear", "day1.range > 0", "day1.body >= 0.6 * day1.range",
+        "sm_body_2", "day3.bull", "day3.range > 0", "day3.body >= 0.6 * day3.range",
+        "day3.close >= day1.mid",
+    ]),
+    _v1('bull_abandoned', "Bullish: Abandoned Baby", 'bullish', [
+        "down_1", "day1.bear", "day3.bull",
+        "day1.body >= 0.5 * day1.range", "day3.body >= 0.5 * day3.range",
+        "day2.body <= 0.1 * day2.range", "day2.high < day1.low", "day2.high < day3.low",
+        "day3.close > day1.mid",
+    ]),
+    _v1('bear_abandoned', "Bearsih: Abandoned Baby", 'bearish', [
+        "up_1", "day1.bull", "day3.bear",
+        "day1.body >= 0.5 * day1.range", "day3.body >= 0.5 * day3.range",
+        "day2.body <= 0.1 * day2.range", "day2.low > day1.high", "day2.low > day3.high",
+        "day3.close < day1.mid",
+    ]),
+    _v1('3_inside_up', "Bullish: 3 Inside Up", 'bullish', ["bull_harami_in", "day3.bull", "day3.close > day1.high"]),
+    _v1('3_inside_down', "Bearish: 3 Inside Down", 'bearish', ["bear_harami_in", "day3.bear", "day3.close < day1.low"]),
+    _v1('3_outside_up', "Bullish: 3 Outside Up", 'bullish', [
+        "down_1", "day1.bear", "day2.bull", "day2.close > day1.open", "day2.open < day1.close",
+        "day2.body > day1.body * 1.2", "day3.bull", "day3.body >= 0.5 * day3.range", "day3.close > day2.high",
+    ]),
+    _v1('3_outside_down', "Bearish: 3 Outside Down", 'bearish', [
+        "up_1", "day1.bull", "day2.bear", "day2.close < day1.open", "day2.open > day1.close",
+        "day2.body > day1.body * 1.2", "day3.bear", "day3.body >= 0.5 * day3.range", "day3.close < day2.low",
+    ]),
+
+    # Pola 2 candle
+    _v1('bear_engulf', "Bearish: Engulfing", 'bearish', [
+        "day2.bull", "day3.bear", "day3.open >= day2.close", "day3.close < day2.open",
+        "day3.body > day2.body * 1.08", "day3.close > sma50",
+    ]),
+    _v1('bull_engulf', "Bullish: Engulfing", 'bullish', [
+        "day2.bear", "day3.bull", "day3.close > day2.open", "day3.open <= day2.close",
+        "day3.body > day2.body * 1.08", "day3.close < sma50",
+    ]),
+    _v1('dark_cloud', "Bearish: Dark Cloud Cover", 'bearish', [
+        "day2.bull", "day3.bear", "day3.open > day2.high", "day3.close <= day2.mid",
+        "day3.close > day2.open", "day3.close > sma50",
+    ]),
+    _v1('piercing', "Bullish: Piercing Line", 'bullish', [
+        "down_2", "day2.bear", "(day2.open - day2.close) >= 0.6 * day2.range", "day3.bull",
+        "day3.open <= day2.close", "pen_ratio_v1 >= 0.5", "day3.close < day2.open",
+    ]),
+    _v1('bear_harami', "Bearish: Harami", 'bearish', [
+        "up_2", "day2.bull", "day2.body >= 0.5 * day2.range", "day3.bear",
+        "day3.body <= 0.6 * day2.body",
+        "day3.body_top <= day2.body_top", "day3.body_bottom >= day2.body_bottom",
+    ]),
+    _v1('bull_harami', "Bullish: Harami", 'bullish', [
+        "down_2", "day2.bear", "day2.body >= 0.5 * day2.range", "day3.bull",
+        "day3.body >= 0.2 * day3.range", "day3.body <= 0.6 * day2.body",
+        "day3.body_top <= day2.body_top", "day3.body_bottom >= day2.body_bottom",
+    ]),
+    _v1('bull_kicker', "Bullish: Kicker", 'bullish', [
+        "day2.bear", "day2.body >= 0.5 * day2.range", "day3.bull", "day3.body >= 0.5 * day3.range",
+        "day3.open > day2.high", "day3.low > day2.high",
+    ]),
+    _v1('bear_kicker', "Bearish: Kicker", 'bearish', [
+        "day2.bull", "day2.body >= 0.5 * day2.range", "day3.bear", "day3.body >= 0.5 * day3.range",
+        "day3.open < day2.low",
+    ]),
+    _v1('bull_island', "Bullish: Island", 'bullish', ["d1.low > gap_high", "d5.low > gap_high", "d5.bull"]),
+    _v1('bear_island', "Bearish: Island", 'bearish', ["d1.high < gap_low", "d5.high < gap_low", "d5.bear"]),
+    _v1('tweezer_bottom', "Bullish: Tweezer Bottom", 'bullish', [
+        "sma20 < sma50", "day2.bear", "day2.body >= 0.5 * day2.range",
+        "day3.bull", "day3.body >= 0.5 * day3.range", "near(day2.low, day3.low)", "day3.close > day2.close",
+    ]),
+    _v1('tweezer_top', "Bearish: Tweezer Top", 'bearish', [
+        "sma20 > sma50", "day2.bull", "day2.body >= 0.5 * day2.range",
+        "day3.bear", "day3.body >= 0.5 * day3.range", "near(day2.high, day3.high)", "day3.close < day2.close",
+    ]),
+    _v1('rising_3', "Bullish Cont: 3 Rising", 'bullish', [
+        "d1.bull", "d1.body > d1.range * 0.6",
+        "np.logical_and.reduce([m.close < m.open for m in middle])",
+        "np.logical_and.reduce([(m.high < d1.high) & (m.low > d1.low) for m in middle])",
+        "np.logical_and.reduce([m.body < d1.body * 0.5 for m in middle])",
+        "d5.bull", "d5.body > d5.range * 0.6", "d5.close > d1.close",
+    ]),
+    _v1('falling_3', "Bearish Cont: 3 Failing", 'bearish', [
+        "d1.close < d1.open", "d5.close < d5.open", "d5.close < d1.close",
+        "np.logical_and.reduce([m.close > m.open for m in middle])",
+        "np.logical_and.reduce([(m.high < d1.high) & (m.low > d1.low) for m in middle])",
+    ]),
+
+    # Pola 1 candle
+    _v1('shooting_star', "Bearish: Shooting Star", 'bearish', [
+        "day3.range > 0", "day3.body > 0", "day3.body <= 0.3 * day3.range",
+        "day3.upper_shade >= 2 * day3.body", "day3.upper_shade >= 0.6 * day3.range",
+        "day3.lower_shade <= 0.15 * day3.range", "(day3.close - day3.low) <= 0.25 * day3.range",
+        "day3.bear", "valid_uptrend_v1",
+    ]),
+    _v1('hammer', "Bullish: Hammer", 'bullish', [
+        "day3.range > 0", "day3.body > 0", "day3.body <= 0.3 * day3.range",
+        "day3.lower_shade >= 2 * day3.body", "day3.upper_shade <= 0.15 * day3.range",
+        "(day3.high - day3.close) <= 0.25 * day3.range", "day3.close < sma20",
+    ]),
+    _v1('gravestone_doji', "Bearish: Gravestone Doji", 'bearish', [
+        "is_doji_v1", "day3.upper_shade >= 0.7 * day3.range", "day3.lower_shade <= 0.1 * day3.range",
+    ]),
+    _v1('dragonfly_doji', "Bullish: Dragonfly Doji", 'bullish', [
+        "is_doji_v1", "day3.lower_shade >= 0.7 * day3.range", "day3.upper_shade <= 0.1 * day3.range",
+    ]),
+    _v1('long_legged_doji', "WARNING: Indecision", 'neutral', [
+        "is_doji_v1", "day3.upper_shade >= 0.35 * day3.range", "day3.lower_shade >= 0.35 * day3.range",
+    ]),
+    _v1('inv_hammer', "Bullish: Inverted Hammer", 'bullish', [
+        "day3.range > 0", "day3.body <= 0.3 * day3.range", "day3.upper_shade >= 2 * day3.body",
+        "day3.lower_shade <= 0.15 * day3.range", "(day3.close - day3.low) <= 0.25 * day3.range",
+        "sma20 < sma50",
+    ]),
+    _v1('hanging_man', "Bearish: Hanging Man", 'bearish', [
+        "day3.range > 0", "day3.body <= 0.3 * day3.range", "day3.lower_shade >= 2 * day3.body",
+        "day3.upper_shade <= 0.15 * day3.range", "(day3.high - day3.close) <= 0.25 * day3.range",
+        "sma20 > sma50", "day2.bull",
+    ]),
+    _v1('spinning_top', "Netral", 'neutral', [
+        "day3.range > 0", "0.1 * day3.range < day3.body", "day3.body <= 0.35 * day3.range",
+        "day3.upper_shade >= 0.25 * day3.range", "day3.lower_shade >= 0.25 * day3.range",
+    ]),
+]
+
+# Versi yang bisa dibandingkan; kunci = nama kolom di tabel diff
+VERSIONS = {
+    'v1': pattern_engine.compile_registry(PATTERNS_V1, TERMS_V1),
+    'v2': pattern_engine.default_registry(),
+}
+
+DIFF_SHEET = "DIFF_VERSI_POLA"
+
+
+# ==========================================
+# RUN + DIFF
+# ==========================================
+def run_versions(frames, versions=None, timings=None):
+    """
+    frames   : dict {ticker: DataFrame hasil add_indicators()} (dimuat sekali, dipakai semua versi)
+    versions : list nama di VERSIONS (default semua)
+    Return   : (tickers, dates, {versi: dict kolom detect_patterns_panel})
+    """
+    versions = list(versions or VERSIONS)
+    tickers, dates, panel = pattern_engine.stack_panel(frames)
+    if not tickers:
+        return tickers, dates, {v: {} for v in versions}
+    out = pattern_engine.detect_versions(panel, {v: VERSIONS[v] for v in versions}, timings=timings)
+    return tickers, dates, out
+
+
+def diff_table(tickers, results, bar=-1, only_changed=True):
+    """
+    Ringkas: satu baris per ticker dengan pola + arah tiap versi di bar `bar`
+    (default bar terakhir) dan status perubahan relatif versi pertama.
+    Status: 'sama', 'baru' (versi pertama tanpa pola), 'hilang', 'arah berubah', 'pola berubah'.
+    Perbandingan memakai key pola (label tiap versi bisa beda teks), label hanya ditampilkan.
+    """
+    names = list(results)
+    if not tickers or not names:
+        return pd.DataFrame()
+    base = names[0]
+    table = pd.DataFrame({"Ticker": tickers})
+    for v in names:
+        table[f"Pola {v}"] = results[v]['pola'][:, bar]
+        table[f"Arah {v}"] = results[v]['direction'][:, bar]
+        table[f"Tier {v}"] = results[v]['tier'][:, bar]
+
+    status = np.full(len(tickers), "sama", dtype=object)
+    a_key, a_dir = results[base]['pattern'][:, bar], results[base]['direction'][:, bar]
+    for v in names[1:]:
+        b_key, b_dir = results[v]['pattern'][:, bar], results[v]['direction'][:, bar]
+        changed = np.select(
+            [(a_key == '') & (b_key != ''),
+             (a_key != '') & (b_key == ''),
+             a_dir != b_dir,
+             a_key != b_key],
+            ['baru', 'hilang', 'arah berubah', 'pola berubah'], 'sama')
+        status = np.where(status == 'sama', changed, status)
+    table["Status"] = status
+    if only_changed:
+        table = table[table["Status"] != "sama"]
+    return table.reset_index(drop=True)
+
+
+def diff_summary(tickers, results):
+    """Jumlah bar berpola per versi dan jumlah bar yang berbeda vs versi pertama (seluruh histori)."""
+    names = list(results)
+    if not tickers or not names:
+        return pd.DataFrame()
+    base = results[names[0]]
+    rows = []
+    for v in names:
+        r = results[v]
+        rows.append({
+            "Versi"       : v,
+            "Bar berpola" : int((r['pattern'] != '').sum()),
+            "Bullish"     : int((r['direction'] == 'bullish').sum()),
+            "Bearish"     : int((r['direction'] == 'bearish').sum()),
+            "Beda arah vs " + names[0]: int((r['direction'] != base['direction']).sum()),
+        })
+    return pd.DataFrame(rows)
+
+
+# ==========================================
+# MAIN: v1 vs v2 pada universe ScannerPattern2 (frame cache yang sama)
+# ==========================================
+if __name__ == "__main__":
+    from gspread_dataframe import set_with_dataframe
+    from ScannerPattern2 import SECTOR_CONFIG, load_stock, connect_gsheet
+
+    versions = os.environ.get("PATTERN_VERSIONS", "v1,v2").split(",")
+    frames, sector_of = {}, {}
+    for sector, saham_list in SECTOR_CONFIG.items():
+        for ticker in saham_list:
+            if ticker in frames:
+                continue
+            sector_of[ticker] = sector
+            loaded = load_stock(ticker)
+            if loaded is not None:
+                frames[ticker] = loaded[0]
+
+    tickers, dates, results = run_versions(frames, versions)
+    print(diff_summary(tickers, results).to_string(index=False))
+    df_diff = diff_table(tickers, results)
+    print(f"\n🔀 {len(df_diff)} emiten dengan sinyal berbeda di bar terakhir ({' vs '.join(versions)})")
+    if not df_diff.empty:
+        df_diff.insert(1, "Sektor", df_diff["Ticker"].map(sector_of))
+        print(df_diff.to_string(index=False))
+        ws = connect_gsheet(DIFF_SHEET)
+        if ws:
+            try:
+                ws.clear()
+                set_with_dataframe(ws, df_diff)
+            except Exception as e:
+                print(f"❌ Upload Error {DIFF_SHEET}: {e}")
@@ -0,0 +1,102 @@
+# ==========================================
+# MARKET REGIME — SERIES PRECOMPUTED + AS-OF JOIN
+# Regime indeks (IHSG > SMA50, dst.) dihitung sekali sebagai series boolean per
+# definisi; tanggal sinyal dipetakan ke nilai regime terakhir <= tanggal tsb.
+# lewat searchsorted (as-of join), bukan filter frame indeks per sinyal.
+# Dipakai backtest (SignalCache) dan scanner live (current()).
+# ==========================================
+
+import numpy as np
+import pandas as pd
+
+import data_cache
+
+INDEX_TICKER   = "^JKSE"
+DEFAULT_REGIME = "SMA50"
+
+
+def _above_sma(n):
+    def rule(close):
+        sma = close.rolling(n).mean()
+        return (close > sma).where(sma.notna())
+    return rule
+
+
+def _golden_cross(close):
+    fast, slow = close.rolling(50).mean(), close.rolling(200).mean()
+    return (fast > slow).where(slow.notna())
+
+
+def _momentum(n):
+    def rule(close):
+        roc = close.pct_change(n)
+        return (roc > 0).where(roc.notna())
+    return rule
+
+
+# Nama -> fungsi(close Series) -> Series bool; NaN selama warm-up (bar tsb. dibuang)
+REGIMES = {
+    "SMA50" : _above_sma(50),      # IHSG di atas SMA50 (filter backtest default)
+    "SMA200": _above_sma(200),
+    "GOLDEN": _golden_cross,       # SMA50 > SMA200
+    "MOM20" : _momentum(20),       # Return 20 hari positif
+}
+
+
+class RegimeSeries:
+    """
+    Series regime per definisi dari OHLCV indeks (minimal kolom Close).
+    index_df None / kosong -> semua query mengembalikan default (tanpa filter).
+    Instance bisa dipanggil langsung: regime(dates) = asof(dates, DEFAULT_REGIME).
+    """
+
+    def __init__(self, index_df, definitions=None):
+        self.series = {}
+        if index_df is None or index_df.empty:
+            return
+        close = index_df['Close'].astype(float)
+        idx   = pd.DatetimeIndex(close.index)
+        close.index = idx.tz_localize(None) if idx.tz is not None else idx
+        close = close.dropna().sort_index()
+        for name, rule in (definitions or REGIMES).items():
+            s = rule(close).dropna()
+            self.series[name] = (s.index.values.astype('datetime64[ns]'), s.values.astype(bool))
+
+    def frame(self):
+        """Semua definisi sebagai DataFrame (NaN = warm-up)."""
+        return pd.DataFrame({name: pd.Series(vals, index=dates)
+                             for name, (dates, vals) in self.series.items()})
+
+    def asof(self, dates, name=DEFAULT_REGIME, default=True):
+        """Array bool per tanggal: nilai regime terakhir <= tanggal; sebelum data -> default."""
+        idx = pd.DatetimeIndex(dates)
+        q   = (idx.tz_localize(None) if idx.tz is not None else idx).values.astype('datetime64[ns]')
+        if name not in self.series:
+            return np.full(len(q), bool(default))
+        ref, vals = self.series[name]
+        pos = ref.searchsorted(q, side='right') - 1
+        return np.where(pos >= 0, vals[np.maximum(pos, 0)], bool(default))
+
+    def __call__(self, dates):
+        return self.asof(dates)
+
+    def current(self, name=DEFAULT_REGIME, default=True):
+        """Regime bar terakhir (gating scanner live); tanpa data -> default apa adanya (mis. None)."""
+        if name not in self.series or not len(self.series[name][1]):
+            return default
+        return bool(self.series[name][1][-1])
+
+
+def load(ticker=INDEX_TICKER, definitions=None):
+    """RegimeSeries dari cache harian indeks (data_cache); gagal download -> tanpa filter."""
+    return RegimeSeries(data_cache.load_daily(ticker, auto_adjust=True), definitions)
+
+
+# ==========================================
+# MAIN: status regime IHSG hari ini
+# ==========================================
+if __name__ == "__main__":
+    reg = load()
+    for name in REGIMES:
+        bull = reg.current(name, default=None)
+        print(f"{name:<7}: {'N/A' if bull is None else ('Bull' if bull else 'Bear')}")
@@ -16,6 +16,8 @@ import os
 import time
 from google.oauth2.service_account import Credentials
 
+import trade_params
+
 warnings.filterwarnings('ignore')
 
 SPREADSHEET_ID = "1bUzWbd1pqTZO37cZ1rQzTelqUcykz_oOwULOCmK-HNc"
@@ -63,6 +65,7 @@ def analyze_sector(sector_name, ticker_list):
     tgl_skrg = datetime.now(tz_jkt).strftime("%Y-%m-%d")
 
     results = []
+    candidates = []
 
     print(f"\n🚀 Scan {sector_name} | Total: {len(ticker_list)} saham")
 
@@ -102,148 +105,149 @@ def analyze_sector(sector_name, ticker_list):
             if pd.isna(macd_line) or pd.isna(macd_signal) or pd.isna(rsi):
                 continue
 
-            # ===== FIBONACCI BREAKOUT MODEL =====
+            # ===== SWING 120 BAR (input tangga fibo) =====
             lookback = 120
             recent = df.iloc[-lookback:]
 
-            high_swing = float(recent["High"].max())
-            low_swing = float(recent["Low"].min())
-            range_price = high_swing - low_swing
-
-            # Level Retracement
-            fibo_levels = [
-                        high_swing - (range_price * 0.786),
-                        high_swing - (range_price * 0.618),
-                        high_swing - (range_price * 0.5),
-                        high_swing - (range_price * 0.382),
-                        high_swing - (range_price * 0.236),
-                        high_swing
-                        ]
-
-            fibo_levels = sorted(fibo_levels)
-
-            # Cari target terdekat di atas harga sekarang
-            target_aman = None
-            target_jp = None
-
-            for level in fibo_levels:
-                if level > price:
-                    if not target_aman:
-                        target_aman = level
-                    elif not target_jp:
-                        target_jp = level
-                        break
-
-            # Jika sudah dekat high
-            if not target_aman:
-                target_aman = high_swing
-
-            if not target_jp:
-                target_jp = high_swing + (range_price * 0.618)
-
-            target_aman = int(target_aman)
-            target_jp = int(target_jp)
-
-            # ===== STOP LOSS (ATR BASED) =====
-            recent_low = df["Low"].iloc[-5:].min()
-            stop_loss = int(recent_low - atr)
-
-            # ===== BREAKOUT LOGIC =====
-            is_uptrend = price > ma20
-            is_macd = macd_line > macd_signal
-            is_rsi = 50 < rsi < 70
-            is_vol_break = vol_today > (1.5 * vol_ma20)
-            is_near_high = price > (high_swing * 0.95)
-
-            posisi_ma = "DI ATAS MA20" if is_uptrend else "DI BAWAH MA20"
-
-            # ===== RISK REWARD =====
-            if price > stop_loss:
-                rr = round((target_aman - price) / (price - stop_loss), 2)
-            else:
-                rr = 0
-
-            # ===== ESTIMASI WAKTU =====
-            if atr > 0:
-                est_aman = max(1, round((target_aman - price) / atr))
-                est_jp = max(1, round((target_jp - price) / atr))
-            else:
-                est_aman = "-"
-                est_jp = "-"
-
-            # ===== ATR PERCENTAGE =====
-            atr_pct = (atr / price) * 100 if price > 0 else 0
-
-            if atr_pct > 3:
-                tipe_swing = "Swing Harian"
-            elif 1.5 < atr_pct <= 3:
-                tipe_swing = "Swing Mingguan"
-            else:
-                tipe_swing = "Swing Bulanan"
-
-            # ===== SCORE BREAKOUT HUNTER =====
-            score = 0
-
-            if is_uptrend: score += 2
-            if is_macd: score += 2
-            if is_rsi: score += 1
-            if is_vol_break: score += 3
-            if rr >= 2: score += 2
-
-            # ===== ACTION =====
-            if score >= 8:
-                action = "🔥 STRONG BUY"
-            elif score >= 5:
-                action = "🟢 BUY"
-            elif score >= 3:
-                action = "🟡 WAIT Breakout"
-            else:
-                action = "⚪ PANTAU"
-
-            # ===== ALASAN =====
-            alasan = []
-
-            if is_uptrend: alasan.append("Trend naik")
-            if is_macd: alasan.append("MACD bullish")
-            if is_vol_break: alasan.append("Volume breakout kuat")
-            if is_rsi: alasan.append("RSI sehat")
-            if rr >= 2: alasan.append("Risk/Reward menarik")
-
-            if not alasan:
-                    alasan.append("Belum ada konfirmasi breakout")
-
-            alasan_text = ", ".join(alasan)
-
-            potensi_max = round(((target_jp - price) / price) * 100, 1)
-            potensi_aman = round(((target_aman - price) / price) * 100, 1)
-
-            results.append({
-                "Ticker": ticker,
-                "Tanggal": tgl_skrg,
-                "Jam Update": waktu_skrg,
-                "Harga Skrg": int(price),
-                "Posisi vs MA20": posisi_ma,
-                "Volume MA20": int(vol_ma20),
-                "Volume Breakout": is_vol_break,
-                "RSI": round(rsi,1),
-                "Risk/Reward": rr,
-                "Action": action,
-                "Stop Loss": stop_loss,
-                "Target Aman": target_aman,
-                "Est. Waktu Aman (hari)": est_aman,
-                "Target Jackpot": target_jp,
-                "Est. Waktu JP (hari)": est_jp,
-                "Potensi Aman (%)": potensi_aman,
-                "Potensi MAX (%)": potensi_max,
-                "Tipe Swing Disarankan": tipe_swing,
-                "Alasan Rekomendasi": alasan_text,
-                "Score": score
+            candidates.append({
+                "ticker": ticker,
+                "price": price,
+                "ma20": ma20,
+                "vol_today": vol_today,
+                "vol_ma20": vol_ma20,
+                "rsi": rsi,
+                "macd_line": macd_line,
+                "macd_signal": macd_signal,
+                "atr": atr,
+                "high_swing": float(recent["High"].max()),
+                "low_swing": float(recent["Low"].min()),
+                "recent_low": float(df["Low"].iloc[-5:].min()),
             })
 
         except Exception as e:
             print(f"Error {ticker}: {e}")
             continue
 
+    if not candidates:
+        return pd.DataFrame()
+
+    # ===== FIBONACCI BREAKOUT MODEL + SL/RR (semua kandidat, satu panggilan) =====
+    c = pd.DataFrame(candidates)
+
+    # Input batch NaN/inf -> ticker dilewati (sama seperti error int() per ticker sebelumnya)
+    finite = np.isfinite(c[["price", "vol_ma20", "atr", "high_swing", "low_swing", "recent_low"]]
+                         .to_numpy(dtype=float)).all(axis=1)
+    for ticker in c.loc[~finite, "ticker"]:
+        print(f"Error {ticker}: data NaN/inf")
+    c = c[finite].reset_index(drop=True)
+    if c.empty:
+        return pd.DataFrame()
+
+    price = c["price"].to_numpy()
+    atr = c["atr"].to_numpy()
+    high_swing = c["high_swing"].to_numpy()
+    range_price = high_swing - c["low_swing"].to_numpy()
+
+    # Level retracement dari high: target aman = level pertama di atas harga, JP = level berikutnya
+    _, target_aman, target_jp = trade_params.fib_ladder(
+        high_swing, -range_price, [0.786, 0.618, 0.5, 0.382, 0.236, 0.0], above=price)
+    # Jika sudah dekat high: aman = high, JP = extension 0.618
+    has_aman = ~np.isnan(target_aman)
+    target_jp = np.where(np.isnan(target_jp), high_swing + range_price * 0.618, target_jp)
+    target_aman = np.where(has_aman, target_aman, high_swing)
+    target_aman = trade_params.round_tick(target_aman, -1)
+    target_jp = trade_params.round_tick(target_jp, -1)
+
+    # ===== STOP LOSS (ATR BASED) =====
+    stop_loss = trade_params.round_tick(c["recent_low"].to_numpy() - atr, -1)
+
+    # ===== RISK REWARD & ESTIMASI WAKTU =====
+    rr = np.where(price > stop_loss,
+                  np.round((target_aman - price) / np.where(price > stop_loss, price - stop_loss, 1), 2), 0)
+    est_aman = trade_params.est_days(price, target_aman, atr)
+    est_jp = trade_params.est_days(price, target_jp, atr)
+
+    for k, row in enumerate(c.itertuples(index=False)):
+        price_k = row.price
+        atr_k = row.atr
+
+        # ===== BREAKOUT LOGIC =====
+        is_uptrend = price_k > row.ma20
+        is_macd = row.macd_line > row.macd_signal
+        is_rsi = 50 < row.rsi < 70
+        is_vol_break = row.vol_today > (1.5 * row.vol_ma20)
+
+        posisi_ma = "DI ATAS MA20" if is_uptrend else "DI BAWAH MA20"
+
+        # ===== ATR PERCENTAGE =====
+        atr_pct = (atr_k / price_k) * 100 if price_k > 0 else 0
+
+        if atr_pct > 3:
+            tipe_swing = "Swing Harian"
+        elif 1.5 < atr_pct <= 3:
+            tipe_swing = "Swing Mingguan"
+        else:
+            tipe_swing = "Swing Bulanan"
+
+        # ===== SCORE BREAKOUT HUNTER =====
+        score = 0
+
+        if is_uptrend: score += 2
+        if is_macd: score += 2
+        if is_rsi: score += 1
+        if is_vol_break: score += 3
+        if rr[k] >= 2: score += 2
+
+        # ===== ACTION =====
+        if score >= 8:
+            action = "🔥 STRONG BUY"
+        elif score >= 5:
+            action = "🟢 BUY"
+        elif score >= 3:
+            action = "🟡 WAIT Breakout"
+        else:
+            action = "⚪ PANTAU"
+
+        # ===== ALASAN =====
+        alasan = []
+
+        if is_uptrend: alasan.append("Trend naik")
+        if is_macd: alasan.append("MACD bullish")
+        if is_vol_break: alasan.append("Volume breakout kuat")
+        if is_rsi: alasan.append("RSI sehat")
+        if rr[k] >= 2: alasan.append("Risk/Reward menarik")
+
+        if not alasan:
+                alasan.append("Belum ada konfirmasi breakout")
+
+        alasan_text = ", ".join(alasan)
+
+        potensi_max = round(((target_jp[k] - price_k) / price_k) * 100, 1)
+        potensi_aman = round(((target_aman[k] - price_k) / price_k) * 100, 1)
+
+        results.append({
+            "Ticker": row.ticker,
+            "Tanggal": tgl_skrg,
+            "Jam Update": waktu_skrg,
+            "Harga Skrg": int(price_k),
+            "Posisi vs MA20": posisi_ma,
+            "Volume MA20": int(row.vol_ma20),
+            "Volume Breakout": is_vol_break,
+            "RSI": round(row.rsi,1),
+            "Risk/Reward": float(rr[k]),
+            "Action": action,
+            "Stop Loss": int(stop_loss[k]),
+            "Target Aman": int(target_aman[k]),
+            "Est. Waktu Aman (hari)": int(est_aman[k]) if not np.isnan(est_aman[k]) else "-",
+            "Target Jackpot": int(target_jp[k]),
+            "Est. Waktu JP (hari)": int(est_jp[k]) if not np.isnan(est_jp[k]) else "-",
+            "Potensi Aman (%)": potensi_aman,
+            "Potensi MAX (%)": potensi_max,
+            "Tipe Swing Disarankan": tipe_swing,
+            "Alasan Rekomendasi": alasan_text,
+            "Score": score
+        })
+
     df_result = pd.DataFrame(results)
 
     if not df_result.empty:
@@ -0,0 +1,207 @@
+# ==========================================
+# SHARED MEMORY + PROCESS POOL
+# OHLCV banyak ticker dikemas ke blok shared memory sekali di proses utama,
+# worker hanya menerima (start, stop) per ticker — tanpa pickle DataFrame
+# ==========================================
+
+import os
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+OHLCV_COLS = ["Open", "High", "Low", "Close", "Volume"]
+
+# Jumlah worker default; bisa dioverride lewat env (mis. runner dengan core terbatas)
+N_WORKERS = int(os.environ.get("SAHAM_WORKERS", os.cpu_count() or 1))
+
+# Array yang sudah di-attach di proses worker (diisi oleh _init_worker)
+_ATTACHED = {}
+_HANDLES  = []
+
+
+# ==========================================
+# BLOK ARRAY BERNAMA
+# ==========================================
+class SharedArrays:
+    """
+    Beberapa numpy array bernama, masing-masing di segmen shared memory sendiri.
+    spec (dict kecil, aman di-pickle) dikirim ke worker untuk attach().
+    Pemilik wajib memanggil close() (atau pakai `with`) agar segmen di-unlink.
+    """
+
+    def __init__(self, arrays):
+        self._shm  = []
+        self.spec  = {}
+        self.local = arrays   # array asli, dipakai saat berjalan tanpa pool
+        for name, arr in arrays.items():
+            arr = np.ascontiguousarray(arr)
+            shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+            np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+            self._shm.append(shm)
+            self.spec[name] = (shm.name, arr.shape, arr.dtype.str)
+
+    def close(self):
+        for shm in self._shm:
+            try:
+                shm.close()
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._shm = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach(spec):
+    """View numpy (read-only) ke array di shared memory; handle disimpan per proses."""
+    arrays = {}
+    for name, (shm_name, shape, dtype) in spec.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _HANDLES.append(shm)
+        view = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        view.flags.writeable = False
+        arrays[name] = view
+    return arrays
+
+
+def attached():
+    """Array yang di-attach oleh initializer pool di proses ini."""
+    return _ATTACHED
+
+
+def _init_worker(spec):
+    _ATTACHED.clear()
+    _ATTACHED.update(attach(spec))
+
+
+# ==========================================
+# OHLCV PANEL
+# ==========================================
+def pack_ohlcv(frames):
+    """
+    frames : dict {key: DataFrame OHLCV ber-index Date}
+    Return : (dict array {'ohlcv': float64 [N, 5], 'dates': int64 [N]},
+              dict {key: (start, stop)} baris milik tiap key)
+    Array disalin ke shared memory oleh map_shared.
+    """
+    slices, values, dates = {}, [], []
+    pos = 0
+    for key, df in frames.items():
+        if df is None or df.empty:
+            continue
+        n = len(df)
+        values.append(df[OHLCV_COLS].to_numpy(dtype=np.float64))
+        dates.append(pd.DatetimeIndex(df.index).values.astype("datetime64[ns]").view(np.int64))
+        slices[key] = (pos, pos + n)
+        pos += n
+
+    ohlcv = np.concatenate(values) if values else np.empty((0, len(OHLCV_COLS)))
+    dts   = np.concatenate(dates) if dates else np.empty(0, dtype=np.int64)
+    return {"ohlcv": ohlcv, "dates": dts}, slices
+
+
+def frame_from(arrays, bounds):
+    """DataFrame OHLCV (index Date) dari panel shared memory untuk satu (start, stop)."""
+    if bounds is None:
+        return None
+    start, stop = bounds
+    index = pd.DatetimeIndex(arrays["dates"][start:stop].view("datetime64[ns]"), name="Date")
+    return pd.DataFrame(arrays["ohlcv"][start:stop], index=index, columns=OHLCV_COLS)
+
+
+# ==========================================
+# POOL
+# ==========================================
+def map_shared(func, tasks, shared, workers=None, chunksize=None):
+    """
+    Jalankan func(task) untuk setiap task; di dalam func, attached() berisi array `shared`.
+    shared : dict {nama: ndarray} (disalin ke shared memory & dibersihkan di sini)
+             atau SharedArrays yang dikelola pemanggil (dipakai ulang antar panggilan).
+    Urutan hasil sama dengan urutan tasks. workers <= 1 -> jalan di proses ini tanpa pool.
+    """
+    tasks   = list(tasks)
+    workers = min(workers or N_WORKERS, len(tasks))
+    owned   = not isinstance(shared, SharedArrays)
+
+    if workers <= 1:
+        _ATTACHED.clear()
+        _ATTACHED.update(shared if owned else shared.local)
+        try:
+            return [func(t) for t in tasks]
+        finally:
+            _ATTACHED.clear()
+
+    block     = SharedArrays(shared) if owned else shared
+    chunksize = chunksize or max(1, len(tasks) // (workers * 4))
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(block.spec,)) as pool:
+            return list(pool.map(func, tasks, chunksize=chunksize))
+    finally:
+        if owned:
+            block.close()
+
+
+def imap_shared(func, tasks, shared, workers=None):
+    """
+    Seperti map_shared, tetapi generator (index task, hasil) sesuai urutan selesai,
+    untuk progress / hasil bertahap. Segmen shared milik generator dibersihkan saat selesai.
+    """
+    tasks = list(tasks)
+    with SharedPool(shared, min(workers or N_WORKERS, len(tasks))) as pool:
+        yield from pool.imap(func, tasks)
+
+
+class SharedPool:
+    """
+    Process pool + array shared yang hidup selama blok `with`: beberapa putaran imap()
+    berturut-turut (mis. batch search adaptif) memakai segmen shared memory dan worker
+    yang sama, tanpa salin ulang array / spawn pool baru per putaran.
+    shared : dict {nama: ndarray} (disalin & dibersihkan di close()) atau SharedArrays milik pemanggil.
+    workers <= 1 -> task dijalankan di proses ini tanpa pool.
+    """
+
+    def __init__(self, shared, workers=None):
+        self.workers = N_WORKERS if workers is None else workers
+        self._owned  = not isinstance(shared, SharedArrays)
+        self._shared = shared
+        self._block  = None
+        self._pool   = None
+
+    def __enter__(self):
+        if self.workers <= 1:
+            _ATTACHED.clear()
+            _ATTACHED.update(self._shared if self._owned else self._shared.local)
+            return self
+        self._block = SharedArrays(self._shared) if self._owned else self._shared
+        self._pool  = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                          initargs=(self._block.spec,))
+        return self
+
+    def imap(self, func, tasks):
+        """Generator (index task, hasil) sesuai urutan selesai."""
+        if self._pool is None:
+            for i, task in enumerate(tasks):
+                yield i, func(task)
+            return
+        futures = {self._pool.submit(func, task): i for i, task in enumerate(tasks)}
+        for fut in as_completed(futures):
+            yield futures[fut], fut.result()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+        else:
+            _ATTACHED.clear()
+        if self._owned and self._block is not None:
+            self._block.close()
+        self._block = None
+
+    def __exit__(self, *exc):
+        self.close()
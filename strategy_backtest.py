@@ -0,0 +1,214 @@
+# ==========================================
+# BACKTEST STRATEGI SCREENER — SUPERTREND / CHANNEL BREAKOUT / BOLLINGER
+# State seluruh histori dari screener (entry_long, entry_short, sl_price) langsung
+# jadi kandidat trade; exit dihitung vektor oleh backtest_engine.simulate_exits_batch
+# (SL, TP, trailing, max hold) plus exit di Close saat sinyal berlawanan
+# (entry_short) muncul lebih dulu. Long only (tanpa short selling).
+# Statistik per strategi & per sektor untuk validasi screener live.
+# ==========================================
+
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import backtest_engine
+import data_cache
+import SupertrendStrategyScreener
+import ChannelBreakoutStrategyScreener
+import BoilingerBandsStrategyScreener
+
+# Nama -> (modul screener: SECTORS & gsheet, fungsi state seluruh histori)
+STRATEGIES = {
+    "Supertrend"      : (SupertrendStrategyScreener, SupertrendStrategyScreener.supertrend_signals),
+    "Channel Breakout": (ChannelBreakoutStrategyScreener, ChannelBreakoutStrategyScreener.cb_signals),
+    "Bollinger Bands" : (BoilingerBandsStrategyScreener, BoilingerBandsStrategyScreener.bb_signals),
+}
+
+EXIT_PARAMS = {
+    "MAX_HOLD_DAYS"     : 20,
+    "RR_TARGET"         : 2.0,
+    "TRAILING_ACTIVATE" : 0.04,
+    "TRAILING_DISTANCE" : 0.02,
+}
+SL_FALLBACK_PCT = 0.05     # SL = entry x (1 - 5%) jika sl_price strategi kosong / tidak di bawah entry
+FEE_BUY         = 0.0015
+FEE_SELL        = 0.0025
+MIN_BARS        = 60
+BACKTEST_SHEET  = "BACKTEST"
+
+EXIT_REVERSE = len(backtest_engine.EXIT_REASONS)
+EXIT_REASONS = np.append(backtest_engine.EXIT_REASONS, "Sinyal Balik")
+
+
+# ==========================================
+# TRADE PER TICKER
+# ==========================================
+def strategy_trades(df, df_sig, params=EXIT_PARAMS):
+    """
+    Sinyal entry_long di bar t -> entry Open t+1, SL = sl_price bar t, TP = entry + risk x RR.
+    Exit: simulate_exits_batch, kecuali entry_short pertama sejak bar entry datang lebih
+    dulu -> exit di Close bar tsb. ('Sinyal Balik').
+    Return dict array per trade (None jika tidak ada).
+    """
+    prices = {k: df[k].to_numpy(dtype=np.float64) for k in backtest_engine.PRICE_COLS}
+    n      = len(df)
+    pos    = np.flatnonzero(df_sig['entry_long'].to_numpy(dtype=bool)[:-1])
+    entry  = prices['Open'][pos + 1]
+    keep   = ~np.isnan(entry) & (entry > 0)
+    pos, entry = pos[keep], entry[keep]
+    if not len(pos):
+        return None
+
+    sl   = df_sig['sl_price'].to_numpy(dtype=np.float64)[pos]
+    sl   = np.where(~np.isnan(sl) & (sl < entry), sl, entry * (1 - SL_FALLBACK_PCT))
+    risk = entry - sl
+    tp   = entry + risk * params["RR_TARGET"]
+
+    st = backtest_engine.exit_settings([params])
+    exit_idx, exit_price, reason = (x[0] for x in backtest_engine.simulate_exits_batch(
+        prices, pos + 1, entry, sl, tp, st['max_hold'], st['trail_act'], st['trail_dist']))
+
+    # Sinyal berlawanan pertama di / setelah bar entry (sentinel n = tidak ada)
+    short = np.append(np.flatnonzero(df_sig['entry_short'].to_numpy(dtype=bool)), n)
+    rev   = short[short.searchsorted(pos + 1, side='left')]
+    first = rev < exit_idx
+    exit_idx   = np.where(first, rev, exit_idx)
+    exit_price = np.where(first, prices['Close'][np.minimum(rev, n - 1)], exit_price)
+    reason     = np.where(first, EXIT_REVERSE, reason)
+
+    cost = entry * (1 + FEE_BUY)
+    net  = exit_price * (1 - FEE_SELL)
+    dates = df.index
+    return {
+        'signal_date': dates[pos],
+        'entry_date' : dates[pos + 1],
+        'entry_price': entry,
+        'sl_price'   : sl,
+        'tp_price'   : tp,
+        'exit_date'  : dates[exit_idx],
+        'exit_price' : exit_price,
+        'exit_reason': reason,
+        'hold'       : exit_idx - (pos + 1),
+        'ret'        : (net - cost) / cost * 100,
+        'r_mult'     : (net - cost) / risk,
+    }
+
+
+def _load(ticker):
+    """OHLCV harian (cache bersama screener), tanpa bar hari ini yang belum selesai."""
+    df = data_cache.load_daily(ticker, auto_adjust=False)
+    if df is None or df.empty:
+        return None
+    df = df[df.index < pd.Timestamp(datetime.today().date())]
+    return df if len(df) >= MIN_BARS else None
+
+
+# ==========================================
+# UNIVERSE
+# ==========================================
+def run(strategies=None, params=EXIT_PARAMS, loader=_load, verbose=True):
+    """
+    Backtest strategi (default semua STRATEGIES) untuk semua ticker di SECTORS screener-nya.
+    loader : ticker -> DataFrame OHLCV (None = dilewati); data tiap ticker dimuat sekali.
+    Return DataFrame trade (satu baris per trade per sektor tempat ticker terdaftar).
+    """
+    frames, rows = {}, []
+    for name in (strategies or STRATEGIES):
+        module, signals = STRATEGIES[name]
+        t0, n_trade = time.time(), 0
+        for sector, tickers in module.SECTORS.items():
+            for ticker in tickers:
+                if ticker not in frames:
+                    frames[ticker] = loader(ticker)
+                df = frames[ticker]
+                if df is None:
+                    continue
+                try:
+                    t = strategy_trades(df, signals(df), params)
+                except Exception as e:
+                    if verbose:
+                        print(f"    [skip] {name} {ticker}: {e}")
+                    continue
+                if t is None:
+                    continue
+                n_trade += len(t['entry_price'])
+                rows.append(pd.DataFrame({
+                    "Strategi"    : name,
+                    "Sektor"      : sector,
+                    "Ticker"      : ticker,
+                    "Signal Date" : t['signal_date'],
+                    "Entry Date"  : t['entry_date'],
+                    "Entry Price" : np.round(t['entry_price'], 0),
+                    "Stop Loss"   : np.round(t['sl_price'], 0),
+                    "Target (TP)" : np.round(t['tp_price'], 0),
+                    "Exit Date"   : t['exit_date'],
+                    "Exit Price"  : np.round(t['exit_price'], 0),
+                    "Exit Reason" : EXIT_REASONS[t['exit_reason']],
+                    "Hold (bar)"  : t['hold'],
+                    "Return %"    : np.round(t['ret'], 2),
+                    "R Multiple"  : np.round(t['r_mult'], 2),
+                }))
+        if verbose:
+            print(f"  {name:<17}: {n_trade:>6} trade  ({time.time() - t0:.1f}s)")
+    return pd.concat(rows, ignore_index=True) if rows else pd.DataFrame()
+
+
+def _stats(g):
+    ret  = g["Return %"]
+    win  = ret > 0
+    loss = -ret[~win].sum()
+    out  = {
+        "Trade"          : len(g),
+        "Win Rate %"     : round(win.mean() * 100, 1),
+        "Avg Return %"   : round(ret.mean(), 2),
+        "Profit Factor"  : round(ret[win].sum() / loss, 2) if loss > 0 else 999,
+        "Expectancy (R)" : round(g["R Multiple"].mean(), 3),
+        "Avg Hold (bar)" : round(g["Hold (bar)"].mean(), 1),
+    }
+    counts = g["Exit Reason"].value_counts()
+    out.update({r: int(counts.get(r, 0)) for r in EXIT_REASONS})
+    return out
+
+
+def summarize(trades):
+    """Statistik per strategi per sektor + baris 'SEMUA' per strategi (return per trade, net fee)."""
+    if trades.empty:
+        return pd.DataFrame()
+    rows = []
+    for name, g in trades.groupby("Strategi", sort=False):
+        # Ticker yang terdaftar di beberapa sektor dihitung sekali di baris SEMUA
+        rows.append({"Strategi": name, "Sektor": "SEMUA", **_stats(g.drop_duplicates(["Ticker", "Entry Date"]))})
+        rows += [{"Strategi": name, "Sektor": sector, **_stats(gs)}
+                 for sector, gs in g.groupby("Sektor", sort=False)]
+    return pd.DataFrame(rows)
+
+
+# ==========================================
+# MAIN
+# ==========================================
+if __name__ == "__main__":
+    from gspread_dataframe import set_with_dataframe
+
+    print(f"🧪 BACKTEST STRATEGI SCREENER  (exit: {EXIT_PARAMS})")
+    trades  = run()
+    summary = summarize(trades)
+    if summary.empty:
+        print("❌ Tidak ada trade")
+    else:
+        print(summary.to_string(index=False))
+
+    # Ringkasan tiap strategi ke spreadsheet screener-nya sendiri
+    for name, (module, _) in STRATEGIES.items():
+        rows = summary[summary["Strategi"] == name] if not summary.empty else summary
+        if rows.empty:
+            continue
+        ws = module.gsheet(BACKTEST_SHEET)
+        if ws:
+            try:
+                ws.clear()
+                set_with_dataframe(ws, rows)
+                print(f"✅ {name} → {BACKTEST_SHEET}")
+            except Exception as e:
+                print(f"❌ Upload {name}: {e}")
@@ -0,0 +1,139 @@
+# ==========================================
+# TRADE PARAMETERS — SL / TP / RR BATCH
+# Semua input berupa array (satu elemen per kandidat / per bar), satu panggilan
+# menghitung seluruh kandidat tanpa loop per ticker maupun per level fibo.
+# Harga hasil dibulatkan ke fraksi harga BEI (tick size).
+# ==========================================
+
+import numpy as np
+
+# Fraksi harga BEI: (batas atas harga eksklusif, tick)
+TICK_BANDS = [(200, 1), (500, 2), (2000, 5), (5000, 10), (np.inf, 25)]
+
+# SL = ATR x mult per tier (tier lebih tinggi = lebih yakin = SL lebih ketat)
+TIER_SL_MULT = {1: 1.5, 2: 1.2, 3: 1.0}
+TP1_RR       = 2.0     # Minimal 2:1 (win rate 50% butuh RR >= 2 agar expectancy positif)
+TP2_RR       = 3.0     # Trail ke 3:1
+
+# Sumber target atr_target()
+SRC_LEVEL, SRC_ATR, SRC_PCT = 0, 1, 2
+
+
+# ==========================================
+# FRAKSI HARGA
+# ==========================================
+def tick_size(price):
+    """Tick BEI untuk tiap harga (array)."""
+    price  = np.asarray(price, dtype=np.float64)
+    bounds = np.array([b for b, _ in TICK_BANDS])
+    ticks  = np.array([t for _, t in TICK_BANDS], dtype=np.float64)
+    return ticks[np.minimum(np.searchsorted(bounds, price, side='right'), len(ticks) - 1)]
+
+
+def round_tick(price, side=0):
+    """
+    Bulatkan ke kelipatan tick BEI.
+    side : -1 ke bawah, +1 ke atas, 0 terdekat (skalar atau array per elemen). NaN tetap NaN.
+    """
+    price = np.asarray(price, dtype=np.float64)
+    tick  = tick_size(price)
+    side  = np.broadcast_to(np.asarray(side), price.shape)
+    with np.errstate(invalid='ignore'):
+        q = price / tick
+        out = np.select([side < 0, side > 0], [np.floor(q), np.ceil(q)], np.round(q)) * tick
+    return np.where(np.isnan(price), np.nan, np.maximum(out, 1.0))
+
+
+def direction_sign(direction):
+    """'bullish' -> 1, 'bearish' -> -1, lainnya -> 0."""
+    direction = np.asarray(direction, dtype=object)
+    return np.select([direction == 'bullish', direction == 'bearish'], [1, -1], 0)
+
+
+# ==========================================
+# KOMPONEN
+# ==========================================
+def fib_ladder(base, span, ratios, above):
+    """
+    Tangga level fibo base + span * ratio untuk semua kandidat sekaligus.
+    above : ambang per kandidat; target = level pertama > above, berikutnya = level setelahnya.
+    Return (idx1, tp1, tp2): idx1 = indeks ratio (urutan level naik) atau -1; tp NaN jika tidak ada.
+    """
+    base, span = np.asarray(base, dtype=np.float64), np.asarray(span, dtype=np.float64)
+    levels = base[:, None] + span[:, None] * np.asarray(ratios, dtype=np.float64)[None, :]
+    order  = np.argsort(levels, axis=1, kind='stable')
+    levels = np.take_along_axis(levels, order, axis=1)
+
+    hit  = levels > np.asarray(above, dtype=np.float64)[:, None]
+    any1 = hit.any(axis=1)
+    i1   = np.where(any1, hit.argmax(axis=1), -1)
+    rows = np.arange(len(levels))
+    n    = levels.shape[1]
+    tp1  = np.where(any1, levels[rows, np.clip(i1, 0, n - 1)], np.nan)
+    has2 = any1 & (i1 + 1 < n)
+    tp2  = np.where(has2, levels[rows, np.clip(i1 + 1, 0, n - 1)], np.nan)
+    idx1 = np.where(any1, order[rows, np.clip(i1, 0, n - 1)], -1)
+    return idx1, tp1, tp2
+
+
+def risk_reward(price, sl, tp):
+    """|tp - price| / |price - sl|; 0 jika risk = 0 atau data tidak lengkap."""
+    price, sl, tp = (np.asarray(x, dtype=np.float64) for x in (price, sl, tp))
+    risk = np.abs(price - sl)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rr = np.where(risk > 0, np.abs(tp - price) / risk, 0.0)
+    return np.where(np.isnan(rr), 0.0, rr)
+
+
+def est_days(price, target, atr):
+    """Estimasi bar ke target = jarak / ATR (min 1); NaN jika ATR tidak valid."""
+    price, target, atr = (np.asarray(x, dtype=np.float64) for x in (price, target, atr))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days = np.maximum(1, np.round(np.abs(target - price) / atr))
+    return np.where(atr > 0, days, np.nan)
+
+
+# ==========================================
+# SET LENGKAP
+# ==========================================
+def atr_levels(price, atr, direction, tier):
+    """
+    SL/TP berbasis ATR untuk sinyal pola (pengganti calculate_trade_params skalar).
+    SL = ATR x TIER_SL_MULT, TP1/TP2 = SL x TP1_RR / TP2_RR searah pola; SL dan TP
+    dibulatkan ke tick menjauhi sisi long/short (long ke bawah, short ke atas).
+    Return dict array: sl, tp1, tp2 (NaN jika arah netral), rr, est_days.
+    """
+    price = np.asarray(price, dtype=np.float64)
+    atr   = np.asarray(atr, dtype=np.float64)
+    sign  = direction_sign(direction)
+    tier  = np.asarray(tier)
+    mult  = np.select([tier == t for t in TIER_SL_MULT], list(TIER_SL_MULT.values()), TIER_SL_MULT[1])
+
+    side  = -sign                                   # long -> bulatkan ke bawah, short -> ke atas
+    valid = sign != 0
+    sl    = np.where(valid, round_tick(price - sign * atr * mult, side), np.nan)
+    tp1   = np.where(valid, round_tick(price + sign * atr * mult * TP1_RR, side), np.nan)
+    tp2   = np.where(valid, round_tick(price + sign * atr * mult * TP2_RR, side), np.nan)
+    return {
+        'sl'      : sl,
+        'tp1'     : tp1,
+        'tp2'     : tp2,
+        'rr'      : np.round(risk_reward(price, sl, tp1), 2),
+        'est_days': np.where(valid, est_days(price, tp1, atr), np.nan),
+    }
+
+
+def atr_target(price, atr, mult, level=None, fallback_pct=0.05):
+    """
+    Target long berjenjang: level struktur (mis. ob_low Bearish OB, NaN jika tidak ada)
+    -> price + mult x ATR -> price x (1 + fallback_pct) jika ATR tidak valid.
+    Return (target dibulatkan ke tick bawah, kode sumber SRC_LEVEL / SRC_ATR / SRC_PCT).
+    """
+    price = np.asarray(price, dtype=np.float64)
+    atr   = np.asarray(atr, dtype=np.float64)
+    level = np.full(price.shape, np.nan) if level is None else np.asarray(level, dtype=np.float64)
+    atr_ok = ~np.isnan(atr) & (atr > 0)
+    source = np.where(~np.isnan(level), SRC_LEVEL, np.where(atr_ok, SRC_ATR, SRC_PCT))
+    target = np.select([source == SRC_LEVEL, source == SRC_ATR],
+                       [level, price + mult * np.where(atr_ok, atr, 0)], price * (1 + fallback_pct))
+    return round_tick(target, -1), source
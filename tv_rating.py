@@ -0,0 +1,244 @@
+# ==========================================
+# TRADINGVIEW-STYLE TECHNICAL RATING — VEKTORISASI
+# Skor rata-rata vote (-1..1) untuk seluruh histori sebagai array,
+# satu ticker (DataFrame) atau panel ticker × hari (batch universe).
+# Dua varian yang dipakai repo:
+#   'pattern2' : ScannerPattern2 / BacktestAndGridSearch (kolom add_indicators,
+#                + StochRSI & Elder, semua vote non-MA selalu dihitung)
+#   'screener' : calc_tv di screener Supertrend / Channel / Bollinger
+#                (indikator sendiri, vote dihitung hanya jika indikator tersedia)
+# ==========================================
+
+import numpy as np
+import pandas as pd
+import ta
+
+import pattern_engine
+from pattern_engine import _shift, _columns
+
+MA_PERIODS = pattern_engine.MA_PERIODS
+
+TV_COLUMNS = {
+    'pattern2': ['Close']
+                + [f'{k}_{p}' for p in MA_PERIODS for k in ('SMA', 'EMA')]
+                + ['ISA', 'ISB', 'ITS', 'IKS', 'RSI', 'STOCH_K', 'STOCH_D', 'CCI',
+                   'ADX', '+DI', '-DI', 'AO', 'MOM', 'MACD', 'MACD_SIGNAL',
+                   'EMA_13', 'SRSI_K', 'SRSI_D', 'WILLR', 'BULLP', 'BEARP', 'UO'],
+    'screener': ['Close']
+                + [f'TV_{k}_{p}' for p in MA_PERIODS for k in ('SMA', 'EMA')]
+                + ['TV_TK', 'TV_KJ', 'TV_SA', 'TV_SB', 'TV_RSI', 'TV_STOCH_K', 'TV_STOCH_D',
+                   'TV_CCI', 'TV_ADX', 'TV_PDI', 'TV_MDI', 'TV_AO', 'TV_MOM',
+                   'TV_MACD', 'TV_MACD_SIGNAL', 'TV_WILLR', 'TV_UO'],
+}
+
+# Label rekomendasi per varian: (jual kuat, jual, netral, beli, beli kuat)
+TV_LABELS = {
+    'pattern2': ("Penjualan Kuat", "Penjualan", "Netral", "Pembelian", "Pembelian Kuat"),
+    'screener': ("Jual Kuat", "Jual", "Netral", "Beli", "Beli Kuat"),
+}
+
+
+# ==========================================
+# INDIKATOR
+# ==========================================
+def screener_indicators(df):
+    """Indikator calc_tv screener (kolom TV_*), dihitung dari OHLC mentah."""
+    c, h, l = df["Close"], df["High"], df["Low"]
+    out = {"Close": c}
+    for p in MA_PERIODS:
+        out[f"TV_SMA_{p}"] = c.rolling(p).mean()
+        out[f"TV_EMA_{p}"] = c.ewm(span=p, adjust=False).mean()
+
+    tk = (h.rolling(9).max() + l.rolling(9).min()) / 2
+    kj = (h.rolling(26).max() + l.rolling(26).min()) / 2
+    out["TV_TK"], out["TV_KJ"] = tk, kj
+    out["TV_SA"] = ((tk + kj) / 2).shift(26)
+    out["TV_SB"] = ((h.rolling(52).max() + l.rolling(52).min()) / 2).shift(26)
+
+    out["TV_RSI"] = ta.momentum.RSIIndicator(c, 14).rsi()
+    stoch = ta.momentum.StochasticOscillator(h, l, c, window=14, smooth_window=3)
+    out["TV_STOCH_K"], out["TV_STOCH_D"] = stoch.stoch(), stoch.stoch_signal()
+    out["TV_CCI"] = ta.trend.CCIIndicator(h, l, c, window=20).cci()
+    adxi = ta.trend.ADXIndicator(h, l, c, 14)
+    out["TV_ADX"], out["TV_PDI"], out["TV_MDI"] = adxi.adx(), adxi.adx_pos(), adxi.adx_neg()
+    out["TV_AO"]  = ta.momentum.AwesomeOscillatorIndicator(h, l).awesome_oscillator()
+    out["TV_MOM"] = c.diff(10)
+    macd = ta.trend.MACD(c)
+    out["TV_MACD"], out["TV_MACD_SIGNAL"] = macd.macd(), macd.macd_signal()
+    out["TV_WILLR"] = ta.momentum.WilliamsRIndicator(h, l, c, 14).williams_r()
+    out["TV_UO"]    = ta.momentum.UltimateOscillator(h, l, c).ultimate_oscillator()
+    return pd.DataFrame(out, index=df.index)
+
+
+def indicators(df, variant):
+    """DataFrame berisi TV_COLUMNS[variant]; pakai kolom yang sudah ada jika lengkap."""
+    if all(col in df.columns for col in TV_COLUMNS[variant]):
+        return df
+    if variant == 'pattern2':
+        return pattern_engine.add_indicators(df.copy())
+    return screener_indicators(df)
+
+
+# ==========================================
+# VOTE
+# ==========================================
+def _vote(buy, sell):
+    """1 / -1 / 0 seperti `if buy: add(1) elif sell: add(-1) else: add(0)`."""
+    return np.where(buy, 1, np.where(sell, -1, 0))
+
+
+def _votes_pattern2(col):
+    close = col('Close')
+    prev  = lambda name: _shift(col(name), 1)
+    votes, counts = [], []
+
+    for p in MA_PERIODS:
+        for ma in (col(f'SMA_{p}'), col(f'EMA_{p}')):
+            votes.append(_vote(ma < close, ma > close))
+            counts.append(~np.isnan(ma))
+
+    isa, isb, its, iks = col('ISA'), col('ISB'), col('ITS'), col('IKS')
+    votes.append(_vote((isa > isb) & (iks > isa) & (its > iks) & (close > its),
+                       (isa < isb) & (iks < isa) & (its < iks) & (close < its)))
+
+    rsi = col('RSI')
+    votes.append(_vote((rsi < 30) & (rsi > prev('RSI')), (rsi > 70) & (rsi < prev('RSI'))))
+
+    k, d = col('STOCH_K'), col('STOCH_D')
+    votes.append(_vote((k < 20) & (d < 20) & (k > d), (k > 80) & (d > 80) & (k < d)))
+
+    cci = col('CCI')
+    votes.append(_vote((cci < -100) & (cci > prev('CCI')), (cci > 100) & (cci < prev('CCI'))))
+
+    adx, pdi, mdi = col('ADX'), col('+DI'), col('-DI')
+    rising = (adx > 20) & (adx > prev('ADX'))
+    votes.append(_vote((pdi > mdi) & rising, (pdi < mdi) & rising))
+
+    ao, ao1, ao2 = col('AO'), _shift(col('AO'), 1), _shift(col('AO'), 2)
+    votes.append(_vote(((ao > 0) & (ao2 > ao1) & (ao > ao1)) | ((ao1 < 0) & (ao > 0)),
+                       ((ao < 0) & (ao2 < ao1) & (ao < ao1)) | ((ao1 > 0) & (ao < 0))))
+
+    mom = col('MOM')
+    votes.append(_vote(mom > prev('MOM'), mom < prev('MOM')))
+
+    macd, signal = col('MACD'), col('MACD_SIGNAL')
+    votes.append(_vote(macd > signal, macd < signal))
+
+    tren_naik = col('EMA_13') > prev('EMA_13')
+    sk, sd = col('SRSI_K'), col('SRSI_D')
+    votes.append(_vote(~tren_naik & (sk < 20) & (sd < 20) & (sk > sd),
+                       tren_naik & (sk > 80) & (sd > 80) & (sk < sd)))
+
+    wr = col('WILLR')
+    votes.append(_vote((wr < -80) & (wr > prev('WILLR')), (wr > -20) & (wr < prev('WILLR'))))
+
+    bearp, bullp = col('BEARP'), col('BULLP')
+    votes.append(_vote(tren_naik & (bearp < 0) & (bearp > prev('BEARP')),
+                       tren_naik & (bullp > 0) & (bullp < prev('BULLP'))))
+
+    uo = col('UO')
+    votes.append(_vote(uo > 70, uo < 30))
+
+    # Vote non-MA selalu dihitung (NaN -> perbandingan False -> 0)
+    always = np.ones(close.shape, dtype=bool)
+    counts += [always] * (len(votes) - len(counts))
+    return votes, counts
+
+
+def _votes_screener(col):
+    close = col('Close')
+    has   = lambda a: ~np.isnan(a)
+    votes, counts = [], []
+
+    def add(vote, counted):
+        votes.append(vote)
+        counts.append(counted)
+
+    for p in MA_PERIODS:
+        for ma in (col(f'TV_SMA_{p}'), col(f'TV_EMA_{p}')):
+            add(_vote(close > ma, close < ma), has(ma))
+
+    tk, kj, sa, sb = col('TV_TK'), col('TV_KJ'), col('TV_SA'), col('TV_SB')
+    add(_vote((sa > sb) & (kj > sa) & (tk > kj) & (close > tk),
+              (sa < sb) & (kj < sa) & (tk < kj) & (close < tk)), has(sb))
+
+    rsi = col('TV_RSI'); rsi1 = _shift(rsi, 1)
+    add(_vote((rsi < 30) & (rsi > rsi1), (rsi > 70) & (rsi < rsi1)), has(rsi))
+
+    k, d = col('TV_STOCH_K'), col('TV_STOCH_D')
+    add(_vote((k < 20) & (d < 20) & (k > d), (k > 80) & (d > 80) & (k < d)), has(k) & has(d))
+
+    cci = col('TV_CCI'); cci1 = _shift(cci, 1)
+    add(_vote((cci < -100) & (cci > cci1), (cci > 100) & (cci < cci1)), has(cci))
+
+    adx, pdi, mdi = col('TV_ADX'), col('TV_PDI'), col('TV_MDI')
+    rising = (adx > 20) & (adx > _shift(adx, 1))
+    add(_vote((pdi > mdi) & rising, (pdi < mdi) & rising), has(adx))
+
+    ao = col('TV_AO'); ao1, ao2 = _shift(ao, 1), _shift(ao, 2)
+    add(_vote(((ao > 0) & (ao > ao1) & (ao1 < ao2)) | ((ao > 0) & (ao1 < 0)),
+              ((ao < 0) & (ao < ao1) & (ao1 > ao2)) | ((ao < 0) & (ao1 > 0))), has(ao))
+
+    mom = col('TV_MOM'); mom1 = _shift(mom, 1)
+    add(_vote(mom > mom1, mom < mom1), has(mom))
+
+    macd, signal = col('TV_MACD'), col('TV_MACD_SIGNAL')
+    add(_vote(macd > signal, macd < signal), has(macd))
+
+    wr = col('TV_WILLR'); wr1 = _shift(wr, 1)
+    add(_vote((wr < -80) & (wr > wr1), (wr > -20) & (wr < wr1)), has(wr))
+
+    uo = col('TV_UO')
+    add(_vote(uo > 70, uo < 30), has(uo))
+    return votes, counts
+
+
+_VOTES = {'pattern2': _votes_pattern2, 'screener': _votes_screener}
+
+
+# ==========================================
+# PUBLIC API
+# ==========================================
+def tv_scores(src, variant='pattern2'):
+    """
+    src    : DataFrame berisi TV_COLUMNS[variant] atau panel {kolom: array 2-D [ticker, bar]}
+    Return : (score, count) array per bar — jumlah vote dan jumlah vote yang dihitung.
+    """
+    votes, counts = _VOTES[variant](_columns(src))
+    counts = np.asarray(counts)
+    score  = np.sum(np.where(counts, np.asarray(votes), 0), axis=0)
+    return score, counts.sum(axis=0)
+
+
+def tv_value(src, variant='pattern2'):
+    """Rating -1..1 (score / count) untuk seluruh histori; DataFrame OHLCV dilengkapi indikator."""
+    if isinstance(src, pd.DataFrame):
+        src = indicators(src, variant)
+    score, count = tv_scores(src, variant)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(count > 0, score / count, 0.0)
+
+
+def tv_value_panel(frames, variant='pattern2'):
+    """
+    Batch universe: frames {ticker: DataFrame OHLCV (atau sudah berindikator)}.
+    Indikator per ticker, vote dihitung sekali di panel.
+    Return (tickers, dates [ticker, bar], nilai [ticker, bar]); kolom -1 = bar terakhir.
+    """
+    frames = {t: indicators(df, variant) for t, df in frames.items() if df is not None and not df.empty}
+    tickers, dates, panel = pattern_engine.stack_panel(frames, columns=TV_COLUMNS[variant])
+    if not tickers:
+        return tickers, dates, np.empty(dates.shape)
+    return tickers, dates, tv_value(panel, variant)
+
+
+def tv_label(value, variant='pattern2'):
+    """Label rekomendasi (skalar -> str, array -> array object) dari nilai rating."""
+    v = np.asarray(value, dtype=np.float64)
+    strong_sell, sell, neutral, buy, strong_buy = TV_LABELS[variant]
+    out = np.select(
+        [(v >= -1.0) & (v < -0.5), (v >= -0.5) & (v < -0.1), (v >= -0.1) & (v <= 0.1),
+         (v > 0.1) & (v <= 0.5), (v > 0.5) & (v <= 1.0)],
+        [strong_sell, sell, neutral, buy, strong_buy], neutral,
+    ).astype(object)
+    return out.item() if out.ndim == 0 else out
@@ -0,0 +1,137 @@
+# ==========================================
+# WALK-FORWARD — FOLD + CACHE HASIL OPTIMASI
+# Fold anchored (train mulai dari titik yang sama, makin panjang) atau rolling
+# (panjang train tetap, digeser), dihitung mundur dari tanggal akhir.
+# Grid train semua fold dijalankan bersamaan dalam satu process pool
+# (backtest_engine.range_search). Hasil grid per fold disimpan sebagai JSON di
+# CACHE_DIR/walk_forward dengan kunci (rentang fold, hash grid) plus sidik data
+# rentang train: menambah fold / mengganti metrik test tidak mengulang fold lama.
+# ==========================================
+
+import hashlib
+import json
+import os
+from datetime import timedelta
+
+import backtest_engine
+import data_cache
+
+WF_DIR = os.path.join(data_cache.CACHE_DIR, "walk_forward")
+
+
+# ==========================================
+# FOLD
+# ==========================================
+def make_folds(end_date, n_folds, train_days, test_days, step_days, anchored=False):
+    """
+    Fold ke-1 = paling baru. Rolling: train [w_end - (train+test), +train], test sampai w_end,
+    w_end mundur step_days per fold. Anchored: train semua fold mulai dari train_start fold
+    paling lama (panjang train bertambah ke fold yang lebih baru).
+    Return list dict: fold, train_start, train_end, test_start, test_end.
+    """
+    folds = []
+    for i in range(n_folds):
+        w_end       = end_date - timedelta(days=i * step_days)
+        train_start = w_end - timedelta(days=train_days + test_days)
+        train_end   = train_start + timedelta(days=train_days)
+        folds.append({
+            "fold"        : i + 1,
+            "train_start" : train_start,
+            "train_end"   : train_end,
+            "test_start"  : train_end + timedelta(days=1),
+            "test_end"    : w_end,
+        })
+    if anchored and folds:
+        first = folds[-1]["train_start"]
+        for f in folds:
+            f["train_start"] = first
+    return folds
+
+
+# ==========================================
+# CACHE
+# ==========================================
+def grid_hash(combos, evaluate, modal_awal, sizing=None):
+    """Hash grid parameter + fungsi evaluasi + modal & sizing portofolio (bagian kunci cache)."""
+    payload = json.dumps({
+        "combos"  : [sorted(p.items()) for p in combos],
+        "evaluate": f"{evaluate.__module__}.{evaluate.__qualname__}",
+        "modal"   : modal_awal,
+        "sizing"  : sorted((sizing or {}).items()),
+    }, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+def _fold_path(fold, ghash):
+    span = f"{fold['train_start']:%Y%m%d}_{fold['train_end']:%Y%m%d}"
+    return os.path.join(WF_DIR, f"{span}_{ghash}.json")
+
+
+def _json_default(o):
+    return o.item() if hasattr(o, "item") else str(o)
+
+
+def _load(path, data_hash):
+    try:
+        with open(path) as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if saved.get("data") != data_hash:
+        return None
+    return {int(i): r for i, r in saved["results"]}
+
+
+def _save(path, data_hash, results):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"data": data_hash, "results": sorted(results.items())}, f, default=_json_default)
+    except OSError as e:
+        print(f"  -> ⚠️ Gagal simpan cache walk-forward {path}: {e}")
+
+
+# ==========================================
+# OPTIMASI SEMUA FOLD
+# ==========================================
+def optimize_folds(cache, folds, combos, evaluate, modal_awal, sizing=None,
+                   workers=None, use_cache=True, verbose=True):
+    """
+    Grid search di rentang train setiap fold. Fold yang hasilnya sudah ada di cache
+    (grid, evaluate, modal, sizing, dan data rentang train sama) tidak dihitung ulang; sisanya
+    dijalankan paralel dalam satu pool.
+    Return {fold: {index kombinasi: hasil evaluate}} (hasil None tidak disimpan).
+    """
+    combos = list(combos)
+    ghash  = grid_hash(combos, evaluate, modal_awal, sizing)
+    out, pending = {}, []
+    for f in folds:
+        path  = _fold_path(f, ghash)
+        dhash = backtest_engine.range_fingerprint(cache, f["train_start"], f["train_end"])
+        saved = _load(path, dhash) if use_cache else None
+        if saved is not None:
+            out[f["fold"]] = saved
+        else:
+            pending.append((f, path, dhash))
+    if verbose:
+        print(f"   Fold: {len(folds)}  |  dari cache: {len(out)}  |  dihitung: {len(pending)} "
+              f"x {len(combos)} kombinasi")
+    if not pending:
+        return out
+
+    ranges  = [(f["train_start"], f["train_end"]) for f, _, _ in pending]
+    results = [{} for _ in pending]
+    total   = len(pending) * len(combos)
+    grid    = backtest_engine.range_search(cache, ranges, combos, evaluate, modal_awal, sizing, workers)
+    for done, (r, i, _, result) in enumerate(grid, start=1):
+        if result is not None:
+            results[r][i] = result
+        if verbose and (done % 100 == 0 or done == total):
+            print(f"   Progress: {done}/{total}")
+
+    for (f, path, dhash), res in zip(pending, results):
+        res = dict(sorted(res.items()))
+        if use_cache:
+            _save(path, dhash, res)
+        out[f["fold"]] = res
+    return out